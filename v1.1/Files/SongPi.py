@@ -6,21 +6,37 @@ import asyncio
 import tkinter as tk
 from tkinter import font as tkFont
 from shazamio import Shazam
-import requests
-from PIL import Image, ImageTk, ImageFilter, ImageStat, ImageDraw, ImageFont
+try:
+    from shazamio.interfaces.client import HTTPClientInterface
+except ImportError: # Older shazamio without pluggable HTTP clients
+    HTTPClientInterface = object
+import aiohttp
+from PIL import Image, ImageTk, ImageFilter, ImageDraw, ImageFont
 import io
 import os
 import json
 from screeninfo import get_monitors
 import threading
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import queue
 import logging
 import tempfile
-from datetime import datetime
-import shutil
+from datetime import datetime, timedelta
 import sys
 from typing import Optional, Dict, Any, Tuple, List, Literal, Union
 from pathlib import Path
+from collections import OrderedDict
 import time # Potentially needed
+import math
+import hashlib
+import email.utils
+import re
+import base64
+import binascii
+import zlib
+import random
+import numpy as np
 
 # --- Constants ---
 # Get the directory containing this script (shazam.py) -> Files/
@@ -29,21 +45,30 @@ SCRIPT_DIR = Path(__file__).parent.resolve()
 APP_ROOT_DIR = SCRIPT_DIR.parent
 
 CONFIG_FILENAME = 'config.json'
-IMAGE_FILENAME = 'image.jpg'
-TEMP_IMAGE_FILENAME = 'image_temp.jpg'
 HISTORY_IMAGE_DIR = 'history_images'      # Relative name, base is APP_ROOT_DIR
 LAST_STATE_FILENAME = 'last_state.json'
 SONG_HISTORY_FILENAME = 'song_history.log' # Relative name, base is APP_ROOT_DIR
+FINGERPRINT_INDEX_DIR = 'fingerprint_index' # Relative name, base is APP_ROOT_DIR
+OFFLINE_QUEUE_DIR = 'offline_queue' # Relative name, base is APP_ROOT_DIR
+HTTP_CACHE_DIR = 'http_cache' # Relative name, base is APP_ROOT_DIR
+RENDER_CACHE_DIR = 'render_cache' # Relative name, base is APP_ROOT_DIR
+ART_PYRAMID_DIR = 'art_pyramid' # Relative name, base is APP_ROOT_DIR
 
 # Paths relative to the script's location (inside Files/)
 CONFIG_PATH = SCRIPT_DIR / CONFIG_FILENAME
-IMAGE_PATH = SCRIPT_DIR / IMAGE_FILENAME
-TEMP_IMAGE_PATH = SCRIPT_DIR / TEMP_IMAGE_FILENAME # Keep temp file relative to script
 LAST_STATE_FILE_PATH = SCRIPT_DIR / LAST_STATE_FILENAME
 
 # Paths relative to the application root (one level up from script)
 HISTORY_IMAGE_DIR_PATH = APP_ROOT_DIR / HISTORY_IMAGE_DIR
 SONG_HISTORY_FILE_PATH = APP_ROOT_DIR / SONG_HISTORY_FILENAME
+FINGERPRINT_INDEX_DIR_PATH = APP_ROOT_DIR / FINGERPRINT_INDEX_DIR
+OFFLINE_QUEUE_DIR_PATH = APP_ROOT_DIR / OFFLINE_QUEUE_DIR
+HTTP_CACHE_DIR_PATH = APP_ROOT_DIR / HTTP_CACHE_DIR
+RENDER_CACHE_DIR_PATH = APP_ROOT_DIR / RENDER_CACHE_DIR
+ART_PYRAMID_DIR_PATH = APP_ROOT_DIR / ART_PYRAMID_DIR
+
+SHAZAM_WARM_UP_URL = "https://amp.shazam.com/"
+ART_STORE_FILENAME_RE = re.compile(r'[0-9a-f]{64}\.jpg') # Content-addressed cover files in HISTORY_IMAGE_DIR_PATH
 
 MIN_WINDOW_WIDTH = 250
 MIN_WINDOW_HEIGHT = 200
@@ -64,6 +89,7 @@ history_photo_refs: List[Dict[str, Any]] = []
 last_track_title: str = ""
 last_artist_name: str = ""
 last_persistent_image_path: Optional[str] = None
+current_artwork: Optional["Artwork"] = None # Artwork on screen; set on the Tk thread
 current_status_message: str = "Initialising..."
 song_history_list: List[Dict[str, Any]] = [] # In-memory list of recent songs
 
@@ -71,6 +97,32 @@ resize_job_id: Optional[str] = None
 cursor_hide_timer_id: Optional[str] = None
 recognition_thread: Optional[threading.Thread] = None
 recognition_thread_stop_event = threading.Event()
+recognition_loop: Optional[asyncio.AbstractEventLoop] = None
+recognition_async_stop_event: Optional[asyncio.Event] = None # Mirrors recognition_thread_stop_event on the recognition loop
+capture_engine: Optional["AudioCaptureEngine"] = None
+shazam_client: Optional[Shazam] = None # One long-lived client per recognition thread
+shazam_http_client: Optional["PooledHTTPClient"] = None
+cover_art_http_client: Optional["PooledHTTPClient"] = None
+cover_art_upgrade_task: Optional[asyncio.Task] = None # Pending HQ download that replaces a standard-quality cover
+art_store: Optional["ArtStore"] = None
+http_art_cache: Optional["HTTPArtCache"] = None
+blur_render_cache: Optional["BlurRenderCache"] = None
+art_pyramid_cache: Optional["ArtPyramidCache"] = None
+selected_blur_tier: Optional[str] = None
+blur_benchmark_area: float = 0 # Pixel area the auto blur tier was benchmarked at
+artwork_digest_memo: Dict[Tuple[str, int, int], str] = {} # (path, mtime_ns, size) -> content hash
+render_preparer: Optional["RenderPreparer"] = None
+signature_executor: Optional[ProcessPoolExecutor] = None
+streaming_signature: Optional["StreamingSignatureService"] = None
+circuit_breakers: Dict[str, "CircuitBreaker"] = {} # Keyed by remote service ('recognition', 'cover_art')
+audio_chunk_listeners: List[Any] = [] # Called from the capture thread with (pcm_bytes, channels, sample_rate)
+device_registry: Optional["AudioDeviceRegistry"] = None
+same_song_reference: Optional[Dict[str, Any]] = None # Fingerprint of the window at the last successful match
+fingerprint_index: Optional["FingerprintIndex"] = None
+fingerprint_index_last_saved: float = time.monotonic()
+fingerprint_index_lock = threading.Lock() # Only one thread loads the index
+offline_queue: Optional["OfflineRecognitionQueue"] = None
+offline_queue_last_fingerprint: Optional[Dict[str, np.ndarray]] = None # Avoids queuing the same song every cycle
 
 logger = logging.getLogger("SongRecognizer")
 
@@ -91,7 +143,11 @@ def load_config() -> Dict[str, Any]:
     defaults = {
         "audio": {
             "format": "paInt16", "channels": 1, "sample_rate": 48000,
-            "chunk_size": 8192, "record_seconds": 4, "device_index": None
+            "chunk_size": 8192, "record_seconds": 4, "device_index": None,
+            "ring_buffer_seconds": 20, # Length of the persistent capture ring buffer
+            "capture_mode": "callback", # "callback" (PortAudio callback) or "thread" (dedicated blocking reader thread)
+            "debug_save_wav": False, # Write each snippet to a temp WAV file instead of passing bytes in memory
+            "device_rescan_interval_s": 300 # Re-probe the cached device table after this long (0 = only on failure)
         },
         "gui": {
             "update_interval_ms": 5000, "blur_strength": 15, "border_size_ratio": 0.15,
@@ -101,13 +157,64 @@ def load_config() -> Dict[str, Any]:
             "history_font_size_ratio": 0.7, "history_min_side_width": 300,
             "layout_side_min_buffer": 50, "layout_below_min_buffer": 50,
             "status_font_size_ratio": 0.8, # Base ratio before halving
-            "history_max_items_retain": 20 # Max items to keep images for on disk
+            "history_max_items_retain": 20, # Max items to keep images for on disk
+            "blur_quality": "auto", # "full", "downsample", "box", or "auto" (startup benchmark against blur_budget_ms)
+            "blur_budget_ms": 150
+        },
+        "audio_gate": {
+            "enabled": True, "min_rms_dbfs": -50.0, "min_peak_dbfs": -35.0,
+            "max_spectral_flatness": 0.45 # Above this the window is treated as broadband noise
+        },
+        "same_song": {
+            "enabled": True, "similarity_threshold": 0.92,
+            "max_reverify_s": 60 # Always ask Shazam again after this long, even if the audio looks unchanged
+        },
+        "fingerprint_index": {
+            "enabled": True, "min_matches": 12, # Time-aligned hash matches needed for a local hit
+            "max_hashes_per_track": 20000, "save_interval_s": 300,
+            "max_tracks": 500 # Least recently added-to or matched tracks are evicted beyond this
+        },
+        "scheduler": {
+            "enabled": True, "fast_interval_s": 2, # After a no-match and near the expected end of a track
+            "sparse_interval_s": 15, # Longest wait while a known track is mid-play
+            "near_end_window_s": 20, "assumed_track_length_s": 240 # Used when Shazam gives no duration
+        },
+        "pipeline": {"queue_size": 2}, # Max windows/results waiting between pipeline stages
+        "signature": {
+            "offload": True, "workers": 1, # Compute Shazam signatures on a process pool
+            "streaming": False, # Build signature peaks continuously in a background process
+            "window_ladder_s": [2, 3, 4, 6] # Streaming windows tried in order until one matches
+        },
+        "network": {
+            "timeout": 7, "retry_count": 3, "retry_delay": 2, # retry_delay is the base of an exponential backoff with jitter
+            "max_retry_delay": 30,
+            "breaker_failure_threshold": 3, "breaker_cooldown_s": 30, "breaker_max_cooldown_s": 300, # Go offline after repeated failures
+            "pool_size": 4, "keepalive_s": 60, "warm_up": True, # Pooled HTTP connections for recognition requests
+            "cover_art_per_host": 2, "cover_art_max_bytes": 5000000, # Cover-art downloads: connections per CDN host, size cap
+            "cover_art_hedge_s": 1.5 # Start the standard-quality download if HQ has sent nothing by then
+        },
+        "render_cache": {
+            "memory_items": 4, # Blurred backgrounds kept in memory (each is one full window of RGB)
+            "disk_enabled": False, "disk_max_files": 40 # Optional on-disk tier for rendered backgrounds
+        },
+        "art_pyramid": {
+            "enabled": True, "memory_max_bytes": 32000000, # Decoded cover art levels kept in memory (LRU by artwork)
+            "disk_enabled": True, "disk_max_files": 120, # On-disk tier, only for the levels history thumbnails use
+            "min_level_px": 64 # Smallest level; each level halves the one above, starting from the original
+        },
+        "http_cache": {
+            "enabled": True, "max_entries": 500, # Cover-art URLs whose validators are kept (LRU eviction); bodies live in the art store
+            "default_ttl_s": 604800 # Freshness when the server sends no Cache-Control/Expires
+        },
+        "offline_queue": {
+            "enabled": True, "max_entries": 200, # Windows captured while offline, kept on disk for later
+            "replay_interval_s": 10, "replay_batch_size": 3, "replay_spacing_s": 2 # Throttled replay once back online
         },
-        "network": {"timeout": 7, "retry_count": 3, "retry_delay": 2},
         "logging": {
              "level": "INFO",
              "format": "%(asctime)s - %(levelname)s - [%(threadName)s] - %(message)s",
-             "datefmt": "%Y-%m-%d %H:%M:%S"
+             "datefmt": "%Y-%m-%d %H:%M:%S",
+             "metrics_interval_s": 300 # How often to log the metrics summary (0 = never)
         }
     }
     loaded_config = {}
@@ -149,54 +256,152 @@ def load_config() -> Dict[str, Any]:
     return final_config
 
 
+# --- Metrics ---
+metrics_lock = threading.Lock()
+metrics_counters: Dict[str, int] = {}
+metrics_timings: Dict[str, Dict[str, float]] = {}
+metrics_gauges: Dict[str, float] = {}
+metrics_last_logged: float = time.monotonic()
+
+def increment_metric(name: str, amount: int = 1):
+    """Increments a named counter. Safe to call from any thread."""
+    with metrics_lock:
+        metrics_counters[name] = metrics_counters.get(name, 0) + amount
+
+def set_metric_gauge(name: str, value: float):
+    """Sets a named point-in-time value such as a queue depth. Safe to call from any thread."""
+    with metrics_lock:
+        metrics_gauges[name] = value
+
+def record_timing(name: str, seconds: float):
+    """Records one latency sample (count, total, max, last) under a name. Safe to call from any thread."""
+    with metrics_lock:
+        timing = metrics_timings.setdefault(name, {'count': 0, 'total': 0.0, 'max': 0.0, 'last': 0.0})
+        timing['count'] += 1
+        timing['total'] += seconds
+        timing['max'] = max(timing['max'], seconds)
+        timing['last'] = seconds
+
+def get_metrics_snapshot() -> Dict[str, Any]:
+    """Returns a copy of all counters and timings."""
+    with metrics_lock:
+        return {'counters': dict(metrics_counters),
+                'gauges': dict(metrics_gauges),
+                'timings': {name: dict(timing) for name, timing in metrics_timings.items()}}
+
+def maybe_log_metrics_summary():
+    """Logs counters and average/max timings once every logging.metrics_interval_s seconds."""
+    global metrics_last_logged
+    interval = config['logging'].get('metrics_interval_s', 300)
+    if interval <= 0 or time.monotonic() - metrics_last_logged < interval:
+        return
+    metrics_last_logged = time.monotonic()
+    snapshot = get_metrics_snapshot()
+    counters_text = ", ".join(f"{name}={value}" for name, value in sorted(snapshot['counters'].items()))
+    timings_text = ", ".join(
+        f"{name}=avg {timing['total'] / timing['count'] * 1000:.0f}ms/max {timing['max'] * 1000:.0f}ms (n={timing['count']})"
+        for name, timing in sorted(snapshot['timings'].items()) if timing['count'])
+    gauges_text = ", ".join(f"{name}={value:g}" for name, value in sorted(snapshot['gauges'].items()))
+    logger.info(f"[Metrics] Counters: {counters_text or 'none'}")
+    logger.info(f"[Metrics] Gauges: {gauges_text or 'none'}")
+    logger.info(f"[Metrics] Timings: {timings_text or 'none'}")
+
+
 # --- Audio Handling ---
-# ... (Audio handling functions remain unchanged) ...
+PROBE_SAMPLE_RATES = (16000, 22050, 44100, 48000)
+
+class AudioDeviceRegistry:
+    """Caches the input device table (name, channels, supported rates) and re-probes only when stale or invalidated."""
+
+    def __init__(self, rescan_interval_s: float):
+        self.rescan_interval_s = rescan_interval_s
+        self._devices: Dict[int, Dict[str, Any]] = {}
+        self._scanned_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def invalidate(self, reason: str):
+        """Forces a re-probe on the next lookup, e.g. after a stream open failure."""
+        with self._lock:
+            if self._scanned_at is not None:
+                logger.info(f"Audio device table invalidated: {reason}")
+            self._scanned_at = None
+
+    def devices(self) -> Dict[int, Dict[str, Any]]:
+        """Returns the cached device table, rescanning first if it is missing or older than the rescan interval."""
+        with self._lock:
+            is_stale = (self._scanned_at is None or
+                        (self.rescan_interval_s > 0 and time.monotonic() - self._scanned_at > self.rescan_interval_s))
+            if is_stale:
+                self._devices = self._probe_devices()
+                self._scanned_at = time.monotonic()
+            return self._devices
+
+    def get(self, device_index: int) -> Optional[Dict[str, Any]]:
+        return self.devices().get(device_index)
+
+    def _probe_devices(self) -> Dict[int, Dict[str, Any]]:
+        """Enumerates input devices with a short-lived PyAudio instance (PortAudio only sees hotplugged devices after re-init)."""
+        audio = None
+        devices: Dict[int, Dict[str, Any]] = {}
+        try:
+            logger.debug("Initializing PyAudio to probe devices...")
+            audio = pyaudio.PyAudio()
+            host_api_info = audio.get_host_api_info_by_index(0)
+            num_devices = host_api_info.get('deviceCount', 0)
+            logger.debug(f"Host API reports {num_devices} devices.")
+            for i in range(num_devices):
+                try:
+                    device_info = audio.get_device_info_by_host_api_device_index(0, i)
+                except Exception as e:
+                    logger.warning(f"Could not query device index {i}: {e}")
+                    continue
+                max_input_channels = device_info.get('maxInputChannels', 0)
+                if max_input_channels <= 0:
+                    continue
+                device_index = device_info.get('index', i)
+                supported_rates = []
+                candidate_rates = set(PROBE_SAMPLE_RATES) | {int(device_info.get('defaultSampleRate', 0))}
+                for rate in sorted(r for r in candidate_rates if r > 0):
+                    try:
+                        if audio.is_format_supported(rate, input_device=device_index,
+                                                     input_channels=1, input_format=pyaudio.paInt16):
+                            supported_rates.append(rate)
+                    except ValueError:
+                        pass
+                logger.debug(f"  Device {device_index}: {device_info['name']} (In:{max_input_channels}, Rates:{supported_rates})")
+                devices[device_index] = {'name': device_info['name'], 'channels': max_input_channels,
+                                         'supported_rates': supported_rates}
+            logger.info(f"Probed {len(devices)} input devices.")
+        except Exception as e:
+             logger.error(f"Error probing audio devices: {e}", exc_info=True)
+        finally:
+            if audio:
+                audio.terminate()
+                logger.debug("PyAudio terminated after probing devices.")
+        return devices
+
+def get_device_registry() -> AudioDeviceRegistry:
+    """Returns the shared device registry, creating it on first use."""
+    global device_registry
+    if device_registry is None:
+        device_registry = AudioDeviceRegistry(config['audio'].get('device_rescan_interval_s', 300))
+    return device_registry
+
 def list_audio_devices() -> List[Tuple[int, str, int]]:
-    """Lists available input audio devices."""
-    audio = None
-    devices = []
-    try:
-        logger.debug("Initializing PyAudio to list devices...")
-        audio = pyaudio.PyAudio()
-        host_api_info = audio.get_host_api_info_by_index(0)
-        num_devices = host_api_info.get('deviceCount', 0)
-        logger.debug(f"Host API reports {num_devices} devices.")
-        for i in range(num_devices):
-            try:
-                device_info = audio.get_device_info_by_host_api_device_index(0, i)
-                if device_info.get('maxInputChannels', 0) > 0:
-                     logger.debug(f"  Device {i}: {device_info['name']} (In:{device_info['maxInputChannels']}, Out:{device_info['maxOutputChannels']})")
-                     devices.append((i, device_info['name'], device_info['maxInputChannels']))
-            except Exception as e:
-                logger.warning(f"Could not query device index {i}: {e}")
-        logger.info(f"Found {len(devices)} input devices.")
-    except Exception as e:
-         logger.error(f"Error listing audio devices: {e}", exc_info=True)
-    finally:
-        if audio:
-            audio.terminate()
-            logger.debug("PyAudio terminated after listing devices.")
-    return devices
-
-def validate_device_channels(device_index: int, required_channels: int) -> bool:
-    """Checks if a device index is valid and has enough input channels."""
-    audio = None
-    is_valid = False
-    try:
-        logger.debug(f"Validating device index {device_index} for {required_channels} channels...")
-        audio = pyaudio.PyAudio()
-        device_info = audio.get_device_info_by_index(device_index)
-        actual_channels = device_info.get('maxInputChannels', 0)
-        is_valid = actual_channels >= required_channels
-        logger.debug(f"Device {device_index} ('{device_info.get('name', 'N/A')}') has {actual_channels} channels. Valid: {is_valid}")
-    except OSError as e:
-        logger.warning(f"Device index {device_index} seems invalid or inaccessible: {e}")
-    except Exception as e:
-        logger.error(f"Error validating device {device_index}: {e}")
-    finally:
-        if audio:
-            audio.terminate()
-            logger.debug(f"PyAudio terminated after validating device {device_index}.")
+    """Lists available input audio devices from the cached device table."""
+    return [(index, info['name'], info['channels']) for index, info in get_device_registry().devices().items()]
+
+def validate_device_channels(device_index: int, required_channels: int, sample_rate: Optional[int] = None) -> bool:
+    """Checks against the cached device table if a device index is valid, has enough input channels and supports the rate."""
+    device_info = get_device_registry().get(device_index)
+    if device_info is None:
+        logger.warning(f"Device index {device_index} not found in device table.")
+        return False
+    is_valid = device_info['channels'] >= required_channels
+    if is_valid and sample_rate and device_info['supported_rates'] and sample_rate not in device_info['supported_rates']:
+        logger.warning(f"Device {device_index} ('{device_info['name']}') does not report support for {sample_rate} Hz.")
+        is_valid = False
+    logger.debug(f"Device {device_index} ('{device_info['name']}') has {device_info['channels']} channels. Valid: {is_valid}")
     return is_valid
 
 def select_input_device(required_channels: int) -> Optional[int]:
@@ -227,17 +432,250 @@ def select_input_device(required_channels: int) -> Optional[int]:
         logger.error(f"No input device found with required channels ({required_channels}). Available devices logged previously.")
         return None
 
-def record_audio() -> Optional[str]:
-    """Records audio for a configured duration to a temporary WAV file."""
-    global current_status_message
-    schedule_gui_update(set_status_message, "Listening...")
+
+# --- Audio Capture Engine ---
+class AudioCaptureEngine:
+    """Keeps one PyAudio input stream open for the whole process and writes captured audio into a fixed-size ring buffer.
+
+    In 'callback' mode PortAudio delivers chunks on its own thread; in 'thread' mode a dedicated reader thread does
+    blocking reads. Either way no stream read ever runs on the asyncio loop, which is notified through subscriptions.
+    """
+    STALL_TIMEOUT_S = 3.0 # Silence from the device this long means a stall; late callbacks under load stay well below
+    FIRST_CHUNK_TIMEOUT_S = 5.0 # Devices can take a moment to deliver their first chunk after opening
+
+    def __init__(self, device_index: int, py_audio_format: int, channels: int,
+                 sample_rate: int, chunk_size: int, buffer_seconds: float, capture_mode: str = "callback"):
+        self.device_index = device_index
+        self.capture_mode = capture_mode
+        self.py_audio_format = py_audio_format
+        self.channels = channels
+        self.sample_rate = sample_rate
+        self.chunk_size = chunk_size
+        self.sample_width = pyaudio.get_sample_size(py_audio_format)
+        self.bytes_per_frame = self.sample_width * channels
+        capacity_frames = max(int(sample_rate * buffer_seconds), chunk_size)
+        self.capacity_bytes = capacity_frames * self.bytes_per_frame
+        self.last_error: Optional[str] = None
+        self.stalled = False # Stream still open but silent: reopen the same device rather than re-probing
+
+        self._ring = bytearray(self.capacity_bytes)
+        self._write_pos = 0
+        self._total_written = 0 # Total bytes ever written, used to tell how much of the ring is valid
+        self._last_chunk_at = time.monotonic() # When _write last ran, for stall detection
+        self._chunk_since_start = False
+        self._lock = threading.Lock()
+        self._audio: Optional[pyaudio.PyAudio] = None
+        self._stream = None
+        self._reader_thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+        self._subscribers: List[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]] = []
+
+    def start(self) -> bool:
+        """Initialises PyAudio, opens the input stream and starts the reader thread."""
+        if self.is_running():
+            return True
+        self._stop_event.clear()
+        self.last_error = None
+        self.stalled = False
+        with self._lock:
+            self._last_chunk_at = time.monotonic()
+            self._chunk_since_start = False
+        try:
+            logger.debug("Initializing PyAudio for capture engine...")
+            self._audio = pyaudio.PyAudio()
+            logger.debug(f"Opening persistent audio stream on device {self.device_index}...")
+            stream_callback = self._stream_callback if self.capture_mode == "callback" else None
+            self._stream = self._audio.open(format=self.py_audio_format, rate=self.sample_rate, channels=self.channels,
+                                            input_device_index=self.device_index, input=True,
+                                            frames_per_buffer=self.chunk_size, stream_callback=stream_callback)
+        except Exception as e:
+            self.last_error = f"Cannot open device {self.device_index}"
+            logger.error(f"Error opening persistent stream on device {self.device_index}: {e}")
+            self._close_stream()
+            return False
+
+        if self.capture_mode != "callback":
+            self._reader_thread = threading.Thread(target=self._reader_loop, name="AudioCaptureThread", daemon=True)
+            self._reader_thread.start()
+        ring_seconds = self.capacity_bytes / (self.bytes_per_frame * self.sample_rate)
+        logger.info(f"Audio capture engine started on device {self.device_index} ({self.capture_mode} mode, {ring_seconds:.0f}s ring buffer).")
+        return True
+
+    def stop(self):
+        """Stops the reader thread and releases the stream and PyAudio instance."""
+        self._stop_event.set()
+        if self._reader_thread and self._reader_thread.is_alive() and self._reader_thread is not threading.current_thread():
+            self._reader_thread.join(timeout=2.0)
+            if self._reader_thread.is_alive():
+                logger.warning("Audio capture thread did not stop within timeout.")
+        self._reader_thread = None
+        self._close_stream()
+        logger.info("Audio capture engine stopped.")
+
+    def is_running(self) -> bool:
+        """False if the stream or reader thread is gone, or no chunk has arrived for STALL_TIMEOUT_S."""
+        if self.capture_mode == "callback":
+            if self._stop_event.is_set() or self._stream is None or self.last_error:
+                return False
+            try:
+                if not self._stream.is_active():
+                    return False
+            except Exception:
+                return False
+        elif self._reader_thread is None or not self._reader_thread.is_alive():
+            return False
+        with self._lock:
+            silent_for = time.monotonic() - self._last_chunk_at
+            started = self._chunk_since_start
+        timeout = max(2 * self.chunk_size / self.sample_rate, self.STALL_TIMEOUT_S) if started else self.FIRST_CHUNK_TIMEOUT_S
+        if silent_for > timeout:
+            self.last_error = "Audio capture stalled"
+            self.stalled = True
+            logger.warning(f"No audio chunk for {silent_for:.2f}s (limit {timeout:.2f}s). Treating capture as stalled.")
+            increment_metric('capture_stalls')
+            return False
+        return True
+
+    def subscribe(self, loop: asyncio.AbstractEventLoop, max_chunks: int = 64) -> asyncio.Queue:
+        """Returns an asyncio.Queue on `loop` that receives every new chunk. Oldest chunks are dropped if it falls behind."""
+        chunk_queue: asyncio.Queue = asyncio.Queue(maxsize=max_chunks)
+        with self._lock:
+            self._subscribers.append((loop, chunk_queue))
+        return chunk_queue
+
+    def unsubscribe(self, chunk_queue: asyncio.Queue):
+        with self._lock:
+            self._subscribers = [(loop, q) for loop, q in self._subscribers if q is not chunk_queue]
+
+    def _stream_callback(self, in_data, frame_count, time_info, status_flags):
+        """PyAudio callback: runs on PortAudio's thread for each captured chunk."""
+        if status_flags & getattr(pyaudio, 'paInputOverflow', 0):
+            increment_metric('capture_input_overflows')
+        if in_data:
+            self._write(in_data)
+        return (None, pyaudio.paComplete if self._stop_event.is_set() else pyaudio.paContinue)
+
+    def _close_stream(self):
+        if self._stream:
+            try:
+                if self._stream.is_active(): self._stream.stop_stream()
+                self._stream.close()
+                logger.debug("Persistent audio stream stopped/closed.")
+            except Exception as e:
+                logger.warning(f"Error closing persistent audio stream: {e}")
+            self._stream = None
+        if self._audio:
+            self._audio.terminate()
+            logger.debug("PyAudio terminated for capture engine.")
+            self._audio = None
+
+    def _reader_loop(self):
+        """Reads chunks from the stream until stopped. Runs on the capture thread."""
+        while not self._stop_event.is_set():
+            try:
+                data = self._stream.read(self.chunk_size, exception_on_overflow=False)
+            except IOError as e:
+                if e.errno == pyaudio.paInputOverflowed:
+                    logger.warning("Input overflowed in capture engine.")
+                    continue
+                self.last_error = "Audio input failed"
+                logger.error(f"IOError during persistent stream read: {e}")
+                break
+            except Exception as e:
+                self.last_error = "Audio read failed"
+                logger.exception(f"Unexpected error reading persistent audio stream: {e}")
+                break
+            self._write(data)
+        logger.debug("Audio capture reader loop exited.")
+
+    def _write(self, data: bytes):
+        """Copies data into the ring buffer, wrapping around at the end."""
+        with self._lock:
+            data_len = len(data)
+            if data_len >= self.capacity_bytes:
+                data = data[-self.capacity_bytes:]
+                self._ring[:] = data
+                self._write_pos = 0
+            else:
+                first_part = min(data_len, self.capacity_bytes - self._write_pos)
+                self._ring[self._write_pos:self._write_pos + first_part] = data[:first_part]
+                remaining = data_len - first_part
+                if remaining:
+                    self._ring[:remaining] = data[first_part:]
+                self._write_pos = (self._write_pos + data_len) % self.capacity_bytes
+            self._total_written += data_len
+            self._last_chunk_at = time.monotonic()
+            self._chunk_since_start = True
+            subscribers = list(self._subscribers)
+        for loop, chunk_queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(offer_to_queue, chunk_queue, data)
+            except RuntimeError:
+                pass # Loop already closed
+        for listener in list(audio_chunk_listeners):
+            try:
+                listener(data, self.channels, self.sample_rate)
+            except Exception as e:
+                logger.warning(f"Audio chunk listener failed: {e}")
+
+    def available_seconds(self) -> float:
+        """Seconds of valid audio currently held in the ring buffer."""
+        with self._lock:
+            valid_bytes = min(self._total_written, self.capacity_bytes)
+        return valid_bytes / (self.bytes_per_frame * self.sample_rate)
+
+    def get_latest(self, seconds: float) -> Optional[bytes]:
+        """Returns a copy of the most recent `seconds` of audio, or None if not enough has been captured yet."""
+        wanted_bytes = int(self.sample_rate * seconds) * self.bytes_per_frame
+        if wanted_bytes <= 0 or wanted_bytes > self.capacity_bytes:
+            logger.error(f"Requested {seconds}s of audio but ring buffer holds at most {self.capacity_bytes} bytes.")
+            return None
+        with self._lock:
+            if min(self._total_written, self.capacity_bytes) < wanted_bytes:
+                return None
+            start = (self._write_pos - wanted_bytes) % self.capacity_bytes
+            if start + wanted_bytes <= self.capacity_bytes:
+                return bytes(self._ring[start:start + wanted_bytes])
+            return bytes(self._ring[start:]) + bytes(self._ring[:self._write_pos])
+
+
+def offer_to_queue(queue: asyncio.Queue, item: Any):
+    """Puts an item on a bounded queue, dropping the oldest entry when full. Must run on the queue's loop."""
+    if queue.full():
+        try:
+            queue.get_nowait()
+        except asyncio.QueueEmpty:
+            pass
+    queue.put_nowait(item)
+
+def log_background_failure(future: "asyncio.Future", description: str):
+    """Makes sure an exception from a fire-and-forget executor job is logged rather than silently dropped."""
+    def report(done: "asyncio.Future"):
+        if not done.cancelled() and done.exception() is not None:
+            logger.error(f"Background {description} failed: {done.exception()!r}")
+    future.add_done_callback(report)
+
+def get_capture_engine() -> Optional[AudioCaptureEngine]:
+    """Returns the running capture engine, (re)creating it on first use or after a stream failure."""
+    global capture_engine
+    if capture_engine and capture_engine.is_running():
+        return capture_engine
+    if capture_engine and capture_engine.stalled:
+        # The device itself is fine as far as we know: reopen it in place, keeping the ring buffer and device table.
+        logger.warning(f"Capture stalled on device {capture_engine.device_index}. Reopening its stream.")
+        capture_engine.stop()
+        if capture_engine.start():
+            return capture_engine
+    if capture_engine:
+        logger.warning(f"Capture engine not running (last error: {capture_engine.last_error}). Restarting.")
+        schedule_gui_update(set_status_message, f"Error: {capture_engine.last_error or 'Audio capture stopped'}")
+        get_device_registry().invalidate("capture stream failed")
+        capture_engine.stop()
+        capture_engine = None
+
     audio_cfg = config['audio']
     dev_index = audio_cfg.get('device_index')
     chans = audio_cfg['channels']
-    samp_rate = audio_cfg['sample_rate']
-    record_secs = audio_cfg['record_seconds']
-    chunk = audio_cfg['chunk_size']
-    audio = None
     try:
         py_audio_format = getattr(pyaudio, audio_cfg['format'])
     except AttributeError:
@@ -245,134 +683,1268 @@ def record_audio() -> Optional[str]:
         schedule_gui_update(set_status_message, "Error: Invalid audio format")
         return None
 
+    samp_rate = audio_cfg['sample_rate']
     selected_device_index = dev_index
-    if selected_device_index is None or not validate_device_channels(selected_device_index, chans):
+    if selected_device_index is None or not validate_device_channels(selected_device_index, chans, samp_rate):
         if selected_device_index is not None:
             logger.warning(f"Configured device index {selected_device_index} invalid/insufficient. Auto-selecting.")
         else:
             logger.info("No device index configured. Auto-selecting.")
         selected_device_index = select_input_device(chans)
         if selected_device_index is None:
+            get_device_registry().invalidate("no suitable input device")
             schedule_gui_update(set_status_message, "Error: No suitable audio device")
             return None
         else:
             config['audio']['device_index'] = selected_device_index
 
-    stream = None
+    buffer_seconds = max(audio_cfg.get('ring_buffer_seconds', 20), audio_cfg['record_seconds'] + 1)
+    engine = AudioCaptureEngine(selected_device_index, py_audio_format, chans,
+                                samp_rate, audio_cfg['chunk_size'], buffer_seconds,
+                                audio_cfg.get('capture_mode', 'callback'))
+    if not engine.start():
+        get_device_registry().invalidate(f"stream open failed on device {selected_device_index}")
+        schedule_gui_update(set_status_message, f"Error: {engine.last_error}")
+        return None
+    capture_engine = engine
+    return capture_engine
+
+def shutdown_capture_engine():
+    """Stops the capture engine if one is running."""
+    global capture_engine
+    if capture_engine:
+        capture_engine.stop()
+        capture_engine = None
+
+async def record_audio() -> Optional[bytes]:
+    """Takes the latest configured seconds of raw PCM audio from the capture engine without blocking the event loop."""
+    audio_cfg = config['audio']
+    record_secs = audio_cfg['record_seconds']
+    loop = asyncio.get_running_loop()
+
+    # Device probing and stream opening can block, so they run off the loop (only on first use or after failures).
+    engine = capture_engine if capture_engine and capture_engine.is_running() else await loop.run_in_executor(None, get_capture_engine)
+    if not engine:
+        return None
+
+    # Only waits after the engine (re)starts, until the ring buffer holds a full window. That is the only time the status
+    # says "Listening..."; a steady-state capture is instant and must not overwrite a recognition still in progress.
+    if engine.available_seconds() < record_secs:
+        schedule_gui_update(set_status_message, "Listening...")
+        chunk_queue = engine.subscribe(loop)
+        try:
+            while engine.available_seconds() < record_secs:
+                if not engine.is_running():
+                    logger.error(f"Capture engine stopped while filling buffer: {engine.last_error}")
+                    schedule_gui_update(set_status_message, f"Error: {engine.last_error or 'Audio capture stopped'}")
+                    return None
+                try:
+                    await asyncio.wait_for(chunk_queue.get(), timeout=1.0)
+                except asyncio.TimeoutError:
+                    continue
+        finally:
+            engine.unsubscribe(chunk_queue)
+
+    pcm_bytes = engine.get_latest(record_secs)
+    if not pcm_bytes:
+        logger.warning("No audio frames captured.")
+        schedule_gui_update(set_status_message, "Error: No audio captured")
+        return None
+    logger.info(f"Took latest {record_secs}s of audio from ring buffer ({len(pcm_bytes)} bytes).")
+    return pcm_bytes
+
+def pcm_to_wav_bytes(pcm_bytes: bytes, channels: int, sample_width: int, sample_rate: int) -> bytes:
+    """Wraps raw PCM frames in an in-memory WAV container."""
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wave_file_obj:
+        wave_file_obj.setnchannels(channels)
+        wave_file_obj.setsampwidth(sample_width)
+        wave_file_obj.setframerate(sample_rate)
+        wave_file_obj.writeframes(pcm_bytes)
+    return buffer.getvalue()
+
+def write_debug_wav(wav_bytes: bytes) -> Optional[str]:
+    """Writes WAV bytes to a temporary file (debug option only) and returns its path."""
     temp_wav_path: Optional[str] = None
     try:
-        # Use the globally defined TEMP_IMAGE_PATH for consistency?
-        # No, NamedTemporaryFile handles system temp dir better.
         with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as temp_f:
             temp_wav_path = temp_f.name
-        logger.debug(f"Created temporary WAV file: {temp_wav_path}")
-        logger.debug("Initializing PyAudio for recording...")
-        audio = pyaudio.PyAudio()
-        logger.debug(f"Opening audio stream on device {selected_device_index}...")
-        stream = audio.open(format=py_audio_format, rate=samp_rate, channels=chans,
-                            input_device_index=selected_device_index, input=True, frames_per_buffer=chunk)
-        logger.info(f"Recording started on device {selected_device_index}...")
-        frames = []
-        num_chunks_to_record = int((samp_rate / chunk) * record_secs)
-        for i in range(num_chunks_to_record):
-            if recognition_thread_stop_event.is_set():
-                logger.info("Recording stopped early by shutdown signal.")
-                schedule_gui_update(set_status_message, "Shutting down...")
-                safe_remove(temp_wav_path, "temp WAV on cancelled recording")
-                return None
-            try:
-                data = stream.read(chunk, exception_on_overflow=False)
-                frames.append(data)
-            except IOError as e:
-                if e.errno == pyaudio.paInputOverflowed:
-                    logger.warning("Input overflowed during recording.")
-                else:
-                    logger.error(f"IOError during stream read: {e}")
-                    schedule_gui_update(set_status_message, "Error: Audio input failed")
-                    safe_remove(temp_wav_path, "temp WAV on IO read error")
-                    return None
-            except Exception as e:
-                logger.exception(f"Unexpected error reading audio stream: {e}")
-                schedule_gui_update(set_status_message, "Error: Audio read failed")
-                safe_remove(temp_wav_path, "temp WAV on unexpected read error")
-                return None
-        logger.info(f"Recording finished ({len(frames)} chunks captured).")
+            temp_f.write(wav_bytes)
+        logger.info(f"Debug: audio saved to: {temp_wav_path}")
+        return temp_wav_path
     except OSError as e:
-        logger.error(f"OSError opening stream on device {selected_device_index}: {e}")
-        schedule_gui_update(set_status_message, f"Error: Cannot open device {selected_device_index}")
-        safe_remove(temp_wav_path, "temp WAV on stream open error")
+        logger.error(f"Error writing debug WAV file {temp_wav_path}: {e}")
+        safe_remove(temp_wav_path, "debug WAV on write error")
+        return None
+
+def build_recognition_input(pcm_bytes: bytes) -> Optional[Union[bytes, str]]:
+    """Returns in-memory WAV bytes for Shazam, or a temp WAV path when audio.debug_save_wav is enabled."""
+    engine = capture_engine
+    if not engine:
+        logger.error("No capture engine available to describe the PCM format.")
+        return None
+    try:
+        wav_bytes = pcm_to_wav_bytes(pcm_bytes, engine.channels, engine.sample_width, engine.sample_rate)
+    except wave.Error as e:
+        logger.error(f"Wave library error building in-memory WAV: {e}")
+        schedule_gui_update(set_status_message, "Error: Could not encode audio")
+        return None
+    if config['audio'].get('debug_save_wav', False):
+        return write_debug_wav(wav_bytes)
+    return wav_bytes
+
+
+# --- Audio Gate ---
+def pcm_to_mono_float(pcm_bytes: bytes, channels: int) -> np.ndarray:
+    """Converts interleaved int16 PCM to a mono float32 array in [-1, 1)."""
+    samples = np.frombuffer(pcm_bytes, dtype=np.int16).astype(np.float32) / 32768.0
+    if channels > 1:
+        samples = samples[:len(samples) - len(samples) % channels].reshape(-1, channels).mean(axis=1)
+    return samples
+
+def analyze_audio_levels(pcm_bytes: bytes, channels: int, sample_rate: int) -> Dict[str, float]:
+    """Computes RMS/peak levels (dBFS) and mean spectral flatness of int16 PCM frames."""
+    samples = pcm_to_mono_float(pcm_bytes, channels)
+    if samples.size == 0:
+        return {'rms_dbfs': -120.0, 'peak_dbfs': -120.0, 'spectral_flatness': 1.0}
+
+    rms = float(np.sqrt(np.mean(np.square(samples))))
+    peak = float(np.max(np.abs(samples)))
+
+    # Spectral flatness (geometric / arithmetic mean of the power spectrum) over 100 Hz - 8 kHz:
+    # close to 1 for broadband noise, low for tonal content such as music.
+    frame_size = 2048
+    num_frames = samples.size // frame_size
+    spectral_flatness = 1.0
+    if num_frames > 0:
+        frames = samples[:num_frames * frame_size].reshape(num_frames, frame_size) * np.hanning(frame_size).astype(np.float32)
+        power = np.square(np.abs(np.fft.rfft(frames, axis=1))) + 1e-12
+        freqs = np.fft.rfftfreq(frame_size, d=1.0 / sample_rate)
+        band = power[:, (freqs >= 100) & (freqs <= min(8000, sample_rate / 2))]
+        if band.size:
+            flatness_per_frame = np.exp(np.mean(np.log(band), axis=1)) / np.mean(band, axis=1)
+            spectral_flatness = float(np.mean(flatness_per_frame))
+
+    return {'rms_dbfs': 20 * math.log10(max(rms, 1e-6)),
+            'peak_dbfs': 20 * math.log10(max(peak, 1e-6)),
+            'spectral_flatness': spectral_flatness}
+
+def check_audio_gate(pcm_bytes: bytes) -> Optional[str]:
+    """Returns a skip reason ('silence' or 'noise') if the window is not worth sending to Shazam, otherwise None."""
+    gate_cfg = config['audio_gate']
+    engine = capture_engine
+    if not gate_cfg.get('enabled', True) or not engine:
+        return None
+    if engine.sample_width != 2:
+        logger.debug("Audio gate only supports 16-bit audio. Skipping gate.")
+        return None
+
+    increment_metric('gate_windows_checked')
+    levels = analyze_audio_levels(pcm_bytes, engine.channels, engine.sample_rate)
+    logger.debug(f"Audio levels: RMS={levels['rms_dbfs']:.1f} dBFS, Peak={levels['peak_dbfs']:.1f} dBFS, Flatness={levels['spectral_flatness']:.2f}")
+
+    if levels['rms_dbfs'] < gate_cfg['min_rms_dbfs'] or levels['peak_dbfs'] < gate_cfg['min_peak_dbfs']:
+        increment_metric('gate_skipped_silence')
+        logger.info(f"Audio gate: silence (RMS {levels['rms_dbfs']:.1f} dBFS, Peak {levels['peak_dbfs']:.1f} dBFS). Skipping recognition.")
+        return 'silence'
+    if levels['spectral_flatness'] > gate_cfg['max_spectral_flatness']:
+        increment_metric('gate_skipped_noise')
+        logger.info(f"Audio gate: noise only (flatness {levels['spectral_flatness']:.2f}). Skipping recognition.")
+        return 'noise'
+    increment_metric('gate_passed')
+    return None
+
+
+# --- Same Song Detection ---
+def compute_audio_fingerprint(pcm_bytes: bytes, channels: int, sample_rate: int) -> Optional[Dict[str, np.ndarray]]:
+    """Computes a compact local fingerprint: mean chroma (12 pitch classes) and a log-band spectral envelope."""
+    samples = pcm_to_mono_float(pcm_bytes, channels)
+    frame_size = 4096
+    hop = frame_size // 2
+    if samples.size < frame_size:
+        return None
+    num_frames = 1 + (samples.size - frame_size) // hop
+    frame_idx = np.arange(frame_size)[None, :] + hop * np.arange(num_frames)[:, None]
+    frames = samples[frame_idx] * np.hanning(frame_size).astype(np.float32)
+    magnitude = np.abs(np.fft.rfft(frames, axis=1))
+    freqs = np.fft.rfftfreq(frame_size, d=1.0 / sample_rate)
+
+    # Chroma: fold 65 Hz - 4 kHz onto the 12 pitch classes, normalise per frame, then average.
+    chroma_mask = (freqs >= 65) & (freqs <= min(4000, sample_rate / 2))
+    pitch_class = np.mod(np.round(12 * np.log2(freqs[chroma_mask] / 440.0)) + 9, 12).astype(int)
+    chroma = np.zeros((num_frames, 12), dtype=np.float32)
+    for pc in range(12):
+        chroma[:, pc] = magnitude[:, chroma_mask][:, pitch_class == pc].sum(axis=1)
+    chroma /= np.linalg.norm(chroma, axis=1, keepdims=True) + 1e-9
+    chroma_mean = chroma.mean(axis=0)
+
+    # Spectral envelope: mean log energy in 16 log-spaced bands between 100 Hz and 8 kHz.
+    edges = np.geomspace(100, min(8000, sample_rate / 2), 17)
+    band_index = np.digitize(freqs, edges) - 1
+    envelope = np.array([np.log1p(magnitude[:, band_index == b].mean()) if np.any(band_index == b) else 0.0
+                         for b in range(16)], dtype=np.float32)
+    envelope -= envelope.mean()
+
+    return {'chroma': chroma_mean, 'envelope': envelope}
+
+def fingerprint_similarity(a: Dict[str, np.ndarray], b: Dict[str, np.ndarray]) -> float:
+    """Cosine similarity of two fingerprints, taking the weaker of the chroma and envelope scores."""
+    def cosine(x: np.ndarray, y: np.ndarray) -> float:
+        denom = float(np.linalg.norm(x) * np.linalg.norm(y))
+        return float(np.dot(x, y)) / denom if denom > 0 else 0.0
+    return min(cosine(a['chroma'], b['chroma']), cosine(a['envelope'], b['envelope']))
+
+def is_same_song_still_playing(pcm_bytes: bytes) -> bool:
+    """True if the window closely matches the fingerprint saved at the last successful match and re-verify isn't due."""
+    same_cfg = config['same_song']
+    engine = capture_engine
+    if not same_cfg.get('enabled', True) or not same_song_reference or not engine or engine.sample_width != 2:
+        return False
+    elapsed = time.monotonic() - same_song_reference['verified_at']
+    if elapsed >= same_cfg['max_reverify_s']:
+        logger.info(f"Same-song check: {elapsed:.0f}s since last verified match. Re-verifying with Shazam.")
+        return False
+    fingerprint = compute_audio_fingerprint(pcm_bytes, engine.channels, engine.sample_rate)
+    if fingerprint is None:
+        return False
+    similarity = fingerprint_similarity(fingerprint, same_song_reference['fingerprint'])
+    if similarity >= same_cfg['similarity_threshold']:
+        increment_metric('same_song_skipped')
+        logger.info(f"Same-song check: similarity {similarity:.3f} to '{same_song_reference['title']}'. Skipping recognition.")
+        return True
+    increment_metric('same_song_changed')
+    logger.info(f"Same-song check: similarity {similarity:.3f} below threshold. Audio changed.")
+    return False
+
+def remember_song_fingerprint(pcm_bytes: bytes, title: str):
+    """Saves the fingerprint of a window that Shazam just identified, as the reference for later cycles."""
+    global same_song_reference
+    engine = capture_engine
+    if not config['same_song'].get('enabled', True) or not engine or engine.sample_width != 2:
+        return
+    fingerprint = compute_audio_fingerprint(pcm_bytes, engine.channels, engine.sample_rate)
+    if fingerprint is not None:
+        same_song_reference = {'fingerprint': fingerprint, 'title': title, 'verified_at': time.monotonic()}
+
+def clear_song_fingerprint():
+    """Forgets the reference fingerprint, so the next window always goes to Shazam."""
+    global same_song_reference
+    same_song_reference = None
+
+
+# --- Local Fingerprint Index ---
+FINGERPRINT_SAMPLE_RATE = 8000
+FINGERPRINT_FFT_SIZE = 1024
+FINGERPRINT_HOP = 256
+FINGERPRINT_FAN_OUT = 5
+FINGERPRINT_TARGET_ZONE_FRAMES = 32
+FINGERPRINT_PEAKS_PER_SECOND = 30
+
+def resample_mono(samples: np.ndarray, source_rate: int, target_rate: int) -> np.ndarray:
+    """Resamples a mono float array. Integer ratios average blocks (cheap low-pass), others interpolate."""
+    if source_rate == target_rate:
+        return samples
+    if source_rate % target_rate == 0:
+        factor = source_rate // target_rate
+        usable = samples.size - samples.size % factor
+        return samples[:usable].reshape(-1, factor).mean(axis=1)
+    target_length = int(samples.size * target_rate / source_rate)
+    source_times = np.arange(samples.size) / source_rate
+    return np.interp(np.arange(target_length) / target_rate, source_times, samples).astype(np.float32)
+
+def extract_landmark_hashes(pcm_bytes: bytes, channels: int, sample_rate: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Returns (hashes, anchor_frames) for constellation peak pairs in the audio, as uint32 arrays."""
+    samples = resample_mono(pcm_to_mono_float(pcm_bytes, channels), sample_rate, FINGERPRINT_SAMPLE_RATE)
+    empty = (np.empty(0, dtype=np.uint32), np.empty(0, dtype=np.uint32))
+    if samples.size < FINGERPRINT_FFT_SIZE:
+        return empty
+    num_frames = 1 + (samples.size - FINGERPRINT_FFT_SIZE) // FINGERPRINT_HOP
+    frame_idx = np.arange(FINGERPRINT_FFT_SIZE)[None, :] + FINGERPRINT_HOP * np.arange(num_frames)[:, None]
+    frames = samples[frame_idx] * np.hanning(FINGERPRINT_FFT_SIZE).astype(np.float32)
+    spectrum = np.log1p(np.abs(np.fft.rfft(frames, axis=1)) * 100.0)
+
+    # Constellation peaks: local maxima in a (time x frequency) neighbourhood, using a separable max filter.
+    sliding_max = np.lib.stride_tricks.sliding_window_view
+    freq_max = sliding_max(np.pad(spectrum, ((0, 0), (7, 7)), constant_values=-1.0), 15, axis=1).max(axis=2)
+    local_max = sliding_max(np.pad(freq_max, ((3, 3), (0, 0)), constant_values=-1.0), 7, axis=0).max(axis=2)
+    is_peak = (spectrum == local_max) & (spectrum > spectrum.mean() + spectrum.std())
+    is_peak[:, :2] = False # Ignore DC / sub-bass bins
+    peak_frames, peak_bins = np.nonzero(is_peak)
+    if peak_frames.size < 2:
+        return empty
+
+    # Keep the strongest peaks to bound hash density.
+    max_peaks = int(FINGERPRINT_PEAKS_PER_SECOND * samples.size / FINGERPRINT_SAMPLE_RATE)
+    if peak_frames.size > max_peaks:
+        strongest = np.argsort(spectrum[peak_frames, peak_bins])[-max_peaks:]
+        keep = np.sort(strongest)
+        peak_frames, peak_bins = peak_frames[keep], peak_bins[keep]
+
+    hashes = []
+    anchors = []
+    for i in range(peak_frames.size):
+        t1, f1 = peak_frames[i], peak_bins[i]
+        paired = 0
+        for j in range(i + 1, peak_frames.size):
+            dt = peak_frames[j] - t1
+            if dt <= 0:
+                continue
+            if dt > FINGERPRINT_TARGET_ZONE_FRAMES or paired >= FINGERPRINT_FAN_OUT:
+                break
+            hashes.append((int(f1) << 20) | (int(peak_bins[j]) << 10) | int(dt))
+            anchors.append(int(t1))
+            paired += 1
+    return np.array(hashes, dtype=np.uint32), np.array(anchors, dtype=np.uint32)
+
+class FingerprintIndex:
+    """On-disk landmark hash index of audio captured during successful recognitions, matched before calling Shazam.
+    Bounded to max_tracks, evicting the least recently added-to or matched track. Saved as append-only segment
+    files listed in tracks.json, compacted into one once they pile up or carry many evicted rows. New rows go into a
+    small sorted delta table, searched alongside the main one and merged into it at save time or when it grows."""
+    MAX_SEGMENTS = 8
+    DELTA_MAX_ROWS = 50000 # About 50 windows; merging copies the main table, so it is kept rare
+
+    def __init__(self, index_dir: Path, min_matches: int, max_hashes_per_track: int, max_tracks: int):
+        self.index_dir = index_dir
+        self.min_matches = min_matches
+        self.max_hashes_per_track = max_hashes_per_track
+        self.max_tracks = max(1, max_tracks)
+        self._tracks: Dict[int, Dict[str, Any]] = {} # track_id -> minimal Shazam track dict
+        self._track_ids_by_key: Dict[str, int] = {}
+        self._hash_counts: Dict[int, int] = {}
+        self._max_offsets: Dict[int, int] = {} # track_id -> highest stored anchor offset
+        self._last_used: Dict[int, float] = {} # track_id -> wall-clock time of last add or hit, for eviction
+        self._next_track_id = 0 # Never reused, so rows of an evicted track can't resurface under a new one
+        self._hashes = np.empty(0, dtype=np.uint32) # Sorted by hash for searchsorted lookups
+        self._track_col = np.empty(0, dtype=np.uint32)
+        self._offset_col = np.empty(0, dtype=np.uint32)
+        self._delta_hashes = np.empty(0, dtype=np.uint32) # Recently added rows, sorted by hash, not yet merged
+        self._delta_track_col = np.empty(0, dtype=np.uint32)
+        self._delta_offset_col = np.empty(0, dtype=np.uint32)
+        self._pending: List[Tuple[np.ndarray, np.ndarray, np.ndarray]] = [] # Rows added since the last save
+        self._segments: List[str] = [] # Segment files holding the saved rows
+        self._next_segment = 1
+        self._dead_rows = 0 # Saved rows belonging to evicted tracks
+        self._dirty = False
+        self._lock = threading.Lock()
+
+    @property
+    def tracks_path(self) -> Path:
+        return self.index_dir / 'tracks.json'
+
+    def load(self):
+        """Loads the index from disk, starting empty if it is missing or unreadable."""
+        if not self.tracks_path.is_file():
+            logger.info(f"No fingerprint index found in {self.index_dir}. Starting empty.")
+            return
+        try:
+            with open(self.tracks_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            if 'segments' not in meta: # Older single-file layout: tracks.json maps id -> track, rows in hashes.npz
+                meta = {'tracks': meta, 'segments': ['hashes.npz']}
+            tracks = {int(track_id): track for track_id, track in meta['tracks'].items()}
+            last_used = {int(track_id): float(used) for track_id, used in meta.get('last_used', {}).items()}
+            segments = [name for name in meta['segments'] if (self.index_dir / name).is_file()]
+            columns = ([], [], [])
+            for name in segments:
+                with np.load(self.index_dir / name) as data:
+                    for column, field in zip(columns, ('hashes', 'track_ids', 'offsets')):
+                        column.append(data[field])
+        except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+            logger.error(f"Could not load fingerprint index from {self.index_dir}: {e}. Starting empty.")
+            return
+        hashes, track_col, offset_col = (np.concatenate(column) if column else np.empty(0, dtype=np.uint32) for column in columns)
+        live = np.isin(track_col, np.fromiter(tracks, dtype=np.uint32, count=len(tracks)))
+        order = np.argsort(hashes[live], kind='stable')
+        hashes, track_col, offset_col = hashes[live][order], track_col[live][order], offset_col[live][order]
+        track_ids, inverse = np.unique(track_col, return_inverse=True)
+        max_offsets = np.zeros(track_ids.size, dtype=np.int64)
+        np.maximum.at(max_offsets, inverse, offset_col)
+        with self._lock:
+            self._tracks = tracks
+            self._track_ids_by_key = {track_key_for(track): track_id for track_id, track in tracks.items()}
+            self._hash_counts = dict(zip(track_ids.tolist(), np.bincount(inverse, minlength=track_ids.size).tolist()))
+            self._max_offsets = dict(zip(track_ids.tolist(), max_offsets.tolist()))
+            self._last_used = {track_id: last_used.get(track_id, 0.0) for track_id in tracks}
+            self._next_track_id = int(meta.get('next_track_id', max(tracks, default=-1) + 1))
+            self._hashes, self._track_col, self._offset_col = hashes, track_col, offset_col
+            self._segments = segments
+            self._next_segment = int(meta.get('next_segment', 1))
+            self._dead_rows = int(live.size - np.count_nonzero(live))
+        logger.info(f"Loaded fingerprint index: {len(tracks)} tracks, {hashes.size} hashes in {len(segments)} segments.")
+
+    def save(self):
+        """Writes the rows added since the last save as a new segment (or compacts all segments into one) and
+        rewrites tracks.json, if anything changed."""
+        with self._lock:
+            if not self._dirty:
+                return
+            self._merge_delta()
+            compact = len(self._segments) >= self.MAX_SEGMENTS or self._dead_rows * 4 > self._hashes.size
+            if compact:
+                rows = (self._hashes, self._track_col, self._offset_col)
+            elif self._pending:
+                rows = tuple(np.concatenate(column) for column in zip(*self._pending))
+            else:
+                rows = None # Only evictions since the last save; tracks.json alone drops their rows
+            pending, self._pending = self._pending, []
+            dead_rows = self._dead_rows
+            segment_name = f"hashes_{self._next_segment:06d}.npz"
+            self._next_segment += 1
+            old_segments = list(self._segments)
+            new_segments = [] if compact else list(old_segments)
+            if rows is not None and rows[0].size:
+                new_segments.append(segment_name)
+            meta = {'tracks': {str(track_id): track for track_id, track in self._tracks.items()},
+                    'last_used': {str(track_id): used for track_id, used in self._last_used.items()},
+                    'next_track_id': self._next_track_id, 'next_segment': self._next_segment, 'segments': new_segments}
+            self._dirty = False
+        segment_path = self.index_dir / segment_name
+        try:
+            self.index_dir.mkdir(parents=True, exist_ok=True)
+            if segment_name in new_segments:
+                with open(segment_path, 'wb') as f:
+                    np.savez(f, hashes=rows[0], track_ids=rows[1], offsets=rows[2])
+            temp_tracks_path = self.tracks_path.with_suffix('.json.tmp')
+            with open(temp_tracks_path, 'w', encoding='utf-8') as f:
+                json.dump(meta, f)
+            os.replace(temp_tracks_path, self.tracks_path)
+        except OSError as e:
+            logger.error(f"Could not save fingerprint index to {self.index_dir}: {e}")
+            safe_remove(segment_path, "partial fingerprint index segment")
+            with self._lock:
+                self._pending = pending + self._pending
+                self._dirty = True
+            return
+        with self._lock:
+            self._segments = new_segments
+            if compact:
+                self._dead_rows -= dead_rows
+        if compact:
+            for name in old_segments:
+                safe_remove(self.index_dir / name, "compacted fingerprint index segment")
+        written = rows[0].size if rows is not None else 0
+        logger.info(f"Saved fingerprint index: {len(meta['tracks'])} tracks, {written} hashes written"
+                    f"{' (compacted)' if compact else ''}, {len(new_segments)} segments.")
+
+    def add(self, track: Dict[str, Any], pcm_bytes: bytes, channels: int, sample_rate: int) -> int:
+        """Adds the hashes of an identified window under the given track. Returns the number of hashes added."""
+        hashes, anchors = extract_landmark_hashes(pcm_bytes, channels, sample_rate)
+        if hashes.size == 0:
+            return 0
+        key = track_key_for(track)
+        with self._lock:
+            track_id = self._track_ids_by_key.get(key)
+            if track_id is None:
+                track_id = self._next_track_id
+                self._next_track_id += 1
+                self._track_ids_by_key[key] = track_id
+                self._dirty = True
+            self._tracks[track_id] = {k: track.get(k) for k in ('key', 'title', 'subtitle', 'images')}
+            self._last_used[track_id] = time.time()
+            while len(self._tracks) > self.max_tracks:
+                self._evict(min((tid for tid in self._tracks if tid != track_id), key=self._last_used.get))
+            existing = self._hash_counts.get(track_id, 0)
+            room = self.max_hashes_per_track - existing
+            if room <= 0:
+                return 0
+            hashes, anchors = hashes[:room], anchors[:room]
+            # Offset each window past the track's existing anchors so separate windows don't align by accident.
+            base_offset = self._max_offsets[track_id] + FINGERPRINT_TARGET_ZONE_FRAMES * 4 if existing else 0
+            order = np.argsort(hashes, kind='stable')
+            new_hashes = hashes[order]
+            new_tracks = np.full(hashes.size, track_id, dtype=np.uint32)
+            new_offsets = (anchors + np.uint32(base_offset))[order]
+            # Insert into the small delta table; the main table is only copied when the delta is merged.
+            positions = np.searchsorted(self._delta_hashes, new_hashes, side='right')
+            self._delta_hashes = np.insert(self._delta_hashes, positions, new_hashes)
+            self._delta_track_col = np.insert(self._delta_track_col, positions, new_tracks)
+            self._delta_offset_col = np.insert(self._delta_offset_col, positions, new_offsets)
+            if self._delta_hashes.size > self.DELTA_MAX_ROWS:
+                self._merge_delta()
+            self._pending.append((new_hashes, new_tracks, new_offsets))
+            self._hash_counts[track_id] = existing + int(hashes.size)
+            self._max_offsets[track_id] = int(new_offsets.max())
+            self._dirty = True
+        return int(hashes.size)
+
+    def _merge_delta(self):
+        """Merges the sorted delta into the sorted main table in one pass. Caller holds the lock."""
+        if self._delta_hashes.size == 0:
+            return
+        start = time.perf_counter()
+        positions = np.searchsorted(self._hashes, self._delta_hashes, side='right')
+        self._hashes = np.insert(self._hashes, positions, self._delta_hashes)
+        self._track_col = np.insert(self._track_col, positions, self._delta_track_col)
+        self._offset_col = np.insert(self._offset_col, positions, self._delta_offset_col)
+        self._delta_hashes = self._delta_track_col = self._delta_offset_col = np.empty(0, dtype=np.uint32)
+        record_timing('fingerprint_index_merge', time.perf_counter() - start)
+
+    def _evict(self, track_id: int):
+        """Drops a track and its rows. Caller holds the lock."""
+        keep = self._track_col != track_id
+        self._hashes, self._track_col, self._offset_col = self._hashes[keep], self._track_col[keep], self._offset_col[keep]
+        keep = self._delta_track_col != track_id
+        self._delta_hashes = self._delta_hashes[keep]
+        self._delta_track_col, self._delta_offset_col = self._delta_track_col[keep], self._delta_offset_col[keep]
+        pending_removed = 0
+        kept_pending = []
+        for rows in self._pending:
+            pending_keep = rows[1] != track_id
+            pending_removed += rows[1].size - int(np.count_nonzero(pending_keep))
+            kept_pending.append(tuple(column[pending_keep] for column in rows))
+        self._pending = kept_pending
+        self._dead_rows += self._hash_counts.pop(track_id, 0) - pending_removed
+        track = self._tracks.pop(track_id)
+        self._track_ids_by_key.pop(track_key_for(track), None)
+        self._max_offsets.pop(track_id, None)
+        self._last_used.pop(track_id, None)
+        self._dirty = True
+        increment_metric('fingerprint_index_evictions')
+        logger.info(f"Fingerprint index full ({self.max_tracks} tracks): evicted '{track.get('title')}' by {track.get('subtitle')}.")
+
+    @staticmethod
+    def _votes(table: Tuple[np.ndarray, np.ndarray, np.ndarray], hashes: np.ndarray, anchors: np.ndarray) -> np.ndarray:
+        """One (track, time offset) vote per table row whose hash occurs in the query."""
+        db_hashes, db_tracks, db_offsets = table
+        left = np.searchsorted(db_hashes, hashes, side='left')
+        right = np.searchsorted(db_hashes, hashes, side='right')
+        counts = right - left
+        total = int(counts.sum())
+        if total == 0:
+            return np.empty(0, dtype=np.int64)
+        # Expand every [left, right) range into db row indices without a Python loop.
+        row_starts = np.repeat(left, counts)
+        within = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+        rows = row_starts + within
+        deltas = db_offsets[rows].astype(np.int64) - np.repeat(anchors, counts).astype(np.int64)
+        return db_tracks[rows].astype(np.int64) * (1 << 33) + (deltas + (1 << 32))
+
+    def match(self, pcm_bytes: bytes, channels: int, sample_rate: int) -> Optional[Tuple[Dict[str, Any], int]]:
+        """Returns (track, aligned_hash_count) for the best time-consistent match, or None below min_matches."""
+        hashes, anchors = extract_landmark_hashes(pcm_bytes, channels, sample_rate)
+        with self._lock:
+            tables = [(self._hashes, self._track_col, self._offset_col),
+                      (self._delta_hashes, self._delta_track_col, self._delta_offset_col)]
+            tracks = self._tracks
+        if hashes.size == 0:
+            return None
+        votes = np.concatenate([self._votes(table, hashes, anchors) for table in tables])
+        if votes.size == 0:
+            return None
+        unique_votes, vote_counts = np.unique(votes, return_counts=True)
+        best = int(np.argmax(vote_counts))
+        best_count = int(vote_counts[best])
+        if best_count < self.min_matches:
+            logger.debug(f"Fingerprint index: best alignment only {best_count} hashes (need {self.min_matches}).")
+            return None
+        track_id = int(unique_votes[best] // (1 << 33))
+        with self._lock:
+            if track_id in self._last_used:
+                self._last_used[track_id] = time.time()
+        return tracks.get(track_id), best_count
+
+def track_key_for(track: Dict[str, Any]) -> str:
+    """Stable key for a Shazam track dict: the Shazam track key if present, otherwise artist and title."""
+    return str(track.get('key') or f"{track.get('subtitle', '')}|{track.get('title', '')}")
+
+def get_fingerprint_index() -> Optional[FingerprintIndex]:
+    """Returns the shared fingerprint index, loading it from disk on first use. None if disabled.
+    Loading is heavy, so this blocks: call it from a worker thread (see load_fingerprint_index_in_background)."""
+    global fingerprint_index
+    index_cfg = config['fingerprint_index']
+    if not index_cfg.get('enabled', True):
+        return None
+    with fingerprint_index_lock:
+        if fingerprint_index is None:
+            index = FingerprintIndex(FINGERPRINT_INDEX_DIR_PATH, index_cfg['min_matches'],
+                                     index_cfg['max_hashes_per_track'], index_cfg['max_tracks'])
+            index.load()
+            fingerprint_index = index # Published only once loaded, so lookups never see a half-loaded index
+    return fingerprint_index
+
+def load_fingerprint_index_in_background():
+    """Starts loading the index on a worker thread at startup. Lookups are skipped until it is ready."""
+    if config['fingerprint_index'].get('enabled', True):
+        log_background_failure(asyncio.get_running_loop().run_in_executor(None, get_fingerprint_index), "fingerprint index load")
+
+async def match_local_fingerprint(pcm_bytes: bytes) -> Optional[Dict[str, Any]]:
+    """Looks the window up in the local index on a worker thread. Returns a Shazam-shaped result on a hit,
+    otherwise None (also while the index is still loading)."""
+    index = fingerprint_index
+    engine = capture_engine
+    if not index or not engine or engine.sample_width != 2:
+        return None
+    start = time.perf_counter()
+    match = await asyncio.get_running_loop().run_in_executor(None, index.match, pcm_bytes, engine.channels, engine.sample_rate)
+    record_timing('fingerprint_index_lookup', time.perf_counter() - start)
+    if not match or not match[0]:
+        increment_metric('fingerprint_index_misses')
+        return None
+    track, aligned = match
+    increment_metric('fingerprint_index_hits')
+    logger.info(f"Fingerprint index hit: '{track.get('title')}' by {track.get('subtitle')} ({aligned} aligned hashes).")
+    return {'track': dict(track), 'matches': [{}], 'source': 'local'}
+
+def add_to_fingerprint_index(track: Dict[str, Any], pcm_bytes: bytes):
+    """Adds an identified window to the local index and saves it at most every save_interval_s."""
+    global fingerprint_index_last_saved
+    index = get_fingerprint_index()
+    engine = capture_engine
+    if not index or not engine or engine.sample_width != 2:
+        return
+    added = index.add(track, pcm_bytes, engine.channels, engine.sample_rate)
+    logger.debug(f"Added {added} hashes for '{track.get('title')}' to fingerprint index.")
+    if time.monotonic() - fingerprint_index_last_saved >= config['fingerprint_index']['save_interval_s']:
+        index.save()
+        fingerprint_index_last_saved = time.monotonic()
+
+def save_fingerprint_index():
+    """Flushes pending index changes to disk (called at shutdown)."""
+    if fingerprint_index:
+        fingerprint_index.save()
+
+
+# --- Adaptive Polling ---
+def extract_track_timing(result: Dict[str, Any]) -> Tuple[Optional[float], Optional[float]]:
+    """Returns (match_offset_s, track_duration_s) from a Shazam result, each None if not present."""
+    offset_s = None
+    matches = result.get('matches') or []
+    if matches and isinstance(matches[0], dict) and isinstance(matches[0].get('offset'), (int, float)):
+        offset_s = float(matches[0]['offset'])
+
+    duration_s = None
+    track = result.get('track') or {}
+    for source, key, scale in ((track, 'durationInMillis', 0.001), (track, 'duration', 1.0),
+                               (matches[0] if matches and isinstance(matches[0], dict) else {}, 'duration', 1.0)):
+        value = source.get(key)
+        if isinstance(value, (int, float)) and value > 0:
+            duration_s = value * scale
+            if duration_s > 3600: # Some payloads give milliseconds under 'duration'
+                duration_s /= 1000.0
+            break
+    return offset_s, duration_s
+
+class RecognitionScheduler:
+    """Chooses the wait before the next cycle from where the current track is, instead of a fixed interval.
+    `changed` is set whenever that choice changes, so a capture already waiting can pick up the new interval."""
+
+    def __init__(self, base_interval_s: float, fast_interval_s: float, sparse_interval_s: float,
+                 near_end_window_s: float, assumed_track_length_s: float):
+        self.base_interval_s = base_interval_s
+        self.fast_interval_s = fast_interval_s
+        self.sparse_interval_s = sparse_interval_s
+        self.near_end_window_s = near_end_window_s
+        self.assumed_track_length_s = assumed_track_length_s
+        self._mode: Literal["base", "fast", "track"] = "base"
+        self._track_end_at: Optional[float] = None # time.monotonic() when the current track should end
+        self.changed = asyncio.Event()
+
+    def _update(self, mode: Literal["base", "fast", "track"], track_end_at: Optional[float]):
+        if (mode, track_end_at) != (self._mode, self._track_end_at):
+            self._mode, self._track_end_at = mode, track_end_at
+            self.changed.set()
+
+    def on_match(self, offset_s: Optional[float], duration_s: Optional[float], window_end_at: float, window_s: float):
+        """A track was identified from a window that finished capturing at window_end_at."""
+        if offset_s is None:
+            # Local matches carry no offset: keep any estimate for the same track, otherwise poll at the base rate.
+            if self._mode != "track":
+                self._update("base", self._track_end_at)
+            return
+        length_s = duration_s or self.assumed_track_length_s
+        remaining_s = max(0.0, length_s - (offset_s + window_s))
+        self._update("track", window_end_at + remaining_s)
+        logger.debug(f"Scheduler: track position {offset_s + window_s:.0f}s of {length_s:.0f}s{'' if duration_s else ' (assumed)'}, ~{remaining_s:.0f}s remaining.")
+
+    def on_no_match(self):
+        self._update("fast", None)
+
+    def on_idle(self):
+        """Silence or errors: nothing known is playing."""
+        self._update("base", None)
+
+    def next_interval(self) -> float:
+        if self._mode == "fast":
+            return self.fast_interval_s
+        if self._mode == "track" and self._track_end_at is not None:
+            remaining_s = self._track_end_at - time.monotonic()
+            if remaining_s <= self.near_end_window_s:
+                return self.fast_interval_s
+            return max(self.fast_interval_s, min(self.sparse_interval_s, remaining_s - self.near_end_window_s))
+        return self.base_interval_s
+
+def create_recognition_scheduler() -> RecognitionScheduler:
+    """Builds the scheduler from config; when disabled every interval is gui.update_interval_ms."""
+    base_interval_s = config['gui']['update_interval_ms'] / 1000.0
+    sched_cfg = config['scheduler']
+    if not sched_cfg.get('enabled', True):
+        return RecognitionScheduler(base_interval_s, base_interval_s, base_interval_s, 0, sched_cfg['assumed_track_length_s'])
+    return RecognitionScheduler(base_interval_s, sched_cfg['fast_interval_s'], sched_cfg['sparse_interval_s'],
+                                sched_cfg['near_end_window_s'], sched_cfg['assumed_track_length_s'])
+
+
+# --- Signature Generation ---
+SHAZAM_SAMPLE_RATE = 16000
+
+class SignaturePayload:
+    """Compact, picklable Shazam signature (data URI + duration in ms).
+
+    Duck-types as a shazamio DecodedMessage for Shazam.send_recognize_request(), which only calls encode_to_uri()
+    and computes the duration as number_samples / sample_rate_hz * 1000.
+    """
+    sample_rate_hz = 1000
+
+    def __init__(self, uri: str, samplems: int):
+        self.uri = uri
+        self.samplems = samplems
+        self.number_samples = samplems
+
+    def encode_to_uri(self) -> str:
+        return self.uri
+
+def pcm_to_shazam_samples(pcm_bytes: bytes, channels: int, sample_rate: int) -> np.ndarray:
+    """Converts captured int16 PCM to the 16 kHz mono int16 samples Shazam signatures are built from."""
+    samples = resample_mono(pcm_to_mono_float(pcm_bytes, channels), sample_rate, SHAZAM_SAMPLE_RATE)
+    return np.clip(samples * 32768.0, -32768, 32767).astype(np.int16)
+
+def generate_signature_in_worker(pcm_bytes: bytes, channels: int, sample_rate: int) -> Tuple[Optional[str], int, float]:
+    """Process-pool entry point: returns (signature_uri, samplems, seconds_taken). The URI is None for too little audio."""
+    start = time.perf_counter()
+    samples = pcm_to_shazam_samples(pcm_bytes, channels, sample_rate)
+    try:
+        from shazamio_core import Recognizer # Rust signature generator shipped with shazamio >= 0.6
+    except ImportError:
+        Recognizer = None
+
+    if Recognizer is not None:
+        wav_bytes = pcm_to_wav_bytes(samples.tobytes(), 1, 2, SHAZAM_SAMPLE_RATE)
+        async def run_core_recognizer():
+            return await Recognizer(segment_duration_seconds=12).recognize_bytes(value=wav_bytes)
+        signature = asyncio.run(run_core_recognizer())
+        return signature.signature.uri, int(signature.signature.samples), time.perf_counter() - start
+
+    from shazamio.algorithm import SignatureGenerator
+    generator = SignatureGenerator()
+    generator.feed_input(samples.tolist())
+    generator.MAX_TIME_SECONDS = 12
+    decoded = generator.get_next_signature()
+    if decoded is None:
+        return None, 0, time.perf_counter() - start
+    samplems = int(decoded.number_samples / decoded.sample_rate_hz * 1000)
+    return decoded.encode_to_uri(), samplems, time.perf_counter() - start
+
+def get_signature_executor() -> Optional[ProcessPoolExecutor]:
+    """Returns the shared signature process pool, creating it on first use. None if offloading is disabled."""
+    global signature_executor
+    sig_cfg = config['signature']
+    if not sig_cfg.get('offload', True):
+        return None
+    if signature_executor is None:
+        signature_executor = ProcessPoolExecutor(max_workers=max(1, sig_cfg['workers']))
+        logger.info(f"Started signature process pool with {max(1, sig_cfg['workers'])} worker(s).")
+    return signature_executor
+
+def shutdown_signature_executor():
+    global signature_executor
+    if signature_executor:
+        signature_executor.shutdown(wait=False, cancel_futures=True)
+        signature_executor = None
+
+async def generate_signature(pcm_bytes: bytes) -> Optional[SignaturePayload]:
+    """Computes the Shazam signature for a window on the process pool. None means fall back to Shazam.recognize()."""
+    executor = get_signature_executor()
+    engine = capture_engine
+    if not executor or not engine or engine.sample_width != 2:
         return None
+    wall_start = time.perf_counter()
+    try:
+        uri, samplems, worker_seconds = await asyncio.get_running_loop().run_in_executor(
+            executor, generate_signature_in_worker, pcm_bytes, engine.channels, engine.sample_rate)
     except Exception as e:
-        logger.exception(f"Unexpected error during recording: {e}")
-        schedule_gui_update(set_status_message, "Error: Recording failed")
-        safe_remove(temp_wav_path, "temp WAV on unexpected setup error")
+        # Includes BrokenProcessPool: drop the pool so the next window gets a fresh one.
+        logger.error(f"Signature generation in worker failed: {e}. Falling back to in-process recognition.")
+        shutdown_signature_executor()
         return None
-    finally:
-        if stream:
+    record_timing('signature_worker', worker_seconds)
+    record_timing('signature_total', time.perf_counter() - wall_start)
+    if not uri:
+        logger.warning("Not enough audio to generate a signature.")
+        return None
+    logger.info(f"Signature generated in {worker_seconds * 1000:.0f}ms on worker ({samplems}ms of audio, {len(uri)} chars).")
+    return SignaturePayload(uri, samplems)
+
+
+class StreamingSignatureBuilder:
+    """Builds Shazam signature peaks incrementally as 16 kHz audio arrives; any recent window can be encoded on demand."""
+    PASSES_PER_SECOND = SHAZAM_SAMPLE_RATE / 128 # SignatureGenerator emits one FFT pass per 128 samples
+
+    def __init__(self, max_window_s: float):
+        from shazamio.algorithm import SignatureGenerator
+        self.generator = SignatureGenerator()
+        self.max_passes = int(max_window_s * self.PASSES_PER_SECOND)
+        self.passes = 0
+        self._pending = np.empty(0, dtype=np.int16)
+        self._carry = np.empty(0, dtype=np.float32) # Resampling remainder between chunks
+
+    def feed_pcm(self, pcm_bytes: bytes, channels: int, sample_rate: int):
+        """Resamples a raw captured chunk to 16 kHz mono and feeds it."""
+        samples = np.concatenate([self._carry, pcm_to_mono_float(pcm_bytes, channels)])
+        if sample_rate % SHAZAM_SAMPLE_RATE == 0:
+            factor = sample_rate // SHAZAM_SAMPLE_RATE
+            usable = samples.size - samples.size % factor
+            self._carry = samples[usable:]
+            samples = samples[:usable]
+        resampled = resample_mono(samples, sample_rate, SHAZAM_SAMPLE_RATE)
+        self.feed(np.clip(resampled * 32768.0, -32768, 32767).astype(np.int16))
+
+    def feed(self, samples: np.ndarray):
+        """Processes whole 128-sample hops and keeps the remainder for the next call."""
+        data = np.concatenate([self._pending, samples]) if self._pending.size else samples
+        usable = data.size - data.size % 128
+        self._pending = data[usable:]
+        if usable:
+            self.generator.process_input(data[:usable].tolist())
+            self.passes += usable // 128
+            if self.passes % 1000 < usable // 128:
+                self._prune()
+
+    def _prune(self):
+        """Drops peaks that have slid out of the longest window."""
+        oldest_needed = self.passes - self.max_passes - 64
+        peaks_by_band = self.generator.next_signature.frequency_band_to_sound_peaks
+        for band in list(peaks_by_band):
+            peaks_by_band[band] = [peak for peak in peaks_by_band[band] if peak.fft_pass_number >= oldest_needed]
+
+    def available_seconds(self) -> float:
+        return self.passes / self.PASSES_PER_SECOND
+
+    def build_window(self, seconds: float) -> Optional[Tuple[str, int]]:
+        """Encodes the peaks of the latest `seconds` of audio as (signature_uri, samplems). None if not enough audio yet."""
+        from shazamio.signature import DecodedMessage, FrequencyPeak
+        window_passes = int(seconds * self.PASSES_PER_SECOND)
+        if window_passes <= 0 or self.passes < window_passes:
+            return None
+        start_pass = self.passes - window_passes
+        message = DecodedMessage()
+        message.sample_rate_hz = SHAZAM_SAMPLE_RATE
+        message.number_samples = window_passes * 128
+        message.frequency_band_to_sound_peaks = {}
+        for band, peaks in self.generator.next_signature.frequency_band_to_sound_peaks.items():
+            window_peaks = [FrequencyPeak(peak.fft_pass_number - start_pass, peak.peak_magnitude,
+                                          peak.corrected_peak_frequency_bin, peak.sample_rate_hz)
+                            for peak in peaks if peak.fft_pass_number >= start_pass]
+            if window_peaks:
+                message.frequency_band_to_sound_peaks[band] = window_peaks
+        return message.encode_to_uri(), int(message.number_samples * 1000 / SHAZAM_SAMPLE_RATE)
+
+def streaming_signature_worker_main(input_queue, output_queue, max_window_s: float):
+    """Streaming signature process: consumes ('chunk', pcm_bytes, channels, sample_rate) and answers
+    ('window', request_id, seconds)."""
+    try:
+        builder = StreamingSignatureBuilder(max_window_s)
+    except ImportError as e:
+        output_queue.put(('error', 0, str(e)))
+        return
+    while True:
+        message = input_queue.get()
+        if message[0] == 'chunk':
+            builder.feed_pcm(message[1], message[2], message[3])
+        elif message[0] == 'window':
+            _, request_id, seconds = message
+            start = time.perf_counter()
+            encoded = builder.build_window(seconds)
+            output_queue.put(('window', request_id, encoded, time.perf_counter() - start, builder.available_seconds()))
+        elif message[0] == 'stop':
+            return
+
+class StreamingSignatureService:
+    """Feeds captured chunks to a streaming signature process and requests encoded windows from it."""
+
+    def __init__(self, max_window_s: float):
+        self.max_window_s = max_window_s
+        self._input_queue = multiprocessing.Queue(maxsize=512)
+        self._output_queue = multiprocessing.Queue()
+        self._process: Optional[multiprocessing.Process] = None
+        self._request_id = 0
+        self.failed = False
+
+    def start(self):
+        self._process = multiprocessing.Process(target=streaming_signature_worker_main, name="StreamingSignature",
+                                                args=(self._input_queue, self._output_queue, self.max_window_s), daemon=True)
+        self._process.start()
+        audio_chunk_listeners.append(self.feed)
+        logger.info(f"Streaming signature process started (windows up to {self.max_window_s:g}s).")
+
+    def stop(self):
+        if self.feed in audio_chunk_listeners:
+            audio_chunk_listeners.remove(self.feed)
+        if self._process and self._process.is_alive():
             try:
-                if stream.is_active(): stream.stop_stream()
-                stream.close()
-                logger.debug("Audio stream stopped/closed.")
-            except Exception as e:
-                logger.warning(f"Error closing audio stream: {e}")
-        if audio:
-            audio.terminate()
-            logger.debug("PyAudio terminated after recording.")
-
-    if temp_wav_path and frames:
-        logger.debug(f"Writing {len(frames)} frames to {temp_wav_path}")
-        audio_instance_for_size = None
+                self._input_queue.put_nowait(('stop',))
+            except queue.Full:
+                pass
+            self._process.join(timeout=2.0)
+            if self._process.is_alive():
+                self._process.terminate()
+        self._process = None
+        logger.info("Streaming signature process stopped.")
+
+    def is_running(self) -> bool:
+        return not self.failed and self._process is not None and self._process.is_alive()
+
+    def feed(self, pcm_bytes: bytes, channels: int, sample_rate: int):
+        """Chunk listener: runs on the capture thread, so it only enqueues the raw chunk; the process resamples it."""
+        try:
+            self._input_queue.put_nowait(('chunk', bytes(pcm_bytes), channels, sample_rate))
+        except queue.Full:
+            increment_metric('streaming_signature_chunks_dropped')
+
+    def _wait_for_response(self, request_id: int, timeout_s: float) -> Optional[tuple]:
+        deadline = time.monotonic() + timeout_s
+        while time.monotonic() < deadline:
+            try:
+                response = self._output_queue.get(timeout=max(0.01, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+            if response[0] == 'error':
+                logger.error(f"Streaming signature process unavailable: {response[2]}")
+                self.failed = True
+                return None
+            if response[1] == request_id:
+                return response
+        return None
+
+    async def window(self, seconds: float) -> Optional[SignaturePayload]:
+        """Returns the signature of the latest `seconds` of audio, or None if not available yet."""
+        if not self.is_running():
+            return None
+        self._request_id += 1
+        request_id = self._request_id
         try:
-            audio_instance_for_size = pyaudio.PyAudio()
-            sample_width = audio_instance_for_size.get_sample_size(py_audio_format)
-
-            with wave.open(temp_wav_path, 'wb') as wave_file_obj:
-                 wave_file_obj.setnchannels(chans)
-                 wave_file_obj.setsampwidth(sample_width)
-                 wave_file_obj.setframerate(samp_rate)
-                 wave_file_obj.writeframes(b''.join(frames))
-            logger.info(f"Audio saved successfully to: {temp_wav_path}")
-            return temp_wav_path
-        except wave.Error as e:
-            logger.error(f"Wave library error writing WAV file {temp_wav_path}: {e}")
-            schedule_gui_update(set_status_message, "Error: Could not save audio")
-            safe_remove(temp_wav_path, "temp WAV on wave write error")
+            self._input_queue.put_nowait(('window', request_id, seconds))
+        except queue.Full:
+            logger.warning("Streaming signature process is not keeping up. Skipping streaming window.")
             return None
-        except Exception as e:
-             logger.exception(f"Unexpected error writing WAV file: {e}")
-             schedule_gui_update(set_status_message, "Error: Saving audio failed")
-             safe_remove(temp_wav_path, "temp WAV on unexpected write error")
-             return None
+        response = await asyncio.get_running_loop().run_in_executor(None, self._wait_for_response, request_id, 5.0)
+        if not response:
+            return None
+        _, _, encoded, encode_seconds, available_s = response
+        record_timing('signature_window_encode', encode_seconds)
+        if not encoded:
+            logger.debug(f"Streaming signature: {seconds:g}s window requested, only {available_s:.1f}s processed so far.")
+            return None
+        uri, samplems = encoded
+        logger.info(f"Streaming signature: {seconds:g}s window encoded in {encode_seconds * 1000:.0f}ms.")
+        return SignaturePayload(uri, samplems)
+
+def start_streaming_signature():
+    """Starts the streaming signature process if enabled in config."""
+    global streaming_signature
+    sig_cfg = config['signature']
+    if not sig_cfg.get('streaming', False) or streaming_signature:
+        return
+    streaming_signature = StreamingSignatureService(max(sig_cfg['window_ladder_s']))
+    streaming_signature.start()
+
+def stop_streaming_signature():
+    global streaming_signature
+    if streaming_signature:
+        streaming_signature.stop()
+        streaming_signature = None
+
+async def recognize_with_window_ladder() -> Tuple[Optional[Dict[str, Any]], bool]:
+    """Tries growing streaming windows (e.g. 2, 3, 4, 6 s) until one matches. Returns (result, attempted):
+    attempted is False if no streaming signature was available, so the caller should sign the window itself;
+    a None result with attempted True is a network failure."""
+    service = streaming_signature
+    if not service or not service.is_running():
+        return None, False
+    result = None
+    attempted = False
+    for seconds in config['signature']['window_ladder_s']:
+        payload = await service.window(seconds)
+        if payload is None:
+            continue
+        attempted = True
+        result = await recognize_song(None, payload)
+        if not result or result.get('track'):
+            break # Matched, or a network error that retries already handled
+        logger.info(f"No match with {seconds:g}s streaming window.")
+    return result, attempted
+
+
+# --- Retry Policy ---
+def retry_backoff_delay(attempt: int) -> float:
+    """Delay before retry number `attempt` (0-based): exponential from network.retry_delay, capped, with jitter."""
+    net_cfg = config['network']
+    ceiling = min(net_cfg['max_retry_delay'], net_cfg['retry_delay'] * (2 ** attempt))
+    return ceiling / 2 + random.uniform(0, ceiling / 2) # Equal jitter: never zero, never in lockstep
+
+class CircuitBreaker:
+    """Tracks consecutive failures of one remote service. After too many it goes offline and only lets a cheap probe
+    through once per cooldown (doubling up to a maximum) until the service answers again."""
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+    def __init__(self, name: str, failure_threshold: int, cooldown_s: float, max_cooldown_s: float):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.base_cooldown_s = cooldown_s
+        self.max_cooldown_s = max(cooldown_s, max_cooldown_s)
+        self.cooldown_s = cooldown_s
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.next_probe_at = 0.0
+        set_metric_gauge(f'breaker_{self.name}_open', 0)
+
+    @property
+    def is_offline(self) -> bool:
+        return self.state != self.CLOSED
+
+    def seconds_until_probe(self) -> float:
+        return max(0.0, self.next_probe_at - time.monotonic())
+
+    def status_text(self) -> str:
+        return f"Offline ({self.name.replace('_', ' ').title()}, retry in {self.seconds_until_probe():.0f}s)"
+
+    def _set_state(self, state: str):
+        if state == self.state:
+            return
+        logger.info(f"Circuit breaker '{self.name}': {self.state} -> {state}.")
+        self.state = state
+        set_metric_gauge(f'breaker_{self.name}_open', 0 if state == self.CLOSED else 1)
+        increment_metric(f'breaker_{self.name}_{state}')
+
+    async def allow_request(self, probe=None) -> bool:
+        """True if a real request may be sent now. While offline, runs `probe` (an awaitable factory returning bool)
+        when the cooldown has passed; without a probe the next request itself is the single trial attempt."""
+        if self.state == self.CLOSED:
+            return True
+        if time.monotonic() < self.next_probe_at:
+            return False # Still cooling down, or a trial is in flight (a lost trial frees up after one cooldown)
+        self.next_probe_at = time.monotonic() + self.cooldown_s
+        self._set_state(self.HALF_OPEN)
+        if probe is None:
+            return True
+        increment_metric(f'breaker_{self.name}_probes')
+        if await probe():
+            logger.info(f"Circuit breaker '{self.name}': probe succeeded.")
+            return True
+        self.record_failure()
+        return False
+
+    def record_success(self):
+        self.consecutive_failures = 0
+        self.cooldown_s = self.base_cooldown_s
+        self._set_state(self.CLOSED)
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        if self.state == self.HALF_OPEN:
+            self.cooldown_s = min(self.max_cooldown_s, self.cooldown_s * 2)
+        elif self.state == self.OPEN or self.consecutive_failures < self.failure_threshold:
+            return
+        self.next_probe_at = time.monotonic() + self.cooldown_s
+        self._set_state(self.OPEN)
+        logger.warning(f"Circuit breaker '{self.name}': offline after {self.consecutive_failures} consecutive failures. "
+                       f"Next probe in {self.cooldown_s:.0f}s.")
+
+def get_circuit_breaker(name: str) -> CircuitBreaker:
+    """Returns the shared breaker for a remote service, creating it from network config on first use."""
+    breaker = circuit_breakers.get(name)
+    if breaker is None:
+        net_cfg = config['network']
+        breaker = CircuitBreaker(name, net_cfg['breaker_failure_threshold'], net_cfg['breaker_cooldown_s'], net_cfg['breaker_max_cooldown_s'])
+        circuit_breakers[name] = breaker
+    return breaker
+
+
+# --- Recognition Client ---
+class PooledHTTPClient(HTTPClientInterface):
+    """shazamio HTTP client backed by one long-lived aiohttp session, so TCP/TLS connections and DNS are reused across cycles.
+    Also used on its own for cover-art downloads."""
+
+    def __init__(self, timeout_s: float, pool_size: int, keepalive_s: float, metric_prefix: str = "shazam", limit_per_host: int = 0):
+        self.timeout_s = timeout_s
+        self.pool_size = pool_size
+        self.limit_per_host = limit_per_host
+        self.keepalive_s = keepalive_s
+        self.metric_prefix = metric_prefix
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._warm_up_task: Optional[asyncio.Future] = None
+
+    def _build_trace_config(self) -> aiohttp.TraceConfig:
+        trace_config = aiohttp.TraceConfig()
+
+        async def on_connection_create_end(session, ctx, params):
+            ctx.connection_reused = False
+            increment_metric(f'{self.metric_prefix}_connections_created')
+
+        async def on_connection_reuseconn(session, ctx, params):
+            ctx.connection_reused = True
+            increment_metric(f'{self.metric_prefix}_connections_reused')
+
+        async def on_request_end(session, ctx, params):
+            logger.debug(f"{self.metric_prefix} HTTP {params.method} {params.url.host} -> {params.response.status} "
+                         f"(connection {'reused' if getattr(ctx, 'connection_reused', False) else 'new'})")
+
+        trace_config.on_connection_create_end.append(on_connection_create_end)
+        trace_config.on_connection_reuseconn.append(on_connection_reuseconn)
+        trace_config.on_request_end.append(on_request_end)
+        return trace_config
+
+    def get_session(self) -> aiohttp.ClientSession:
+        """Returns the pooled session, creating it on first use. Must be called on the loop that will use it."""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.pool_size, limit_per_host=self.limit_per_host,
+                                             keepalive_timeout=self.keepalive_s, ttl_dns_cache=300)
+            self._session = aiohttp.ClientSession(connector=connector,
+                                                  timeout=aiohttp.ClientTimeout(total=self.timeout_s),
+                                                  trace_configs=[self._build_trace_config()])
+        return self._session
+
+    async def request(self, method: str, url: str, *args, **kwargs) -> Union[List[Any], Dict[str, Any]]:
+        """Same contract as shazamio's HTTPClient.request, without its per-request session and internal retries."""
+        if method.upper() not in ("GET", "POST"):
+            raise ValueError(f"Unsupported HTTP method: {method}")
+        start = time.perf_counter()
+        try:
+            async with self.get_session().request(method.upper(), url, **kwargs) as resp:
+                return await resp.json(content_type=None)
+        finally:
+            record_timing(f'{self.metric_prefix}_http_request', time.perf_counter() - start)
+
+    async def download(self, url: str, max_bytes: int, stop_event: threading.Event,
+                       first_byte_event: Optional[asyncio.Event] = None,
+                       headers: Optional[Dict[str, str]] = None) -> Optional[Tuple[int, Any, bytes]]:
+        """Streams a response into memory over the pool, returning (status, response headers, body).
+        Returns None if stop_event was set mid-download. first_byte_event, if given, is set when the first body bytes arrive.
+        Raises aiohttp.ClientResponseError for HTTP errors, ValueError past max_bytes, and the usual aiohttp/timeout errors."""
+        start = time.perf_counter()
+        first_byte_seconds = None
+        body = bytearray()
+        try:
+            async with self.get_session().get(url, headers=headers) as resp:
+                resp.raise_for_status()
+                status, response_headers = resp.status, resp.headers
+                if resp.content_length is not None and resp.content_length > max_bytes:
+                    raise ValueError(f"Content-Length {resp.content_length} exceeds {max_bytes} bytes")
+                async for chunk in resp.content.iter_chunked(65536):
+                    if first_byte_seconds is None:
+                        first_byte_seconds = time.perf_counter() - start
+                        if first_byte_event is not None:
+                            first_byte_event.set()
+                    if stop_event.is_set():
+                        logger.info(f"{self.metric_prefix} download cancelled after {len(body)} bytes: {url}")
+                        return None
+                    body.extend(chunk)
+                    if len(body) > max_bytes:
+                        raise ValueError(f"Body exceeds {max_bytes} bytes")
         finally:
-            if audio_instance_for_size:
-                audio_instance_for_size.terminate()
+            elapsed = time.perf_counter() - start
+            record_timing(f'{self.metric_prefix}_download', elapsed)
+            if first_byte_seconds is not None:
+                record_timing(f'{self.metric_prefix}_first_byte', first_byte_seconds)
+            increment_metric(f'{self.metric_prefix}_download_bytes', len(body))
+            first_byte_text = f"{first_byte_seconds * 1000:.0f}ms" if first_byte_seconds is not None else "n/a"
+            logger.info(f"{self.metric_prefix} download: {len(body)} bytes in {elapsed * 1000:.0f}ms (first byte {first_byte_text}): {url}")
+        return status, response_headers, bytes(body)
+
+    async def warm_up(self, url: str) -> bool:
+        """Opens a pooled connection ahead of the first real request (DNS + TCP + TLS). Failures are only logged.
+        Also serves as the cheap reachability probe for the circuit breaker."""
+        start = time.perf_counter()
+        try:
+            async with self.get_session().head(url, allow_redirects=False) as resp:
+                logger.info(f"Warmed up {self.metric_prefix} connection to {url} (HTTP {resp.status}, {(time.perf_counter() - start) * 1000:.0f}ms).")
+                return True
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.warning(f"Could not warm up {self.metric_prefix} connection to {url}: {e}")
+            return False
 
-    else:
-        if not frames:
-            logger.warning("No audio frames captured.")
-            schedule_gui_update(set_status_message, "Error: No audio captured")
-        safe_remove(temp_wav_path, "temp WAV when no frames recorded")
-        return None
+    def start_warm_up(self, url: str):
+        """Runs warm_up() in the background so startup doesn't wait on the network."""
+        self._warm_up_task = asyncio.ensure_future(self.warm_up(url))
+
+    async def close(self):
+        if self._warm_up_task and not self._warm_up_task.done():
+            self._warm_up_task.cancel()
+        if self._session and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+async def start_shazam_client():
+    """Creates the recognition thread's long-lived Shazam client and warms its connection pool."""
+    global shazam_client, shazam_http_client
+    net_cfg = config['network']
+    shazam_http_client = PooledHTTPClient(net_cfg['timeout'], net_cfg['pool_size'], net_cfg['keepalive_s'])
+    try:
+        shazam_client = Shazam(http_client=shazam_http_client)
+    except TypeError:
+        logger.warning("This shazamio version does not accept a custom HTTP client. Connections will not be pooled.")
+        shazam_client = Shazam()
+        await shazam_http_client.close()
+        shazam_http_client = None
+        return
+    if net_cfg.get('warm_up', True):
+        shazam_http_client.start_warm_up(SHAZAM_WARM_UP_URL)
+
+async def stop_shazam_client():
+    """Closes the pooled connections of the recognition client."""
+    global shazam_client, shazam_http_client
+    if shazam_http_client:
+        await shazam_http_client.close()
+    shazam_http_client = None
+    shazam_client = None
+
+def start_cover_art_client():
+    """Creates the recognition thread's pooled cover-art downloader (keep-alive connections per CDN host)."""
+    global cover_art_http_client
+    net_cfg = config['network']
+    cover_art_http_client = PooledHTTPClient(net_cfg['timeout'], net_cfg['pool_size'], net_cfg['keepalive_s'],
+                                             metric_prefix="cover_art", limit_per_host=net_cfg['cover_art_per_host'])
+
+async def stop_cover_art_client():
+    global cover_art_http_client
+    if cover_art_http_client:
+        await cover_art_http_client.close()
+    cover_art_http_client = None
 
 
 # --- Song Recognition ---
 # ... (recognize_song function remains unchanged) ...
-async def recognize_song(wav_file_path: str) -> Optional[Dict[str, Any]]:
-    """Recognizes the song from a WAV file using Shazamio."""
-    schedule_gui_update(set_status_message, "Recognizing...")
-    shazam = Shazam()
+async def recognize_song(audio_data: Optional[Union[bytes, str]], signature: Optional[SignaturePayload] = None,
+                         announce: bool = True) -> Optional[Dict[str, Any]]:
+    """Recognizes the song using Shazamio: sends a precomputed signature if given, else in-memory WAV bytes (or a debug WAV path).
+    announce=False keeps the status line untouched (background replays)."""
+    set_status = (lambda message: schedule_gui_update(set_status_message, message)) if announce else (lambda message: None)
+    set_status("Recognizing...")
+    shazam = shazam_client or Shazam()
+    breaker = get_circuit_breaker('recognition')
+    probe = (lambda: shazam_http_client.warm_up(SHAZAM_WARM_UP_URL)) if shazam_http_client else None
     max_retries = config['network']['retry_count']
-    retry_delay = config['network']['retry_delay']
     result = None
     for attempt in range(max_retries):
         if recognition_thread_stop_event.is_set():
             logger.info("Recognition cancelled by shutdown.")
-            schedule_gui_update(set_status_message, "Shutting down...")
+            set_status("Shutting down...")
+            return None
+        if not await breaker.allow_request(probe):
+            logger.info(f"Recognition skipped: service offline (next probe in {breaker.seconds_until_probe():.0f}s).")
+            set_status(breaker.status_text())
             return None
         try:
             logger.info(f"Attempting recognition (Attempt {attempt + 1}/{max_retries})...")
-            new_result = await shazam.recognize(wav_file_path)
+            network_start = time.perf_counter()
+            if signature is not None:
+                new_result = await shazam.send_recognize_request(signature)
+            else:
+                new_result = await shazam.recognize(audio_data)
+            request_seconds = time.perf_counter() - network_start
+            record_timing('recognition_network' if signature is not None else 'recognition_in_process', request_seconds)
+            logger.info(f"Recognition request took {request_seconds * 1000:.0f}ms ({'signature upload' if signature is not None else 'in-process signature + upload'}).")
             logger.debug(f"Raw result (Attempt {attempt+1}): {new_result}")
+            breaker.record_success() # The service answered; result content is judged below
             if isinstance(new_result, dict):
                  if 'track' in new_result and new_result['track']:
                      logger.info("Recognition successful.")
@@ -394,52 +1966,223 @@ async def recognize_song(wav_file_path: str) -> Optional[Dict[str, Any]]:
                  logger.warning(f"Recognition attempt {attempt + 1} returned non-dict type: {type(new_result)}")
         except Exception as e:
             logger.error(f"Recognition attempt {attempt + 1} failed: {e}", exc_info=False)
+            breaker.record_failure()
+            if breaker.is_offline:
+                set_status(breaker.status_text())
+                result = None
+                break
             if attempt < max_retries - 1:
-                 schedule_gui_update(set_status_message, f"Retrying ({attempt+2})...")
+                 set_status(f"Retrying ({attempt+2})...")
                  try:
-                     await asyncio.sleep(retry_delay)
+                     await asyncio.sleep(retry_backoff_delay(attempt))
                  except asyncio.CancelledError:
                      logger.info("Asyncio sleep cancelled during retry.")
                      return None
             else:
                 logger.error("Max retry attempts reached for recognition.")
-                schedule_gui_update(set_status_message, "Error: Recognition failed")
+                set_status("Error: Recognition failed")
                 result = None
                 break
     return result
 
+# --- Offline Queue ---
+class OfflineRecognitionQueue:
+    """Bounded on-disk queue of recognition requests captured while the recognition service was offline.
+    One small JSON file per entry, named by capture time so directory order is replay order."""
+
+    def __init__(self, directory: Path, max_entries: int):
+        self.directory = directory
+        self.max_entries = max(1, max_entries)
+
+    def entry_paths(self) -> List[Path]:
+        if not self.directory.is_dir():
+            return []
+        return sorted(self.directory.glob('*.json'))
+
+    def __len__(self) -> int:
+        return len(self.entry_paths())
+
+    def put(self, entry: Dict[str, Any], captured_at: datetime) -> bool:
+        """Writes an entry, dropping the oldest ones beyond max_entries."""
+        entry = dict(entry, captured_at=captured_at.isoformat())
+        path = self.directory / f"{captured_at.strftime('%Y%m%d_%H%M%S_%f')}.json"
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            temp_path = path.with_suffix('.tmp')
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(entry, f)
+            os.replace(temp_path, path)
+        except (OSError, TypeError) as e:
+            logger.error(f"Could not write offline queue entry {path}: {e}")
+            return False
+        paths = self.entry_paths()
+        for old_path in paths[:max(0, len(paths) - self.max_entries)]:
+            if safe_remove(old_path, "oldest offline queue entry"):
+                increment_metric('offline_queue_dropped')
+        set_metric_gauge('offline_queue_depth', min(len(paths), self.max_entries))
+        return True
+
+    def peek_batch(self, batch_size: int) -> List[Tuple[Path, Dict[str, Any]]]:
+        """Returns up to batch_size of the oldest readable entries. Corrupt entries are removed."""
+        batch = []
+        for path in self.entry_paths():
+            if len(batch) >= batch_size:
+                break
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    batch.append((path, json.load(f)))
+            except (OSError, json.JSONDecodeError) as e:
+                logger.warning(f"Removing unreadable offline queue entry {path}: {e}")
+                safe_remove(path, "corrupt offline queue entry")
+        return batch
+
+    def remove(self, path: Path):
+        safe_remove(path, "replayed offline queue entry")
+        set_metric_gauge('offline_queue_depth', len(self))
+
+def get_offline_queue() -> Optional[OfflineRecognitionQueue]:
+    """Returns the shared offline queue, or None if disabled in config."""
+    global offline_queue
+    queue_cfg = config['offline_queue']
+    if not queue_cfg.get('enabled', True):
+        return None
+    if offline_queue is None:
+        offline_queue = OfflineRecognitionQueue(OFFLINE_QUEUE_DIR_PATH, queue_cfg['max_entries'])
+    return offline_queue
+
+def queue_offline_recognition(pcm_bytes: bytes, signature: Optional[SignaturePayload], window_end_at: float):
+    """Stores a window that could not be sent: its signature if one was computed, else a compressed 16 kHz mono snippet.
+    Consecutive windows of the same song are only queued once."""
+    global offline_queue_last_fingerprint
+    queue_store = get_offline_queue()
+    engine = capture_engine
+    if queue_store is None or not engine or engine.sample_width != 2:
+        return
+    fingerprint = compute_audio_fingerprint(pcm_bytes, engine.channels, engine.sample_rate)
+    if fingerprint is not None and offline_queue_last_fingerprint is not None:
+        if fingerprint_similarity(fingerprint, offline_queue_last_fingerprint) >= config['same_song']['similarity_threshold']:
+            logger.debug("Offline queue: window matches the last queued one. Not queuing again.")
+            return
+    if signature is not None:
+        entry = {'kind': 'signature', 'uri': signature.uri, 'samplems': signature.samplems}
+    else:
+        samples = pcm_to_shazam_samples(pcm_bytes, engine.channels, engine.sample_rate)
+        entry = {'kind': 'snippet', 'sample_rate': SHAZAM_SAMPLE_RATE,
+                 'data': base64.b64encode(zlib.compress(samples.tobytes())).decode('ascii')}
+    captured_at = datetime.now() - timedelta(seconds=max(0.0, time.monotonic() - window_end_at))
+    if queue_store.put(entry, captured_at):
+        offline_queue_last_fingerprint = fingerprint
+        increment_metric('offline_queue_enqueued')
+        logger.info(f"Recognition offline: queued {entry['kind']} captured at {captured_at.strftime('%H:%M:%S')} ({len(queue_store)} waiting).")
+
+async def replay_offline_entry(entry: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Sends one queued entry to Shazam. None means it could not be sent and should stay queued."""
+    if entry.get('kind') == 'signature':
+        return await recognize_song(None, SignaturePayload(entry['uri'], entry['samplems']), announce=False)
+    samples = zlib.decompress(base64.b64decode(entry['data']))
+    return await recognize_song(pcm_to_wav_bytes(samples, 1, 2, entry['sample_rate']), announce=False)
+
+
 # --- Image Processing ---
-# ... (create_blurred_background, calculate_brightness, create_placeholder_image functions remain unchanged) ...
-def create_blurred_background(source_image_path: Path, target_width: int, target_height: int, blur_strength: int) -> Optional[Image.Image]:
-    """Creates a blurred, cropped, and resized background image."""
-    if not source_image_path.is_file():
+# ... (create_blurred_background, create_placeholder_image functions remain unchanged) ...
+BLUR_TIERS = ('full', 'downsample', 'box') # Best quality first
+BLUR_WORKING_RADIUS = {'downsample': 3.0, 'box': 1.5} # Blur radius (px) at the reduced working size of each fast tier
+BLUR_BENCHMARK_MAX_WIDTH = 640 # Blur tiers are timed at output sizes no wider than this, then extrapolated
+VISUAL_PROFILE_SAMPLE_PX = 64 # Artwork is profiled from a copy this small
+VISUAL_PROFILE_GRID = 16 # Luminance grid cells per side
+TEXT_DARK_THRESHOLD = 0.55 # Text over regions brighter than this is drawn black, else white
+
+def load_artwork(source: Union[Path, bytes], min_size: Optional[Tuple[int, int]] = None, min_scale: Optional[float] = None,
+                 purpose: str = "artwork") -> Optional[Tuple[Image.Image, Tuple[int, int]]]:
+    """Decodes an artwork file (or downloaded bytes) to RGB and returns (image, original size). JPEGs are decoded straight
+    at 1/2, 1/4 or 1/8 scale (Image.draft) when the result still covers min_size and min_scale x the original size."""
+    start = time.perf_counter()
+    source_name = source.name if isinstance(source, Path) else f"{len(source)} downloaded bytes"
+    img = None
+    try:
+        img = Image.open(source if isinstance(source, Path) else io.BytesIO(source))
+        source_size = img.size
+        if img.format == 'JPEG' and (min_size or min_scale):
+            scale = min_scale or 0.0
+            requested = (max(min_size[0] if min_size else 1, math.ceil(source_size[0] * scale)),
+                         max(min_size[1] if min_size else 1, math.ceil(source_size[1] * scale)))
+            img.draft('RGB', requested)
+        img.load() # Also closes the file for single-frame images
+        peak_bytes = img.width * img.height * len(img.getbands())
+        image = img if img.mode == 'RGB' else img.convert('RGB')
+        if image is not img:
+            peak_bytes += image.width * image.height * 3
+    except Exception as e:
+        logger.error(f"Error decoding artwork {source_name}: {e.__class__.__name__}: {e}")
+        if img is not None:
+            img.close()
+        return None
+    elapsed = time.perf_counter() - start
+    reduction = source_size[0] // max(1, image.width)
+    record_timing('artwork_decode', elapsed)
+    increment_metric('artwork_decodes')
+    if reduction > 1:
+        increment_metric('artwork_decodes_reduced')
+    with metrics_lock:
+        metrics_gauges['artwork_decode_peak_bytes'] = max(metrics_gauges.get('artwork_decode_peak_bytes', 0), peak_bytes)
+    logger.info(f"Decoded {source_name} for {purpose}: {source_size[0]}x{source_size[1]} -> {image.width}x{image.height}"
+                f" (1/{reduction}) in {elapsed * 1000:.1f}ms, peak {peak_bytes / 1e6:.1f} MB")
+    return image, source_size
+
+class Artwork:
+    """Cover art carried in memory from download to display. `image` is the decoded RGB image (validated on download;
+    None for art that is already on disk until a render needs it), `digest` its content hash keying every render
+    cache, and `path` where the encoded bytes are (or will be, once the background write finishes). `data` holds
+    downloaded bytes until they are handed to the art store; `profile` is its VisualProfile once computed."""
+
+    def __init__(self, digest: str, image: Optional[Image.Image] = None, path: Optional[Path] = None,
+                 data: Optional[bytes] = None):
+        self.digest = digest
+        self.image = image
+        self.path = path
+        self.data = data
+        self.profile: Optional["VisualProfile"] = None
+
+    @classmethod
+    def from_bytes(cls, image_bytes: bytes) -> Optional["Artwork"]:
+        """Decodes downloaded bytes once. None if they are not a usable image."""
+        loaded = load_artwork(image_bytes, purpose="download")
+        if loaded is None:
+            return None
+        return cls(hashlib.sha256(image_bytes).hexdigest(), image=loaded[0], data=image_bytes)
+
+    @classmethod
+    def from_file(cls, path: Path) -> Optional["Artwork"]:
+        """Artwork already on disk (art store). Not decoded until a render cache misses."""
+        digest = artwork_digest(path)
+        return cls(digest, path=path) if digest else None
+
+def create_blurred_background(artwork: Artwork, target_width: int, target_height: int, blur_strength: int,
+                              tier: str = 'full') -> Optional[Image.Image]:
+    """Creates a blurred, cropped, and resized background image.
+    Tiers: 'full' blurs at source resolution and LANCZOS-resizes; 'downsample' blurs a small copy (where a large
+    radius is cheap) and upscales bilinearly; 'box' does the same at an even smaller size with two box-blur passes."""
+    if artwork.image is not None:
+        return blur_and_fit(artwork.image, target_width, target_height, blur_strength, tier)
+    source_image_path = artwork.path
+    if not source_image_path or not source_image_path.is_file():
         logger.warning(f"Source for blur does not exist: {source_image_path}")
         return None
     try:
-        logger.debug(f"Creating blurred background from: {source_image_path}")
-        with Image.open(source_image_path) as original_image:
-            original_image = original_image.convert('RGB')
-            blurred_image = original_image.filter(ImageFilter.GaussianBlur(blur_strength))
-            source_aspect = original_image.width / original_image.height
-            target_aspect = target_width / target_height
-
-            if target_aspect > source_aspect:
-                new_width = target_width
-                new_height = int(new_width / source_aspect)
-            else:
-                new_height = target_height
-                new_width = int(new_height * source_aspect)
-
-            blurred_image = blurred_image.resize((new_width, new_height), Image.Resampling.LANCZOS)
-
-            left = (new_width - target_width) // 2
-            top = (new_height - target_height) // 2
-            right = left + target_width
-            bottom = top + target_height
-
-            blurred_image = blurred_image.crop((left, top, right, bottom))
-            logger.debug("Blurred background created.")
-            return blurred_image
+        logger.debug(f"Creating blurred background ({tier}) from: {source_image_path}")
+        if tier == 'full' or blur_strength <= 0:
+            # Decode at least at the size that covers the target
+            loaded = load_artwork(source_image_path, min_size=(target_width, target_height), purpose="background")
+        else:
+            # The fast tiers only use a copy shrunk to the working blur radius
+            loaded = load_artwork(source_image_path, min_scale=min(1.0, BLUR_WORKING_RADIUS[tier] / blur_strength),
+                                  purpose="background")
+        if loaded is None:
+            return None
+        original_image, source_size = loaded
+        # blur_strength is in original pixels; keep the same look on a reduced decode
+        return blur_and_fit(original_image, target_width, target_height,
+                            blur_strength * original_image.width / source_size[0], tier)
     except FileNotFoundError:
         logger.error(f"FileNotFound during blur (should be caught earlier): {source_image_path}")
         return None
@@ -447,21 +2190,425 @@ def create_blurred_background(source_image_path: Path, target_width: int, target
         logger.exception(f"Error creating blurred background from {source_image_path}: {e}")
         return None
 
-def calculate_brightness(image: Image.Image) -> float:
-    """Calculates the perceived brightness of an image (0.0 to 1.0)."""
+def blur_and_fit(original_image: Image.Image, target_width: int, target_height: int, blur_strength: float, tier: str) -> Image.Image:
+    """Blurs an RGB image with the given tier and scales/crops it to cover the target size."""
+    source_aspect = original_image.width / original_image.height
+    target_aspect = target_width / target_height
+
+    if target_aspect > source_aspect:
+        new_width = target_width
+        new_height = int(new_width / source_aspect)
+    else:
+        new_height = target_height
+        new_width = int(new_height * source_aspect)
+
+    left = (new_width - target_width) // 2
+    top = (new_height - target_height) // 2
+
+    if tier == 'full' or blur_strength <= 0:
+        blurred_image = original_image.filter(ImageFilter.GaussianBlur(blur_strength))
+        blurred_image = blurred_image.resize((new_width, new_height), Image.Resampling.LANCZOS)
+        return blurred_image.crop((left, top, left + target_width, top + target_height))
+
+    # Shrink until the blur radius is a few pixels: same look, a fraction of the work.
+    working_radius = BLUR_WORKING_RADIUS[tier]
+    scale = min(1.0, working_radius / blur_strength)
+    working_size = (max(8, int(original_image.width * scale)), max(8, int(original_image.height * scale)))
+    working_image = original_image.reduce(max(1, int(1 / scale))) if scale < 0.5 else original_image
+    working_image = working_image.resize(working_size, Image.Resampling.BILINEAR)
+    radius = blur_strength * working_size[0] / original_image.width
+    if tier == 'box':
+        working_image = working_image.filter(ImageFilter.BoxBlur(radius)).filter(ImageFilter.BoxBlur(radius))
+    else:
+        working_image = working_image.filter(ImageFilter.GaussianBlur(radius))
+    # Crop in working coordinates and upscale only the visible part.
+    to_working = working_size[0] / new_width
+    crop_box = (left * to_working, top * to_working, (left + target_width) * to_working, (top + target_height) * to_working)
+    return working_image.resize((target_width, target_height), Image.Resampling.BILINEAR, box=crop_box)
+
+def benchmark_blur_tiers(target_width: int, target_height: int) -> Dict[str, float]:
+    """Estimates seconds per blur tier at the given output size without rendering it there (that alone can stall the GUI
+    for seconds at 4K). Each tier blurs a synthetic 1000px cover into an 8px and a BLUR_BENCHMARK_MAX_WIDTH output; blurring
+    the cover is a fixed cost and the resampling grows with output pixels, so the two timings extrapolate to the real size."""
+    sample = Image.effect_mandelbrot((1000, 1000), (-2.0, -1.5, 1.0, 1.5), 64).convert('RGB')
+    blur_strength = config['gui']['blur_strength']
+    scale = min(1.0, BLUR_BENCHMARK_MAX_WIDTH / target_width)
+    sizes = [(8, 8), (max(8, int(target_width * scale)), max(8, int(target_height * scale)))] # ~Fixed cost, then fixed + pixels
+    target_area = target_width * target_height
+    timings = {}
+    for tier in BLUR_TIERS:
+        measured = []
+        for width, height in sizes:
+            runs = []
+            for _ in range(3): # Best of three keeps scheduler noise out of the extrapolated slope
+                start = time.perf_counter()
+                blur_and_fit(sample, width, height, blur_strength, tier)
+                runs.append(time.perf_counter() - start)
+            measured.append((width * height, min(runs)))
+        (small_area, small_s), (large_area, large_s) = measured
+        per_pixel_s = max(0.0, (large_s - small_s) / max(1, large_area - small_area))
+        timings[tier] = large_s + per_pixel_s * max(0, target_area - large_area)
+        record_timing(f'blur_tier_{tier}', timings[tier])
+    logger.info(f"Blur tier estimate at {target_width}x{target_height} (timed up to {sizes[-1][0]}x{sizes[-1][1]}): "
+                + ", ".join(f"{tier}={seconds * 1000:.0f}ms" for tier, seconds in timings.items()))
+    return timings
+
+def get_blur_tier(target_width: int, target_height: int) -> str:
+    """The configured blur tier, or with gui.blur_quality 'auto' the best tier within gui.blur_budget_ms, benchmarked
+    at the size of the first background rendered and again only if a later one is larger (e.g. going fullscreen)."""
+    global selected_blur_tier, blur_benchmark_area
+    if selected_blur_tier and target_width * target_height <= blur_benchmark_area:
+        return selected_blur_tier
+    gui_cfg = config['gui']
+    quality = gui_cfg.get('blur_quality', 'auto')
+    if quality in BLUR_TIERS:
+        selected_blur_tier = quality
+        blur_benchmark_area = float('inf')
+    else:
+        if quality != 'auto':
+            logger.warning(f"Unknown gui.blur_quality '{quality}'. Using 'auto'.")
+        timings = benchmark_blur_tiers(target_width, target_height)
+        blur_benchmark_area = target_width * target_height
+        budget_s = gui_cfg['blur_budget_ms'] / 1000.0
+        selected_blur_tier = next((tier for tier in BLUR_TIERS if timings[tier] <= budget_s), BLUR_TIERS[-1])
+    logger.info(f"Using blur tier '{selected_blur_tier}'.")
+    return selected_blur_tier
+
+class VisualProfile:
+    """An artwork's look, computed once from a 64px copy: a coarse luminance grid (0..1, rows x cols), its dominant
+    colours, and the aspect ratio used to map window regions onto the cover-fitted background."""
+
+    def __init__(self, luminance: np.ndarray, dominant_colours: List[str], aspect: float):
+        self.luminance = luminance
+        self.dominant_colours = dominant_colours
+        self.aspect = aspect
+
+    @classmethod
+    def from_image(cls, image: Image.Image, colour_count: int = 3) -> "VisualProfile":
+        sample_px = VISUAL_PROFILE_SAMPLE_PX
+        reduce_factor = max(1, min(image.size) // (sample_px * 2))
+        small = image.reduce(reduce_factor) if reduce_factor > 1 else image
+        pixels = np.asarray(small.convert('RGB').resize((sample_px, sample_px), Image.Resampling.BOX), dtype=np.float32) / 255.0
+
+        cell = sample_px // VISUAL_PROFILE_GRID
+        luma = pixels @ np.array([0.299, 0.587, 0.114], dtype=np.float32)
+        grid = luma.reshape(VISUAL_PROFILE_GRID, cell, VISUAL_PROFILE_GRID, cell).mean(axis=(1, 3))
+
+        # Dominant colours: 3-bit-per-channel histogram, then the mean colour of each of the biggest bins
+        quantized = (pixels * 255).astype(np.uint8) >> 5
+        bins = ((quantized[..., 0].astype(np.int32) << 6) | (quantized[..., 1].astype(np.int32) << 3) | quantized[..., 2]).ravel()
+        counts = np.bincount(bins, minlength=512)
+        sums = np.stack([np.bincount(bins, weights=pixels[..., channel].ravel(), minlength=512) for channel in range(3)], axis=1)
+        top_bins = [b for b in np.argsort(counts)[::-1][:colour_count] if counts[b] > 0]
+        colours = ["#%02x%02x%02x" % tuple(int(round(v * 255)) for v in sums[b] / counts[b]) for b in top_bins]
+        return cls(grid, colours, image.width / image.height)
+
+    def region_luminance(self, window_width: int, window_height: int, box: Tuple[float, float, float, float]) -> float:
+        """Mean luminance under a window-space box (x0, y0, x1, y1), with the artwork scaled to cover the window."""
+        shown_height = max(window_width / self.aspect, window_height)
+        shown_width = shown_height * self.aspect
+        offset_x = (shown_width - window_width) / 2
+        offset_y = (shown_height - window_height) / 2
+        rows, cols = self.luminance.shape
+        x0, y0, x1, y1 = box
+        col_start = int(np.clip((x0 + offset_x) / shown_width * cols, 0, cols - 1))
+        col_end = int(np.clip(math.ceil((x1 + offset_x) / shown_width * cols), col_start + 1, cols))
+        row_start = int(np.clip((y0 + offset_y) / shown_height * rows, 0, rows - 1))
+        row_end = int(np.clip(math.ceil((y1 + offset_y) / shown_height * rows), row_start + 1, rows))
+        return float(self.luminance[row_start:row_end, col_start:col_end].mean())
+
+    def text_colour(self, window_width: int, window_height: int, box: Tuple[float, float, float, float]) -> str:
+        """Black or white, whichever reads better over that region of the background."""
+        return "black" if self.region_luminance(window_width, window_height, box) > TEXT_DARK_THRESHOLD else "white"
+
+def get_visual_profile(artwork: Artwork) -> Optional[VisualProfile]:
+    """The artwork's profile, computed on first use (or taken from its history entry). Cheap: works on a 1/8-scale decode."""
+    if artwork.profile is not None:
+        return artwork.profile
+    if artwork.path:
+        for history_item in list(song_history_list):
+            if history_item.get('visual_profile') is not None and history_item.get('image_path') == str(artwork.path):
+                artwork.profile = history_item['visual_profile']
+                return artwork.profile
+    start = time.perf_counter()
+    if artwork.image is not None:
+        source = artwork.image
+    else:
+        loaded = load_artwork(artwork.path, min_size=(VISUAL_PROFILE_SAMPLE_PX, VISUAL_PROFILE_SAMPLE_PX),
+                              purpose="visual profile") if artwork.path else None
+        if loaded is None:
+            return None
+        source = loaded[0]
+    artwork.profile = VisualProfile.from_image(source)
+    record_timing('visual_profile', time.perf_counter() - start)
+    logger.debug(f"Visual profile for {artwork.digest[:12]}: mean luminance {artwork.profile.luminance.mean():.2f}, "
+                 f"dominant colours {artwork.profile.dominant_colours}")
+    return artwork.profile
+
+class BlurRenderCache:
+    """LRU cache of rendered blurred backgrounds keyed by (artwork hash, width, height, blur strength, tier). Kept in
+    memory, with an optional on-disk tier that survives restarts."""
+
+    def __init__(self, memory_items: int, disk_dir: Optional[Path], disk_max_files: int):
+        self.memory_items = max(1, memory_items)
+        self.disk_dir = disk_dir
+        self.disk_max_files = disk_max_files
+        self._entries: "OrderedDict[Tuple[str, int, int, int, str], Image.Image]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _disk_path(self, key: Tuple[str, int, int, int, str]) -> Path:
+        digest, width, height, blur, tier = key
+        return self.disk_dir / f"{digest[:32]}_{width}x{height}_b{blur}_{tier}.jpg"
+
+    def get(self, key: Tuple[str, int, int, int, str]) -> Optional[Image.Image]:
+        with self._lock:
+            image = self._entries.get(key)
+            if image is not None:
+                self._entries.move_to_end(key)
+                increment_metric('render_cache_memory_hits')
+                return image
+        if self.disk_dir:
+            path = self._disk_path(key)
+            try:
+                with Image.open(path) as cached_image:
+                    image = cached_image.convert('RGB')
+                os.utime(path) # Marks recent use for disk LRU
+            except (OSError, ValueError):
+                return None
+            self._remember(key, image)
+            increment_metric('render_cache_disk_hits')
+            return image
+        return None
+
+    def _remember(self, key: Tuple[str, int, int, int, str], image: Image.Image):
+        with self._lock:
+            self._entries[key] = image
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.memory_items:
+                self._entries.popitem(last=False)
+
+    def put(self, key: Tuple[str, int, int, int, str], image: Image.Image):
+        self._remember(key, image)
+        if not self.disk_dir:
+            return
+        try:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+            image.save(self._disk_path(key), 'JPEG', quality=90) # Blurred, so JPEG artefacts don't show
+            files = sorted(self.disk_dir.glob('*.jpg'), key=lambda p: p.stat().st_mtime)
+            for old_path in files[:max(0, len(files) - self.disk_max_files)]:
+                safe_remove(old_path, "old render cache file")
+        except OSError as e:
+            logger.warning(f"Could not write render cache file: {e}")
+
+def artwork_digest(path: Path) -> Optional[str]:
+    """Content hash of an artwork file. Art store files are named by their hash; others are hashed once per version."""
+    if ART_STORE_FILENAME_RE.fullmatch(path.name):
+        return path.stem
     try:
-        grayscale_image = image.convert('L')
-        stat = ImageStat.Stat(grayscale_image)
-        brightness = stat.mean[0] / 255.0
-        logger.debug(f"Calculated brightness: {brightness:.2f}")
-        return brightness
-    except Exception as e:
-        logger.warning(f"Could not calculate brightness: {e}")
-        return 0.5
+        stat = path.stat()
+    except OSError:
+        return None
+    version = (str(path), stat.st_mtime_ns, stat.st_size)
+    digest = artwork_digest_memo.get(version)
+    if digest is None:
+        try:
+            digest = hashlib.sha256(path.read_bytes()).hexdigest()
+        except OSError:
+            return None
+        if len(artwork_digest_memo) >= 64:
+            artwork_digest_memo.clear()
+        artwork_digest_memo[version] = digest
+    return digest
+
+def get_blur_render_cache() -> BlurRenderCache:
+    global blur_render_cache
+    if blur_render_cache is None:
+        cache_cfg = config['render_cache']
+        blur_render_cache = BlurRenderCache(cache_cfg['memory_items'],
+                                            RENDER_CACHE_DIR_PATH if cache_cfg.get('disk_enabled', False) else None,
+                                            cache_cfg['disk_max_files'])
+    return blur_render_cache
+
+def get_blurred_background(artwork: Artwork, target_width: int, target_height: int, blur_strength: int) -> Optional[Image.Image]:
+    """Cached create_blurred_background(), rendering only on a cache miss."""
+    tier = get_blur_tier(target_width, target_height)
+    key = (artwork.digest, int(target_width), int(target_height), int(blur_strength), tier)
+    cache = get_blur_render_cache()
+    cached_image = cache.get(key)
+    if cached_image is not None:
+        logger.debug(f"Blurred background served from render cache ({target_width}x{target_height}).")
+        return cached_image
+    increment_metric('render_cache_misses')
+    start = time.perf_counter()
+    blurred_image = create_blurred_background(artwork, target_width, target_height, blur_strength, tier)
+    if blurred_image is None:
+        return None
+    record_timing(f'render_blurred_background_{tier}', time.perf_counter() - start)
+    cache.put(key, blurred_image)
+    return blurred_image
+
+class ArtPyramidCache:
+    """Decoded cover art kept per artwork hash as a mipmap pyramid: the original, then halved down to min_level_px.
+    A requested size is served from the smallest level at least that big, with one cheap final resize. Levels live
+    in memory under a byte budget (LRU by artwork). An optional disk tier keeps, as small JPEGs, only the levels that
+    requests made with disk=True (history thumbnails, reloaded at every start) were served from, so those never need
+    the full-size original decoded again. Larger levels stay memory-only."""
+
+    def __init__(self, memory_max_bytes: int, disk_dir: Optional[Path], disk_max_files: int, min_level_px: int):
+        self.memory_max_bytes = memory_max_bytes
+        self.disk_dir = disk_dir
+        self.disk_max_files = disk_max_files
+        self.min_level_px = max(16, min_level_px)
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict() # digest -> {'levels': {(w, h): image}, 'complete': bool, 'on_disk': set of sizes}
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _image_bytes(image: Image.Image) -> int:
+        return image.width * image.height * len(image.getbands())
+
+    @staticmethod
+    def _pick(levels: List[Image.Image], width: int, height: int, allow_upscale: bool) -> Optional[Image.Image]:
+        """Smallest level covering the requested size, or the largest one if upscaling is allowed."""
+        covering = [level for level in levels if level.width >= width and level.height >= height]
+        if covering:
+            return min(covering, key=lambda level: level.width * level.height)
+        if allow_upscale and levels:
+            return max(levels, key=lambda level: level.width * level.height)
+        return None
+
+    def _disk_path(self, digest: str, size: Tuple[int, int]) -> Path:
+        return self.disk_dir / f"{digest[:32]}_{size[0]}x{size[1]}.jpg"
 
-def create_placeholder_image(path: Path, width: int, height: int, text: str) -> bool:
-    """Creates a simple placeholder image with text and saves it."""
-    logger.info(f"Creating placeholder image at: {path}")
+    def _disk_levels(self, digest: str) -> Dict[Tuple[int, int], Path]:
+        levels = {}
+        for path in self.disk_dir.glob(f"{digest[:32]}_*.jpg"):
+            try:
+                width, height = (int(part) for part in path.stem.rsplit('_', 1)[1].split('x'))
+            except ValueError:
+                continue
+            levels[(width, height)] = path
+        return levels
+
+    def _remember(self, digest: str, images: List[Image.Image], complete: bool, on_disk: Tuple[Tuple[int, int], ...] = ()):
+        with self._lock:
+            entry = self._entries.setdefault(digest, {'levels': {}, 'complete': False, 'on_disk': set()})
+            entry['on_disk'].update(on_disk)
+            for image in images:
+                if image.size not in entry['levels']:
+                    entry['levels'][image.size] = image
+                    self._memory_bytes += self._image_bytes(image)
+            entry['complete'] = entry['complete'] or complete
+            self._entries.move_to_end(digest)
+            while self._memory_bytes > self.memory_max_bytes and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self._memory_bytes -= sum(self._image_bytes(image) for image in evicted['levels'].values())
+            set_metric_gauge('art_pyramid_memory_bytes', self._memory_bytes)
+
+    def _build(self, source: Union[Path, Image.Image], width: int, height: int) -> Optional[Tuple[List[Image.Image], bool]]:
+        """Halves an already decoded image, or decodes the file once at the smallest DCT scale still covering
+        width x height, down to min_level_px. Returns (levels, complete): complete means the top level is the original."""
+        start = time.perf_counter()
+        if isinstance(source, Image.Image):
+            level, source_size = source, source.size
+        else:
+            loaded = load_artwork(source, min_size=(width, height), purpose="art pyramid")
+            if loaded is None:
+                return None
+            level, source_size = loaded
+        levels = [level]
+        while min(level.size) // 2 >= self.min_level_px:
+            level = level.resize((level.width // 2, level.height // 2), Image.Resampling.LANCZOS)
+            levels.append(level)
+        record_timing('art_pyramid_build', time.perf_counter() - start)
+        return levels, levels[0].size == source_size
+
+    def _save_level(self, digest: str, level: Image.Image):
+        try:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+            level.save(self._disk_path(digest, level.size), 'JPEG', quality=92)
+            with self._lock:
+                entry = self._entries.get(digest)
+                if entry:
+                    entry['on_disk'].add(level.size)
+            files = sorted(self.disk_dir.glob('*.jpg'), key=lambda p: p.stat().st_mtime)
+            for old_path in files[:max(0, len(files) - self.disk_max_files)]:
+                safe_remove(old_path, "old art pyramid file")
+        except OSError as e:
+            logger.warning(f"Could not write art pyramid files: {e}")
+
+    def get(self, digest: str, source: Union[Path, Image.Image], width: int, height: int,
+            disk: bool = False) -> Optional[Image.Image]:
+        """The artwork at width x height, built from source (file or decoded image) on a miss. With disk=True the
+        disk tier is checked first and the level used is persisted. The result is shared with the cache, so callers
+        must not modify it."""
+        use_disk = disk and self.disk_dir is not None
+        needs_save = False
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry:
+                self._entries.move_to_end(digest)
+                level = self._pick(list(entry['levels'].values()), width, height, entry['complete'])
+                needs_save = level is not None and level.size not in entry['on_disk']
+            else:
+                level = None
+        if level is not None:
+            increment_metric('art_pyramid_memory_hits')
+        elif use_disk:
+            disk_levels = self._disk_levels(digest)
+            best_size = min((size for size in disk_levels if size[0] >= width and size[1] >= height),
+                            key=lambda size: size[0] * size[1], default=None)
+            if best_size:
+                try:
+                    with Image.open(disk_levels[best_size]) as cached_level:
+                        level = cached_level.convert('RGB')
+                    os.utime(disk_levels[best_size]) # Marks recent use for disk LRU
+                    self._remember(digest, [level], complete=False, on_disk=(best_size,))
+                    increment_metric('art_pyramid_disk_hits')
+                except (OSError, ValueError):
+                    level = None
+        if level is None:
+            built = self._build(source, width, height)
+            if not built:
+                return None
+            levels, complete = built
+            increment_metric('art_pyramid_builds')
+            # The original is already on disk as the artwork file itself
+            self._remember(digest, levels, complete, on_disk=(levels[0].size,) if complete else ())
+            level = self._pick(levels, width, height, allow_upscale=True)
+            needs_save = level.size != levels[0].size or not complete
+        if use_disk and needs_save:
+            self._save_level(digest, level)
+        if level.size == (width, height):
+            return level
+        return level.resize((width, height), Image.Resampling.LANCZOS)
+
+def get_art_pyramid_cache() -> Optional[ArtPyramidCache]:
+    global art_pyramid_cache
+    pyramid_cfg = config['art_pyramid']
+    if art_pyramid_cache is None and pyramid_cfg.get('enabled', True):
+        art_pyramid_cache = ArtPyramidCache(pyramid_cfg['memory_max_bytes'],
+                                            ART_PYRAMID_DIR_PATH if pyramid_cfg.get('disk_enabled', True) else None,
+                                            pyramid_cfg['disk_max_files'], pyramid_cfg['min_level_px'])
+    return art_pyramid_cache
+
+def get_artwork_image(artwork: Artwork, width: int, height: int, persist: bool = False) -> Optional[Image.Image]:
+    """Artwork resized to width x height, served from the art pyramid when enabled. persist=True (history thumbnails)
+    lets the pyramid keep the level on disk; never for artwork without a backing file. Do not modify the result."""
+    source = artwork.image if artwork.image is not None else artwork.path
+    if source is None:
+        return None
+    cache = get_art_pyramid_cache()
+    if cache:
+        return cache.get(artwork.digest, source, width, height, disk=persist and artwork.path is not None)
+    if isinstance(source, Path):
+        loaded = load_artwork(source, min_size=(width, height))
+        source = loaded[0] if loaded else None
+    return source.resize((width, height), Image.Resampling.LANCZOS) if source else None
+
+def create_placeholder_artwork(width: int, height: int, text: str) -> Optional[Artwork]:
+    """Creates a simple placeholder image with text, in memory."""
+    logger.info(f"Creating placeholder image: '{text}'")
     try:
         img = Image.new('RGB', (width, height), color = (70, 70, 70))
         d = ImageDraw.Draw(img)
@@ -489,15 +2636,155 @@ def create_placeholder_image(path: Path, width: int, height: int, text: str) ->
         except Exception as font_e:
             logger.error(f"Error during text drawing on placeholder: {font_e}")
             pass
-        img.save(path)
-        logger.info(f"Placeholder saved.")
-        return True
+        digest = hashlib.sha256(f"placeholder:{width}x{height}:{text}".encode('utf-8')).hexdigest()
+        return Artwork(digest, image=img)
     except Exception as e:
-        logger.error(f"Failed to create placeholder image {path}: {e}")
-        return False
+        logger.error(f"Failed to create placeholder image: {e}")
+        return None
+
+# --- Cover Art Store ---
+class ArtStore:
+    """Content-addressed cover-art store: one file per distinct image, named by its SHA-256, plus an index from
+    cover URL and track key to that hash. Repeat plays need no download and no copy."""
+    INDEX_FILENAME = 'art_index.json'
+    SAVE_DEBOUNCE_S = 30.0 # Mapping changes are written at most this often; prune() writes the rest at shutdown
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+        self._hashes_by_url: Dict[str, str] = {}
+        self._hashes_by_track: Dict[str, str] = {}
+        self._last_used: Dict[str, float] = {} # hash -> wall-clock time of last play, for pruning
+        self._dirty = False # A URL or track mapping changed since the last save
+        self._last_saved_at = float('-inf')
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock() # Serialises writers from the loop thread and executor threads
+
+    @property
+    def index_path(self) -> Path:
+        return self.directory / self.INDEX_FILENAME
+
+    def path_for(self, digest: str) -> Path:
+        return self.directory / f"{digest}.jpg"
+
+    def load(self):
+        """Loads the index, starting empty if it is missing or unreadable."""
+        if not self.index_path.is_file():
+            return
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            with self._lock:
+                self._hashes_by_url = dict(data.get('urls', {}))
+                self._hashes_by_track = dict(data.get('tracks', {}))
+                self._last_used = {digest: float(used) for digest, used in data.get('last_used', {}).items()}
+            logger.info(f"Loaded cover art index: {len(self._last_used)} images, {len(self._hashes_by_track)} tracks.")
+        except (OSError, ValueError, AttributeError) as e:
+            logger.error(f"Could not load cover art index {self.index_path}: {e}. Starting empty.")
+
+    def save(self):
+        """Writes the index via a unique temp file. Saves are serialised, so the newest snapshot lands last."""
+        with self._save_lock:
+            with self._lock:
+                data = {'urls': dict(self._hashes_by_url), 'tracks': dict(self._hashes_by_track), 'last_used': dict(self._last_used)}
+                self._dirty = False
+                self._last_saved_at = time.monotonic()
+            temp_path = None
+            try:
+                self.directory.mkdir(parents=True, exist_ok=True)
+                with tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=self.directory, prefix='art_index.',
+                                                 suffix='.tmp', delete=False) as f:
+                    temp_path = f.name
+                    json.dump(data, f)
+                os.replace(temp_path, self.index_path)
+            except OSError as e:
+                logger.error(f"Could not save cover art index {self.index_path}: {e}")
+                with self._lock:
+                    self._dirty = True
+                safe_remove(temp_path, "temporary cover art index")
+
+    def save_if_due(self):
+        """Saves the index if a mapping changed and the last save is at least SAVE_DEBOUNCE_S old."""
+        with self._lock:
+            due = self._dirty and time.monotonic() - self._last_saved_at >= self.SAVE_DEBOUNCE_S
+        if due:
+            self.save()
+
+    def lookup(self, urls: List[Optional[str]], track_key: Optional[str]) -> Optional[Path]:
+        """Returns the stored image for the track key or any of the URLs, or None. Stale entries are dropped."""
+        with self._lock:
+            candidates = [self._hashes_by_track.get(track_key)] if track_key else []
+            candidates += [self._hashes_by_url.get(url) for url in urls if url]
+        for digest in candidates:
+            if not digest:
+                continue
+            path = self.path_for(digest)
+            if path.is_file():
+                self.remember(digest, urls, track_key)
+                return path
+            logger.warning(f"Cover art index points to missing file {path}. Dropping it.")
+            self._forget(digest)
+        return None
+
+    def put(self, image_bytes: bytes, urls: List[Optional[str]], track_key: Optional[str]) -> Path:
+        """Stores an image (written only if its content is new) and indexes it. Raises OSError on write failure."""
+        digest = hashlib.sha256(image_bytes).hexdigest()
+        path = self.path_for(digest)
+        if path.is_file():
+            increment_metric('art_store_dedup_hits')
+        else:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            write_image_bytes(image_bytes, path)
+            increment_metric('art_store_images_written')
+            logger.info(f"Stored new cover art {path.name} ({len(image_bytes)} bytes).")
+        self.remember(digest, urls, track_key)
+        return path
+
+    def remember(self, digest: str, urls: List[Optional[str]], track_key: Optional[str]):
+        """Points the URLs and track key at an image and marks it as just used. Only a changed mapping
+        makes the index dirty; the recency update alone is written with the next save."""
+        with self._lock:
+            for url in urls:
+                if url and self._hashes_by_url.get(url) != digest:
+                    self._hashes_by_url[url] = digest
+                    self._dirty = True
+            if track_key and self._hashes_by_track.get(track_key) != digest:
+                self._hashes_by_track[track_key] = digest
+                self._dirty = True
+            if digest not in self._last_used:
+                self._dirty = True
+            self._last_used[digest] = time.time()
+        self.save_if_due()
+
+    def _forget(self, digest: str):
+        with self._lock:
+            self._hashes_by_url = {url: h for url, h in self._hashes_by_url.items() if h != digest}
+            self._hashes_by_track = {key: h for key, h in self._hashes_by_track.items() if h != digest}
+            self._last_used.pop(digest, None)
+            self._dirty = True
+
+    def prune(self, keep_count: int):
+        """Removes all but the keep_count most recently used images, and their index entries."""
+        with self._lock:
+            by_recency = sorted(self._last_used, key=self._last_used.get, reverse=True)
+        stale = by_recency[keep_count:]
+        removed = 0
+        for digest in stale:
+            self._forget(digest)
+            if safe_remove(self.path_for(digest), "unused cover art"):
+                removed += 1
+        self.save() # Also writes pending debounced mappings and play times at shutdown
+        logger.info(f"Cover art store: {len(by_recency) - len(stale)} images kept, {removed} removed.")
+
+def get_art_store() -> ArtStore:
+    """Returns the shared cover art store, loading its index on first use."""
+    global art_store
+    if art_store is None:
+        art_store = ArtStore(HISTORY_IMAGE_DIR_PATH)
+        art_store.load()
+    return art_store
+
 
 # --- History Management ---
-# ... (safe_remove, add_to_history, cleanup_old_history_images functions remain unchanged) ...
 def safe_remove(path: Optional[Union[str, Path]], description: str = "file") -> bool:
     """Safely remove a file or path, logging errors. Returns True if removed, False otherwise."""
     if path:
@@ -513,85 +2800,99 @@ def safe_remove(path: Optional[Union[str, Path]], description: str = "file") ->
     return False
 
 
-def add_to_history(track_title: str, artist_name: str, source_image_path: Path) -> Optional[str]:
-    """Adds song to history, copies art, manages list size, logs to file, returns persistent path."""
+def add_to_history(track_title: str, artist_name: str, persistent_image_path: str,
+                   visual_profile: Optional[VisualProfile] = None) -> Optional[str]:
+    """Adds song to history (pointing at its cover in the art store, with its visual profile), manages list size, logs to file, returns persistent path."""
     global song_history_list
     if song_history_list and song_history_list[0]['title'] == track_title and song_history_list[0]['artist'] == artist_name:
         logger.debug("Skipping adding duplicate song to history (same as last).")
         return song_history_list[0]['image_path']
 
     timestamp = datetime.now()
-    safe_title = "".join(c for c in track_title if c.isalnum() or c in (' ', '_')).rstrip()[:30].replace(' ', '_')
-    history_filename = f"{timestamp.strftime('%Y%m%d_%H%M%S')}_{safe_title}.jpg"
-    persistent_image_path_obj = HISTORY_IMAGE_DIR_PATH / history_filename
-    persistent_image_path_str = str(persistent_image_path_obj)
-
-    try:
-        if not source_image_path.is_file():
-            logger.error(f"Source for history copy does not exist: {source_image_path}")
-            return None
-
-        HISTORY_IMAGE_DIR_PATH.mkdir(parents=True, exist_ok=True)
-        shutil.copy2(source_image_path, persistent_image_path_obj)
-        logger.info(f"Copied cover art to history: {persistent_image_path_obj}")
-
-        history_entry = {'title': track_title, 'artist': artist_name, 'image_path': persistent_image_path_str, 'timestamp': timestamp}
-        song_history_list.insert(0, history_entry)
+    history_entry = {'title': track_title, 'artist': artist_name, 'image_path': persistent_image_path,
+                     'visual_profile': visual_profile, 'timestamp': timestamp}
+    song_history_list.insert(0, history_entry)
 
-        max_mem_items = config['gui']['history_max_items'] + 1
-        if len(song_history_list) > max_mem_items:
-            song_history_list = song_history_list[:max_mem_items]
-            logger.debug(f"Pruned in-memory history list to {max_mem_items} items.")
+    max_mem_items = config['gui']['history_max_items'] + 1
+    if len(song_history_list) > max_mem_items:
+        song_history_list = song_history_list[:max_mem_items]
+        logger.debug(f"Pruned in-memory history list to {max_mem_items} items.")
 
+    try:
+        log_timestamp = timestamp.strftime('%Y-%m-%d %H:%M')
+        log_line = f"{log_timestamp} | {artist_name} - {track_title}\n"
+        with open(SONG_HISTORY_FILE_PATH, 'a', encoding='utf-8') as f:
+            f.write(log_line)
+        logger.debug(f"Logged song to history file: {SONG_HISTORY_FILE_PATH}")
+    except IOError as e:
+        logger.error(f"Failed to write to song history file {SONG_HISTORY_FILE_PATH}: {e}")
+    except Exception as e:
+        logger.exception(f"Unexpected error writing to history log file: {e}")
 
-        try:
-            log_timestamp = timestamp.strftime('%Y-%m-%d %H:%M')
-            log_line = f"{log_timestamp} | {artist_name} - {track_title}\n"
-            with open(SONG_HISTORY_FILE_PATH, 'a', encoding='utf-8') as f:
-                f.write(log_line)
-            logger.debug(f"Logged song to history file: {SONG_HISTORY_FILE_PATH}")
-        except IOError as e:
-            logger.error(f"Failed to write to song history file {SONG_HISTORY_FILE_PATH}: {e}")
-        except Exception as e:
-            logger.exception(f"Unexpected error writing to history log file: {e}")
+    return persistent_image_path
 
-        return persistent_image_path_str
 
-    except FileNotFoundError:
-        logger.error(f"Source not found during history copy: {source_image_path}")
-        return None
-    except OSError as e:
-        logger.error(f"OS error during history image copy or directory creation: {e}")
-        safe_remove(persistent_image_path_obj, "history image on OS error")
-        return None
-    except Exception as e:
-        logger.exception(f"Error adding song to history/copying image {source_image_path}: {e}")
-        safe_remove(persistent_image_path_obj, "history image on error")
-        return None
+def parse_history_log_timestamp(line: str) -> Optional[datetime]:
+    """Timestamp of a song line ('YYYY-MM-DD HH:MM | ...') or a session separator line, else None."""
+    try:
+        if line.startswith("--- New Session Started: "):
+            return datetime.strptime(line[len("--- New Session Started: "):].rstrip(" -\n"), '%Y-%m-%d %H:%M:%S')
+        if " | " in line:
+            return datetime.strptime(line.split(" | ", 1)[0], '%Y-%m-%d %H:%M')
+    except ValueError:
+        pass
+    return None
+
+def insert_history_log_line(timestamp: datetime, artist_name: str, track_title: str):
+    """Inserts a song into the history log in timestamp order (used for songs identified after the fact).
+    Skips it if the song line just before it is the same song."""
+    log_line = f"{timestamp.strftime('%Y-%m-%d %H:%M')} | {artist_name} - {track_title}\n"
+    try:
+        lines = SONG_HISTORY_FILE_PATH.read_text(encoding='utf-8').splitlines(keepends=True) if SONG_HISTORY_FILE_PATH.is_file() else []
+        if lines and not lines[-1].endswith('\n'):
+            lines[-1] += '\n'
+        insert_at = 0
+        for index in range(len(lines) - 1, -1, -1):
+            line_time = parse_history_log_timestamp(lines[index])
+            if line_time is not None and line_time <= timestamp:
+                insert_at = index + 1
+                break
+        previous_song = next((line for line in reversed(lines[:insert_at]) if " | " in line), None)
+        if previous_song and previous_song.split(" | ", 1)[1] == log_line.split(" | ", 1)[1]:
+            logger.debug(f"Replayed song already logged just before {timestamp}: {track_title}")
+            return
+        lines.insert(insert_at, log_line)
+        temp_path = SONG_HISTORY_FILE_PATH.with_suffix('.tmp')
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.writelines(lines)
+        os.replace(temp_path, SONG_HISTORY_FILE_PATH)
+        logger.info(f"Inserted replayed song into history file at {timestamp.strftime('%Y-%m-%d %H:%M')}: {artist_name} - {track_title}")
+    except (IOError, OSError) as e:
+        logger.error(f"Failed to insert into song history file {SONG_HISTORY_FILE_PATH}: {e}")
 
 def cleanup_old_history_images(keep_count: int = 20):
-    """Removes oldest history images based on filename timestamp, keeping the specified number."""
-    logger.info(f"Running history cleanup, aiming to keep newest {keep_count} images based on filename.")
+    """Keeps the covers of the keep_count most recently played distinct artworks. Also clears out old
+    timestamp-named copies left by earlier versions, newest keep_count first."""
+    logger.info(f"Running history cleanup, aiming to keep newest {keep_count} images.")
     if not HISTORY_IMAGE_DIR_PATH.is_dir():
         logger.warning(f"History image directory not found: {HISTORY_IMAGE_DIR_PATH}. Skipping cleanup.")
         return
 
     try:
-        history_files = [
-            p for p in HISTORY_IMAGE_DIR_PATH.glob('*.jpg') if p.is_file()
+        get_art_store().prune(keep_count)
+        legacy_files = [
+            p for p in HISTORY_IMAGE_DIR_PATH.glob('*.jpg') if p.is_file() and not ART_STORE_FILENAME_RE.fullmatch(p.name)
         ]
-        history_files.sort(key=lambda p: p.name, reverse=True)
+        legacy_files.sort(key=lambda p: p.name, reverse=True)
 
-        if len(history_files) > keep_count:
-            files_to_remove = history_files[keep_count:]
-            logger.info(f"Found {len(history_files)} history images. Removing {len(files_to_remove)} oldest ones.")
+        if len(legacy_files) > keep_count:
+            files_to_remove = legacy_files[keep_count:]
+            logger.info(f"Found {len(legacy_files)} legacy history images. Removing {len(files_to_remove)} oldest ones.")
             removed_count = 0
             for file_path in files_to_remove:
                 if safe_remove(file_path, "old history image during cleanup"):
                     removed_count += 1
-            logger.info(f"History cleanup finished. Successfully removed {removed_count} images.")
-        else:
-            logger.info(f"Found {len(history_files)} history images. No cleanup needed (Keep count: {keep_count}).")
+            logger.info(f"Legacy history cleanup finished. Successfully removed {removed_count} images.")
 
     except OSError as e:
         logger.error(f"OS Error during history cleanup scan in {HISTORY_IMAGE_DIR_PATH}: {e}")
@@ -620,7 +2921,7 @@ def save_last_state(title: str, artist: str, persistent_image_path: Optional[str
 
 def load_last_state() -> bool:
     """Loads the last state if available and valid."""
-    global last_track_title, last_artist_name, last_persistent_image_path, current_status_message
+    global last_track_title, last_artist_name, last_persistent_image_path, current_status_message, current_artwork
     if not LAST_STATE_FILE_PATH.is_file():
         logger.info("No previous state file found.")
         return False
@@ -644,16 +2945,12 @@ def load_last_state() -> bool:
         img_path_str = state.get('persistent_image_path')
         if img_path_str:
             img_path = Path(img_path_str)
-            if img_path.is_file():
-                try:
-                    shutil.copy2(img_path, IMAGE_PATH)
-                    logger.info(f"Restored active image '{IMAGE_PATH}' from persistent state: {img_path}")
-                    last_persistent_image_path = img_path_str
-                    image_restored = True
-                except Exception as e:
-                    logger.error(f"Failed to copy image from last state {img_path} to {IMAGE_PATH}: {e}")
-                    safe_remove(IMAGE_PATH, "failed restore image copy")
-                    last_persistent_image_path = None
+            restored_artwork = Artwork.from_file(img_path) if img_path.is_file() else None
+            if restored_artwork:
+                current_artwork = restored_artwork
+                logger.info(f"Restored active image from persistent state: {img_path}")
+                last_persistent_image_path = img_path_str
+                image_restored = True
             else:
                 logger.warning(f"Image path in last state file not found: {img_path}. Active image may be missing.")
                 last_persistent_image_path = None
@@ -661,8 +2958,8 @@ def load_last_state() -> bool:
              logger.info("Persistent image path null/missing in last state file. Active image may be missing.")
              last_persistent_image_path = None
 
-        if not IMAGE_PATH.is_file():
-            create_placeholder_image(IMAGE_PATH, 300, 300, "Image Unavailable")
+        if current_artwork is None:
+            current_artwork = create_placeholder_artwork(300, 300, "Image Unavailable")
 
         if text_loaded:
             if image_restored:
@@ -713,8 +3010,257 @@ def update_status_display_text():
         except tk.TclError:
              pass
 
-def update_images() -> Dict[str, Any]:
-    """ Redraws main elements (BG, Cover Art, Text), returns layout info. """
+# --- Render Preparation ---
+def compute_main_layout(window_width: int, window_height: int, is_fullscreen: bool) -> Dict[str, Any]:
+    """Cover square geometry and font sizes for a window size. Pure arithmetic, so safe off the Tk thread."""
+    gui_cfg = config['gui']
+    border_ratio = gui_cfg['border_size_ratio']
+    border_px = int(min(window_width, window_height) * border_ratio)
+    square_size = max(MIN_WINDOW_WIDTH * 0.2, min(window_width, window_height) - 2 * border_px)
+
+    square_x = window_width // 2 # Always center horizontally
+
+    # Adjust vertical position based on aspect ratio
+    if window_height > window_width: # Portrait or tall window
+        target_square_y = int(window_height * 0.35) # Target center higher up (35%)
+    else: # Landscape or square window
+        target_square_y = int(window_height * 0.46) # Default slightly-above-center
+
+    # Ensure minimum top padding
+    min_top_padding = gui_cfg.get('history_y_offset', 20)
+    min_allowed_square_y = min_top_padding + (square_size / 2)
+    square_y = max(target_square_y, int(min_allowed_square_y))
+
+    base_font_size = gui_cfg['base_font_size']
+    scale_factor = 0.045
+    upper_clamp = 32
+    min_clamp = 8
+    main_font_size = max(min_clamp, min(upper_clamp, int(square_size * scale_factor * (base_font_size / 10)))) if square_size > 0 else min_clamp + 2
+    if not is_fullscreen and main_font_size > min_clamp + 1:
+        main_font_size = max(min_clamp, main_font_size - 1)
+    status_font_ratio = gui_cfg['status_font_size_ratio']
+    status_font_size = max(5, min(30, int(main_font_size * status_font_ratio * 0.5)))
+    history_font_size = max(6, min(20, int(main_font_size * gui_cfg['history_font_size_ratio'])))
+
+    return {'window_width': window_width, 'window_height': window_height, 'is_fullscreen': is_fullscreen,
+            'square_size': square_size, 'square_x': square_x, 'square_y': square_y,
+            'main_font_size': main_font_size, 'status_font_size': status_font_size, 'history_font_size': history_font_size}
+
+def get_history_fonts(font_size: int) -> Tuple[Any, Any, float, float]:
+    """History (italic, bold) fonts, their line height, and the ~3 line text block height used for spacing. Tk thread only."""
+    try:
+        history_font_italic = tkFont.Font(family="Arial", size=font_size, slant="italic")
+        history_font_bold = tkFont.Font(family="Arial", size=font_size, weight="bold")
+        history_line_height = history_font_bold.metrics("linespace")
+    except tk.TclError:
+        logger.warning("tkFont failed for history fonts.")
+        history_font_italic = ("Arial", font_size, "italic")
+        history_font_bold = ("Arial", font_size, "bold")
+        history_line_height = font_size * 1.3
+    # Height estimate for layout based on ~3 lines text (for spacing between items)
+    text_block_height_for_spacing = (history_line_height * 2.8) + 4
+    return history_font_italic, history_font_bold, history_line_height, text_block_height_for_spacing
+
+def compute_history_art_size(layout_info: Dict[str, Any], text_block_height_for_spacing: float) -> int:
+    """History thumbnail size: the configured size, or ~3 text lines tall in fullscreen Left mode."""
+    gui_cfg = config['gui']
+    art_size_config = gui_cfg['history_art_size']
+    # Check conditions for Left mode *before* deciding final art size
+    temp_available_width_left = max(0, (layout_info['square_x'] - layout_info['square_size'] // 2)
+                                    - gui_cfg['history_x_offset'] - gui_cfg['layout_side_min_buffer'])
+    temp_available_height_side = max(0, layout_info['window_height'] - 2 * gui_cfg['history_y_offset'])
+    temp_history_entry_height = max(art_size_config, text_block_height_for_spacing) + gui_cfg['history_item_padding']
+    is_potentially_left_mode = (temp_available_width_left >= gui_cfg['history_min_side_width'] and
+                               temp_available_height_side >= temp_history_entry_height)
+    if is_potentially_left_mode and layout_info.get('is_fullscreen', False):
+        return int(text_block_height_for_spacing) # Use ~3 lines height
+    return art_size_config
+
+def load_history_thumbnail(image_path_str: Optional[str], size: int) -> Optional[Image.Image]:
+    """Decodes one history cover and resizes it to a size x size thumbnail."""
+    if not image_path_str:
+        logger.warning("History item missing image path.")
+        return None
+    img_path = Path(image_path_str)
+    if not img_path.is_file():
+        logger.warning(f"History image file missing: {img_path}")
+        return None
+    try:
+        artwork = Artwork.from_file(img_path)
+        return get_artwork_image(artwork, size, size, persist=True) if artwork else None
+    except Exception as e:
+        logger.exception(f"Error loading history image {img_path}: {e}")
+        return None
+
+def build_render_request() -> Optional[Dict[str, Any]]:
+    """Snapshots everything a frame depends on (window size, artwork, history covers). Runs on the Tk thread."""
+    if not root or not canvas or not root.winfo_exists():
+        return None
+    try:
+        window_width = root.winfo_width()
+        window_height = root.winfo_height()
+        is_fullscreen = bool(root.attributes("-fullscreen"))
+    except tk.TclError:
+        logger.warning("build_render_request: Error getting window dimensions or attributes.")
+        return None
+    logger.debug(f"Window dims: {window_width}x{window_height}, Fullscreen: {is_fullscreen}")
+    if window_width < 1 or window_height < 1:
+        logger.warning(f"Window dimensions too small ({window_width}x{window_height}). Using minimums.")
+        window_width = max(MIN_WINDOW_WIDTH, window_width)
+        window_height = max(MIN_WINDOW_HEIGHT, window_height)
+
+    gui_cfg = config['gui']
+    layout = compute_main_layout(window_width, window_height, is_fullscreen)
+    _, _, _, text_block_height = get_history_fonts(max(5, layout['history_font_size'] - 1))
+    history_items = song_history_list[1 : gui_cfg['history_max_items'] + 1]
+    return {'layout': layout,
+            'artwork': current_artwork,
+            'blur_strength': gui_cfg['blur_strength'],
+            'history_paths': [item.get('image_path') for item in history_items],
+            'history_art_size': compute_history_art_size(layout, text_block_height)}
+
+def prepare_render_frame(request: Dict[str, Any]) -> Dict[str, Any]:
+    """Does a frame's pixel work: blurred background, square cover and history thumbnails as PIL images, plus the
+    artwork's visual profile. Safe off the Tk thread; only PhotoImage creation is left for the Tk thread."""
+    start = time.perf_counter()
+    layout = request['layout']
+    artwork = request['artwork']
+    frame = {'request': request, 'artwork_found': artwork is not None,
+             'background': None, 'profile': None, 'square': None, 'thumbnails': {}}
+
+    if artwork:
+        try:
+            frame['profile'] = get_visual_profile(artwork)
+            frame['background'] = get_blurred_background(artwork, layout['window_width'], layout['window_height'],
+                                                         request['blur_strength'])
+            if frame['background'] is None:
+                logger.warning("Failed to create blurred background image.")
+        except Exception as e:
+            logger.exception(f"Error processing background image: {e}")
+        try:
+            square_size = int(layout['square_size'])
+            frame['square'] = get_artwork_image(artwork, square_size, square_size)
+        except Exception as e:
+            logger.exception(f"Error loading/processing main cover art image {artwork.path or artwork.digest[:12]}: {e}")
+    else:
+        logger.warning("No artwork to display.")
+
+    for image_path_str in request['history_paths']:
+        if image_path_str not in frame['thumbnails']:
+            frame['thumbnails'][image_path_str] = load_history_thumbnail(image_path_str, request['history_art_size'])
+
+    record_timing('render_prepare', time.perf_counter() - start)
+    return frame
+
+class RenderPreparer:
+    """Worker thread that turns render requests into frames and hands them to the Tk thread. Only the newest
+    pending request is kept, so a burst of resize events or track changes prepares a single frame."""
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._pending: Optional[Dict[str, Any]] = None
+        self._stopped = False
+        self._thread: Optional[threading.Thread] = None
+        self.latest_generation = 0
+
+    def start(self):
+        if self.is_running():
+            return
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name="RenderPrepThread", daemon=True)
+        self._thread.start()
+        logger.info("Render preparation thread started.")
+
+    def stop(self, timeout: float = 2.0):
+        with self._condition:
+            self._stopped = True
+            self._pending = None
+            self._condition.notify()
+        if self._thread:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def submit(self, request: Dict[str, Any]):
+        with self._condition:
+            self.latest_generation += 1
+            request['generation'] = self.latest_generation
+            if self._pending is not None:
+                increment_metric('render_requests_coalesced')
+            self._pending = request
+            self._condition.notify()
+
+    def is_current(self, generation: Optional[int]) -> bool:
+        return generation is None or generation == self.latest_generation
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while self._pending is None and not self._stopped:
+                    self._condition.wait()
+                if self._stopped:
+                    return
+                request, self._pending = self._pending, None
+            if not self.is_current(request['generation']):
+                continue
+            try:
+                frame = prepare_render_frame(request)
+            except Exception as e:
+                logger.exception(f"Error preparing render frame: {e}")
+                continue
+            schedule_gui_update(apply_render_frame, frame)
+
+def start_render_preparer():
+    global render_preparer
+    if render_preparer is None:
+        render_preparer = RenderPreparer()
+    render_preparer.start()
+
+def stop_render_preparer():
+    global render_preparer
+    if render_preparer:
+        render_preparer.stop()
+        render_preparer = None
+
+def apply_render_frame(frame: Dict[str, Any]):
+    """Shows a prepared frame unless a newer request superseded it. Must run on Tk thread."""
+    if render_preparer and not render_preparer.is_current(frame['request'].get('generation')):
+        increment_metric('render_frames_superseded')
+        logger.debug("Skipping superseded render frame.")
+        return
+    if not root or not canvas or not root.winfo_exists():
+        logger.debug("Skip frame: GUI not ready.")
+        return
+    start = time.perf_counter()
+    try:
+        layout_info = update_images(frame)
+        redraw_history_display(layout_info, frame)
+        logger.debug("Full redraw complete.")
+    except tk.TclError as e:
+        logger.error(f"TclError during full redraw: {e}")
+    except Exception as e:
+        logger.exception(f"Unexpected error during full redraw: {e}")
+    record_timing('render_apply', time.perf_counter() - start)
+
+
+def text_region_color(layout_info: Dict[str, Any], text: str, font: Any, center_x: float, center_y: float,
+                      line_height: float, fallback_width: float) -> str:
+    """Text colour for a centred label, from the visual profile's luminance under the label's box. Tk thread only."""
+    profile = layout_info.get('visual_profile')
+    if profile is None:
+        return "white"
+    try:
+        text_width = font.measure(text) if isinstance(font, tkFont.Font) else fallback_width
+    except tk.TclError:
+        text_width = fallback_width
+    half_width = max(text_width, line_height) / 2
+    box = (center_x - half_width, center_y - line_height / 2, center_x + half_width, center_y + line_height / 2)
+    return profile.text_colour(layout_info['window_width'], layout_info['window_height'], box)
+
+def update_images(frame: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """ Shows a prepared frame's BG and cover art, places the text, returns layout info. Prepares inline if no frame. """
     global bg_photo_ref, square_photo_ref, coverart_item_id, title_label_id, artist_label_id, status_label_id
 
     layout_info = {'window_width': 0, 'window_height': 0, 'square_size': 0,
@@ -722,127 +3268,70 @@ def update_images() -> Dict[str, Any]:
                    'main_font_size': 10, 'status_font_size': 8, 'history_font_size': 7,
                    'text_color': 'white', 'is_fullscreen': False} # Add default for is_fullscreen
 
-    is_fullscreen = False
     if not root or not canvas or not root.winfo_exists():
         logger.warning("update_images: GUI not ready.")
         return layout_info
 
-    # Get dimensions and state
-    try:
-        window_width = root.winfo_width()
-        window_height = root.winfo_height()
-        is_fullscreen = root.attributes("-fullscreen")
-        logger.debug(f"Window dims: {window_width}x{window_height}, Fullscreen: {is_fullscreen}")
-        if window_width < 1 or window_height < 1:
-            logger.warning(f"Window dimensions too small ({window_width}x{window_height}). Using minimums.")
-            window_width = max(MIN_WINDOW_WIDTH, window_width)
-            window_height = max(MIN_WINDOW_HEIGHT, window_height)
-    except tk.TclError:
-        logger.warning("update_images: Error getting window dimensions or attributes.")
-        return layout_info
+    if frame is None:
+        request = build_render_request()
+        if request is None:
+            return layout_info
+        frame = prepare_render_frame(request)
 
-    layout_info.update({'window_width': window_width, 'window_height': window_height, 'is_fullscreen': is_fullscreen}) # Store fullscreen state
-    image_file_path = IMAGE_PATH
-    gui_cfg = config['gui'] # Get GUI config section
+    layout_info.update(frame['request']['layout'])
+    layout_info['visual_profile'] = frame['profile']
+    window_width = layout_info['window_width']
+    window_height = layout_info['window_height']
+    square_size = layout_info['square_size']
+    square_x = layout_info['square_x']
+    square_y = layout_info['square_y']
 
     # --- Background ---
-    brightness = 0.5
     try:
-        if image_file_path.is_file():
-            blurred_pil_image = create_blurred_background(
-                image_file_path, window_width, window_height, gui_cfg['blur_strength']
-            )
-            if blurred_pil_image:
-                brightness = calculate_brightness(blurred_pil_image)
-                bg_photo_ref = ImageTk.PhotoImage(blurred_pil_image)
-                canvas.delete("background")
-                canvas.create_image(0, 0, anchor=tk.NW, image=bg_photo_ref, tags=("background",))
-                canvas.tag_lower("background")
-                logger.debug("Background image updated and lowered.")
-            else:
-                logger.warning("Failed to create blurred background image.")
-                canvas.delete("background")
-                bg_photo_ref = None
+        if frame['background'] is not None:
+            bg_photo_ref = ImageTk.PhotoImage(frame['background'])
+            canvas.delete("background")
+            canvas.create_image(0, 0, anchor=tk.NW, image=bg_photo_ref, tags=("background",))
+            canvas.tag_lower("background")
+            logger.debug("Background image updated and lowered.")
         else:
-             logger.warning(f"Main image {image_file_path} not found for background.")
-             canvas.delete("background")
-             bg_photo_ref = None
-             canvas.config(bg="black")
+            canvas.delete("background")
+            bg_photo_ref = None
+            if not frame['artwork_found']:
+                canvas.config(bg="black")
+        if frame['profile'] and frame['profile'].dominant_colours:
+            canvas.config(bg=frame['profile'].dominant_colours[0]) # Shows in uncovered areas while resizing
     except Exception as e:
-        logger.exception(f"Error processing or setting background image: {e}")
+        logger.exception(f"Error setting background image: {e}")
         canvas.delete("background")
         bg_photo_ref = None
         canvas.config(bg="black")
 
-    layout_info['text_color'] = "black" if brightness > 0.55 else "white"
-
     # --- Main Square Cover Art ---
-    # Calculate square size first
-    border_ratio = gui_cfg['border_size_ratio']
-    border_px = int(min(window_width, window_height) * border_ratio)
-    square_size = max(MIN_WINDOW_WIDTH * 0.2, min(window_width, window_height) - 2 * border_px)
-    layout_info['square_size'] = square_size
-
-    square_x = window_width // 2 # Always center horizontally
-
-    # Adjust vertical position based on aspect ratio
-    if window_height > window_width: # Portrait or tall window
-        target_square_y = int(window_height * 0.35) # Target center higher up (35%)
-        logger.debug("Portrait aspect ratio detected, targeting higher position.")
-    else: # Landscape or square window
-        target_square_y = int(window_height * 0.46) # Default slightly-above-center
-        logger.debug("Landscape/Square aspect ratio detected, using standard positioning.")
-
-    # Ensure minimum top padding
-    min_top_padding = gui_cfg.get('history_y_offset', 20)
-    min_allowed_square_y = min_top_padding + (square_size / 2)
-    square_y = max(target_square_y, int(min_allowed_square_y))
-    logger.debug(f"Target Y: {target_square_y}, Min Allowed Y: {min_allowed_square_y:.0f}, Final Y: {square_y}")
-
-    # Now draw the image at the calculated position
-    if image_file_path.is_file():
+    if frame['square'] is not None:
         try:
-            with Image.open(image_file_path) as img_reopened:
-                square_pil_image = img_reopened.resize((int(square_size), int(square_size)), Image.Resampling.LANCZOS)
-                square_photo_ref = ImageTk.PhotoImage(square_pil_image)
-                layout_info.update({'square_x': square_x, 'square_y': square_y}) # Store final calculated values
-
-                if coverart_item_id:
-                    canvas.itemconfig(coverart_item_id, image=square_photo_ref)
-                    canvas.coords(coverart_item_id, square_x, square_y)
-                else:
-                    coverart_item_id = canvas.create_image(square_x, square_y, anchor=tk.CENTER, image=square_photo_ref, tags=("coverart",))
+            square_photo_ref = ImageTk.PhotoImage(frame['square'])
+            if coverart_item_id:
+                canvas.itemconfig(coverart_item_id, image=square_photo_ref)
+                canvas.coords(coverart_item_id, square_x, square_y)
+            else:
+                coverart_item_id = canvas.create_image(square_x, square_y, anchor=tk.CENTER, image=square_photo_ref, tags=("coverart",))
 
-                canvas.tag_raise(coverart_item_id)
-                logger.debug("Cover art updated.")
-        except FileNotFoundError:
-            logger.error(f"Image disappeared between check and open: {image_file_path}")
-            if coverart_item_id: canvas.delete(coverart_item_id); coverart_item_id = None
-            square_photo_ref = None
+            canvas.tag_raise(coverart_item_id)
+            logger.debug("Cover art updated.")
         except Exception as e:
-            logger.exception(f"Error loading/processing main cover art image {image_file_path}: {e}")
+            logger.exception(f"Error displaying main cover art: {e}")
             if coverart_item_id: canvas.delete(coverart_item_id); coverart_item_id = None
             square_photo_ref = None
     else:
          if coverart_item_id: canvas.delete(coverart_item_id); coverart_item_id = None
          square_photo_ref = None
-         logger.debug("No main image file, cover art not displayed.")
-         # square_size was already estimated above
+         logger.debug("No main cover art image, cover art not displayed.")
 
     # --- Text Labels ---
-    base_font_size = gui_cfg['base_font_size']
-    scale_factor = 0.045
-    upper_clamp = 32
-    min_clamp = 8
-    main_font_size = max(min_clamp, min(upper_clamp, int(square_size * scale_factor * (base_font_size / 10)))) if square_size > 0 else min_clamp + 2
-    if not is_fullscreen and main_font_size > min_clamp + 1:
-        main_font_size = max(min_clamp, main_font_size - 1)
-        logger.debug(f"Windowed mode: Adjusted main font size down to {main_font_size}")
-    status_font_ratio = gui_cfg['status_font_size_ratio']
-    status_font_size = max(5, min(30, int(main_font_size * status_font_ratio * 0.5)))
-    history_font_size = max(6, min(20, int(main_font_size * gui_cfg['history_font_size_ratio'])))
-    logger.debug(f"Final Font sizes: Main={main_font_size}, Status={status_font_size}, History={history_font_size} (Square Size={square_size:.0f})")
-    layout_info.update({'main_font_size': main_font_size, 'status_font_size': status_font_size, 'history_font_size': history_font_size})
+    main_font_size = layout_info['main_font_size']
+    status_font_size = layout_info['status_font_size']
+    logger.debug(f"Final Font sizes: Main={main_font_size}, Status={status_font_size}, History={layout_info['history_font_size']} (Square Size={square_size:.0f})")
 
     try:
         title_font_obj = tkFont.Font(family="Arial", size=main_font_size, slant="italic")
@@ -872,28 +3361,32 @@ def update_images() -> Dict[str, Any]:
 
     layout_info.update({'title_y': title_y, 'artist_y': artist_y, 'status_y': status_y}) # Store the final status_y
 
-    text_color = layout_info['text_color']
-    item_config_options = {'fill': text_color, 'anchor': tk.CENTER}
+    # Text colour per region, looked up in the artwork's luminance grid
+    title_color = text_region_color(layout_info, last_track_title, title_font_obj, window_width // 2, title_y, title_line_height, square_size)
+    artist_color = text_region_color(layout_info, last_artist_name, artist_font_obj, window_width // 2, artist_y, artist_line_height, square_size)
+    status_color = text_region_color(layout_info, current_status_message, status_font_obj, window_width // 2, status_y, status_line_height, square_size)
+    layout_info['text_color'] = title_color
+    item_config_options = {'anchor': tk.CENTER}
 
     # --- Create / Update Text Items ---
     try:
         if title_label_id:
             canvas.coords(title_label_id, window_width // 2, title_y)
-            canvas.itemconfigure(title_label_id, text=last_track_title, font=title_font_obj, fill=text_color)
+            canvas.itemconfigure(title_label_id, text=last_track_title, font=title_font_obj, fill=title_color)
         else:
-            title_label_id = canvas.create_text(window_width // 2, title_y, text=last_track_title, font=title_font_obj, tags=("main_text",), **item_config_options)
+            title_label_id = canvas.create_text(window_width // 2, title_y, text=last_track_title, font=title_font_obj, fill=title_color, tags=("main_text",), **item_config_options)
 
         if artist_label_id:
             canvas.coords(artist_label_id, window_width // 2, artist_y)
-            canvas.itemconfigure(artist_label_id, text=last_artist_name, font=artist_font_obj, fill=text_color)
+            canvas.itemconfigure(artist_label_id, text=last_artist_name, font=artist_font_obj, fill=artist_color)
         else:
-            artist_label_id = canvas.create_text(window_width // 2, artist_y, text=last_artist_name, font=artist_font_obj, tags=("main_text",), **item_config_options)
+            artist_label_id = canvas.create_text(window_width // 2, artist_y, text=last_artist_name, font=artist_font_obj, fill=artist_color, tags=("main_text",), **item_config_options)
 
         if status_label_id:
             canvas.coords(status_label_id, window_width // 2, status_y)
-            canvas.itemconfigure(status_label_id, text=current_status_message, font=status_font_obj, fill=text_color)
+            canvas.itemconfigure(status_label_id, text=current_status_message, font=status_font_obj, fill=status_color)
         else:
-            status_label_id = canvas.create_text(window_width // 2, status_y, text=current_status_message, font=status_font_obj, tags=("main_text",), **item_config_options)
+            status_label_id = canvas.create_text(window_width // 2, status_y, text=current_status_message, font=status_font_obj, fill=status_color, tags=("main_text",), **item_config_options)
 
         canvas.tag_raise("main_text")
 
@@ -905,8 +3398,8 @@ def update_images() -> Dict[str, Any]:
     return layout_info
 
 
-def redraw_history_display(layout_info: Dict[str, Any]):
-    """Redraws the song history panel based on available space and layout mode."""
+def redraw_history_display(layout_info: Dict[str, Any], frame: Optional[Dict[str, Any]] = None):
+    """Redraws the song history panel based on available space and layout mode, using the frame's thumbnails."""
     global history_photo_refs
     if not canvas or not root or not root.winfo_exists():
         logger.debug("redraw_history_display: Canvas or root not ready.")
@@ -925,7 +3418,6 @@ def redraw_history_display(layout_info: Dict[str, Any]):
 
     gui_cfg = config['gui']
     max_items = gui_cfg['history_max_items']
-    art_size_config = gui_cfg['history_art_size'] # Original size from config
     padding = gui_cfg['history_item_padding']
     x_offset = gui_cfg['history_x_offset']
     y_offset = gui_cfg['history_y_offset']
@@ -938,37 +3430,17 @@ def redraw_history_display(layout_info: Dict[str, Any]):
     sq_y = layout_info['square_y']
     sq_size = layout_info['square_size']
     history_font_size = layout_info['history_font_size']
-    text_color = layout_info['text_color']
-    is_fullscreen = layout_info.get('is_fullscreen', False)
+    visual_profile = layout_info.get('visual_profile')
 
     # Reduce History Font Size
     history_font_size_actual = max(5, history_font_size - 1)
     logger.debug(f"Base history font size: {history_font_size}, Actual used: {history_font_size_actual}")
 
-    try:
-        history_font_italic = tkFont.Font(family="Arial", size=history_font_size_actual, slant="italic")
-        history_font_bold = tkFont.Font(family="Arial", size=history_font_size_actual, weight="bold")
-        history_line_height = history_font_bold.metrics("linespace")
-        # Height estimate for layout based on ~3 lines text (for spacing between items)
-        text_block_height_for_spacing = (history_line_height * 2.8) + 4
-    except tk.TclError:
-        logger.warning("tkFont failed for history fonts.")
-        history_font_italic = ("Arial", history_font_size_actual, "italic")
-        history_font_bold = ("Arial", history_font_size_actual, "bold")
-        history_line_height = history_font_size_actual * 1.3
-        text_block_height_for_spacing = (history_line_height * 2.8) + 4
+    history_font_italic, history_font_bold, history_line_height, text_block_height_for_spacing = get_history_fonts(history_font_size_actual)
 
     # --- Determine Art Size and Entry Height ---
-    current_art_size = art_size_config # Start with config size
-    # Check conditions for Left mode *before* deciding final art size
-    temp_available_width_left = max(0, (sq_x - sq_size // 2) - x_offset - side_buffer)
-    temp_available_height_side = max(0, win_h - 2 * y_offset)
-    temp_history_entry_height = max(art_size_config, text_block_height_for_spacing) + padding
-    is_potentially_left_mode = (temp_available_width_left >= min_side_width_config and
-                               temp_available_height_side >= temp_history_entry_height)
-
-    if is_potentially_left_mode and is_fullscreen:
-        current_art_size = int(text_block_height_for_spacing) # Use ~3 lines height
+    current_art_size = compute_history_art_size(layout_info, text_block_height_for_spacing)
+    if current_art_size != gui_cfg['history_art_size']:
         logger.info(f"Fullscreen Left mode: Adjusting history art size to text height: {current_art_size}")
     else:
         logger.info(f"Not Fullscreen Left mode or Below Mode: Using config history art size: {current_art_size}")
@@ -1096,27 +3568,27 @@ def redraw_history_display(layout_info: Dict[str, Any]):
         # Use the consistent entry height for vertical spacing to next item
         next_y_increment = history_entry_height
 
+        # Colour for this item's text block, looked up in the artwork's luminance grid
+        text_box = (text_x, title_y, text_x + text_wrap_width, title_y + text_block_height_for_spacing)
+        text_color = visual_profile.text_colour(win_w, win_h, text_box) if visual_profile else "white"
+
         logger.debug(f"  Item index {i} ({layout_mode}): Final Coords Img=({img_x:.0f},{img_y:.0f}, Size:{current_art_size}) Title=({text_x:.0f},{title_y:.0f}) Artist=({text_x:.0f},{artist_y:.0f})")
 
         # --- Create Image ---
-        if img_path_str:
-            img_path = Path(img_path_str)
-            if img_path.is_file():
-                try:
-                    with Image.open(img_path) as img:
-                        img = img.resize((current_art_size, current_art_size), Image.Resampling.LANCZOS) # Use potentially adjusted size
-                        photo_ref = ImageTk.PhotoImage(img)
-                        canvas_img_id = canvas.create_image(img_x, img_y,
-                                                            anchor=img_anchor, image=photo_ref,
-                                                            tags=("history_item", "history_image"))
-                        logger.debug(f"  Item index {i} image created ID: {canvas_img_id}")
-                except Exception as e:
-                    logger.exception(f"  ERROR loading/drawing history image {img_path} for item index {i}: {e}")
-                    photo_ref = None
-            else:
-                logger.warning(f"  History image file missing for item index {i}: {img_path}")
+        if frame and frame['request']['history_art_size'] == current_art_size and img_path_str in frame['thumbnails']:
+            thumbnail = frame['thumbnails'][img_path_str]
         else:
-            logger.warning(f"  History item index {i} missing image path.")
+            thumbnail = load_history_thumbnail(img_path_str, current_art_size)
+        if thumbnail is not None:
+            try:
+                photo_ref = ImageTk.PhotoImage(thumbnail)
+                canvas_img_id = canvas.create_image(img_x, img_y,
+                                                    anchor=img_anchor, image=photo_ref,
+                                                    tags=("history_item", "history_image"))
+                logger.debug(f"  Item index {i} image created ID: {canvas_img_id}")
+            except Exception as e:
+                logger.exception(f"  ERROR drawing history image for item index {i}: {e}")
+                photo_ref = None
 
         # --- Create Title Text (with wrapping) ---
         # title_text already retrieved
@@ -1173,7 +3645,7 @@ def redraw_history_display(layout_info: Dict[str, Any]):
 # ... (update_gui, trigger_full_redraw, Event Handlers, Async Task Runner, Main Execution functions remain unchanged) ...
 def update_gui(update_data: Dict[str, Any]):
     """ Updates GUI based on processed data from background thread. Runs on main thread. """
-    global last_track_title, last_artist_name, last_persistent_image_path
+    global last_track_title, last_artist_name, last_persistent_image_path, current_artwork
     status = update_data.get('status')
     title = update_data.get('title')
     artist = update_data.get('artist')
@@ -1194,7 +3666,9 @@ def update_gui(update_data: Dict[str, Any]):
             last_track_title = title
             last_artist_name = artist
             last_persistent_image_path = persistent_path
-            status_to_set = "Ready"
+            if update_data.get('artwork'):
+                current_artwork = update_data['artwork']
+            status_to_set = "Ready (Local Match)" if update_data.get('source') == 'local' else "Ready"
             redraw_needed = True
             if not image_updated and error_message and error_message != "Used Cache":
                  logger.warning(f"New song text displayed, but image update failed: {error_message}. Showing previous/placeholder image.")
@@ -1209,12 +3683,22 @@ def update_gui(update_data: Dict[str, Any]):
             if image_updated and error_message != "Used Cache":
                 logger.info("Image refreshed for the same song.")
                 last_persistent_image_path = persistent_path
+                if update_data.get('artwork'):
+                    current_artwork = update_data['artwork']
                 redraw_needed = True
                 status_to_set = "Ready (Image Refreshed)"
             elif error_message == "Used Cache":
                 status_to_set = "Ready (Used Cache)"
 
 
+    elif status == 'unchanged':
+        logger.debug("GUI update: Local check found the same song still playing.")
+        status_to_set = "Ready (Same Song)"
+
+    elif status == 'silence':
+        logger.debug("GUI update: Recognition skipped by audio gate.")
+        status_to_set = error_message or "Silence"
+
     elif status == 'no_match':
         logger.info("GUI update: No match found.")
         status_to_set = "No Match Found"
@@ -1235,19 +3719,19 @@ def update_gui(update_data: Dict[str, Any]):
 
 
 def trigger_full_redraw():
-     """ Safely calls functions to redraw all main GUI elements. Must run on Tk thread. """
+     """ Requests a redraw of all main GUI elements; the pixel work runs on the render thread. Must run on Tk thread. """
      if not root or not canvas or not root.winfo_exists():
           logger.debug("Skip redraw: GUI not ready.")
           return
      logger.debug("Triggering full redraw...")
-     try:
-         layout_info = update_images()
-         redraw_history_display(layout_info)
-         logger.debug("Full redraw complete.")
-     except tk.TclError as e:
-         logger.error(f"TclError during full redraw: {e}")
-     except Exception as e:
-         logger.exception(f"Unexpected error during full redraw: {e}")
+     request = build_render_request()
+     if request is None:
+          logger.debug("Skip redraw: could not read window state.")
+          return
+     if render_preparer and render_preparer.is_running():
+          render_preparer.submit(request) # apply_render_frame() runs on the Tk thread once the frame is ready
+     else:
+          apply_render_frame(prepare_render_frame(request))
 
 def get_monitor_for_window() -> Optional[Any]:
     """Finds the screeninfo monitor object the window is currently on."""
@@ -1379,7 +3863,7 @@ def on_closing():
 
     if recognition_thread_stop_event:
         logger.debug("Setting stop event for recognition thread.")
-        recognition_thread_stop_event.set()
+        request_recognition_stop()
 
     if recognition_thread and recognition_thread.is_alive():
         logger.info(f"Waiting for {recognition_thread.name} to join (max 5s)...")
@@ -1397,7 +3881,7 @@ def on_closing():
     except Exception as e:
         logger.exception("Error occurred during history cleanup call.")
 
-    safe_remove(TEMP_IMAGE_PATH, "temp image on closing")
+    stop_render_preparer()
 
     if root:
         logger.info("Destroying Tkinter window.")
@@ -1409,223 +3893,770 @@ def on_closing():
 
     logger.info("Shutdown sequence complete.")
 
+# --- Cover Art Download ---
+class HTTPArtCache:
+    """Persistent HTTP cache for cover-art URLs. It keeps only each response's ETag/Last-Modified and freshness
+    lifetime, pointing at the art store image (by content hash) that holds the body. Fresh entries are served without
+    a network call, stale ones are revalidated with conditional requests, and least recently used entries beyond
+    max_entries are evicted. An entry whose image has left the art store is dropped. The art store itself only
+    answers without a network call while is_fresh() holds for its image."""
+    INDEX_FILENAME = 'entries.json'
+    SAVE_DEBOUNCE_S = 30.0 # entries.json is written at most this often; flush() writes the rest at shutdown
+
+    def __init__(self, directory: Path, max_entries: int, default_ttl_s: float, store: ArtStore):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.default_ttl_s = default_ttl_s
+        self.store = store
+        self._entries: Dict[str, Dict[str, Any]] = {} # url -> {digest, etag, last_modified, fresh_until, last_access}
+        self._dirty = False
+        self._last_saved_at = float('-inf')
+        self._lock = threading.Lock()
+
+    @property
+    def index_path(self) -> Path:
+        return self.directory / self.INDEX_FILENAME
+
+    def load(self):
+        if not self.index_path.is_file():
+            return
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+            with self._lock:
+                self._entries = {url: entry for url, entry in entries.items()
+                                 if entry.get('digest') and self.store.path_for(entry['digest']).is_file()}
+            logger.info(f"Loaded HTTP art cache: {len(self._entries)} entries.")
+        except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+            logger.error(f"Could not load HTTP art cache index {self.index_path}: {e}. Starting empty.")
+        for old_body in self.directory.glob('*.bin'): # Bodies cached by earlier versions; the art store has them now
+            safe_remove(old_body, "old HTTP art cache body")
+
+    def save(self):
+        with self._lock:
+            entries = {url: dict(entry) for url, entry in self._entries.items()}
+            self._dirty = False
+            self._last_saved_at = time.monotonic()
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            temp_path = self.index_path.with_suffix('.json.tmp')
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(entries, f)
+            os.replace(temp_path, self.index_path)
+        except OSError as e:
+            logger.error(f"Could not save HTTP art cache index {self.index_path}: {e}")
+            with self._lock:
+                self._dirty = True
+
+    def _save_if_due(self):
+        with self._lock:
+            due = self._dirty and time.monotonic() - self._last_saved_at >= self.SAVE_DEBOUNCE_S
+        if due:
+            self.save()
+
+    def flush(self):
+        """Writes pending entry changes (called at shutdown)."""
+        with self._lock:
+            dirty = self._dirty
+        if dirty:
+            self.save()
+
+    def is_fresh(self, digest: str) -> bool:
+        """True if some URL that served this art store image is still within its freshness lifetime."""
+        now = time.time()
+        with self._lock:
+            return any(entry['digest'] == digest and entry['fresh_until'] > now for entry in self._entries.values())
+
+    def _read_body(self, url: str, entry: Dict[str, Any]) -> Optional[bytes]:
+        """Reads the entry's body from the art store, dropping the entry if the image is gone."""
+        try:
+            body = self.store.path_for(entry['digest']).read_bytes()
+        except OSError as e:
+            logger.info(f"HTTP art cache image for {url} no longer in art store ({e.__class__.__name__}). Dropping entry.")
+            with self._lock:
+                self._entries.pop(url, None)
+            return None
+        with self._lock:
+            entry['last_access'] = time.time()
+        return body
+
+    def get_fresh(self, url: str) -> Optional[bytes]:
+        """Returns the cached body if it is still fresh, without any network call."""
+        with self._lock:
+            entry = self._entries.get(url)
+        if not entry or entry['fresh_until'] <= time.time():
+            return None
+        return self._read_body(url, entry)
+
+    def conditional_headers(self, url: str) -> Dict[str, str]:
+        """If-None-Match / If-Modified-Since headers for revalidating a stale entry whose image is still stored."""
+        with self._lock:
+            entry = self._entries.get(url)
+        headers = {}
+        if not entry or not self.store.path_for(entry['digest']).is_file():
+            return headers
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def _freshness_seconds(self, headers: Any) -> Optional[float]:
+        """Lifetime from Cache-Control/Expires, or the default TTL. None if the response must not be stored."""
+        cache_control = headers.get('Cache-Control', '').lower()
+        if 'no-store' in cache_control:
+            return None
+        if 'no-cache' in cache_control:
+            return 0.0
+        match = re.search(r'max-age=(\d+)', cache_control)
+        if match:
+            return float(match.group(1))
+        expires = headers.get('Expires')
+        if expires:
+            try:
+                return max(0.0, email.utils.parsedate_to_datetime(expires).timestamp() - time.time())
+            except (TypeError, ValueError):
+                return 0.0
+        return self.default_ttl_s
+
+    def revalidated(self, url: str, headers: Any) -> Optional[bytes]:
+        """Handles a 304: extends the entry's freshness and returns its body."""
+        with self._lock:
+            entry = self._entries.get(url)
+        if not entry:
+            return None
+        lifetime = self._freshness_seconds(headers)
+        with self._lock:
+            entry['fresh_until'] = time.time() + (lifetime or 0.0)
+            entry['etag'] = headers.get('ETag', entry.get('etag'))
+            self._dirty = True
+        body = self._read_body(url, entry)
+        self._save_if_due()
+        return body
+
+    def store_validators(self, url: str, headers: Any, digest: str):
+        """Records a 200 response's validators (unless no-store) against the art store image with this content hash,
+        then evicts least recently used entries beyond max_entries. The body itself is written by the art store."""
+        lifetime = self._freshness_seconds(headers)
+        if lifetime is None:
+            return
+        now = time.time()
+        with self._lock:
+            self._entries[url] = {'digest': digest, 'etag': headers.get('ETag'), 'last_modified': headers.get('Last-Modified'),
+                                  'fresh_until': now + lifetime, 'last_access': now}
+            evicted = 0
+            for old_url in sorted(self._entries, key=lambda u: self._entries[u]['last_access']):
+                if len(self._entries) <= self.max_entries:
+                    break
+                del self._entries[old_url]
+                evicted += 1
+            entry_count = len(self._entries)
+            self._dirty = True
+        if evicted:
+            increment_metric('http_cache_evictions', evicted)
+        set_metric_gauge('http_cache_entries', entry_count)
+        self._save_if_due()
+
+def get_http_art_cache() -> Optional[HTTPArtCache]:
+    """Returns the shared HTTP art cache, loading it on first use. None if disabled."""
+    global http_art_cache
+    cache_cfg = config['http_cache']
+    if not cache_cfg.get('enabled', True):
+        return None
+    if http_art_cache is None:
+        http_art_cache = HTTPArtCache(HTTP_CACHE_DIR_PATH, cache_cfg['max_entries'], cache_cfg['default_ttl_s'], get_art_store())
+        http_art_cache.load()
+    return http_art_cache
+
+def save_http_art_cache():
+    """Flushes pending HTTP art cache entries to disk (called at shutdown)."""
+    if http_art_cache:
+        http_art_cache.flush()
+
+
+async def decode_downloaded_artwork(image_bytes: bytes) -> Optional[Artwork]:
+    """Artwork.from_bytes() on a worker thread, keeping the recognition loop responsive."""
+    return await asyncio.get_running_loop().run_in_executor(None, Artwork.from_bytes, image_bytes)
+
+async def download_cover_art(url: str, first_byte_event: Optional[asyncio.Event] = None) -> Tuple[Optional[Artwork], str]:
+    """Downloads, decodes and validates one cover-art URL, retrying with backoff. Returns (artwork, "") or (None, error message)."""
+    network_timeout = config['network']['timeout']
+    max_bytes = config['network']['cover_art_max_bytes']
+    max_retries = config['network']['retry_count']
+    breaker = get_circuit_breaker('cover_art')
+    if cover_art_http_client is None:
+        start_cover_art_client()
+    downloader = cover_art_http_client
+    http_cache = get_http_art_cache()
+    last_image_error_message = "Image Download Failed (Unknown Reason)"
+
+    cached_bytes = http_cache.get_fresh(url) if http_cache else None
+    artwork = await decode_downloaded_artwork(cached_bytes) if cached_bytes else None
+    if artwork:
+        increment_metric('http_cache_fresh_hits')
+        logger.info(f"Cover art served fresh from HTTP cache ({len(cached_bytes)} bytes): {url}")
+        return artwork, ""
+
+    logger.info(f"Attempting image download from URL: {url}")
+    for attempt in range(max_retries):
+        if recognition_thread_stop_event.is_set():
+            logger.info("Image download cancelled by shutdown.")
+            return None, "Download Cancelled"
+        if not await breaker.allow_request():
+            logger.info(f"Image download skipped: cover art host offline (next probe in {breaker.seconds_until_probe():.0f}s).")
+            return None, "Cover Art Offline"
+
+        logger.debug(f"  Download attempt {attempt + 1}/{max_retries}...")
+        try:
+            request_headers = http_cache.conditional_headers(url) if http_cache else {}
+            response = await downloader.download(url, max_bytes, recognition_thread_stop_event, first_byte_event, request_headers)
+            breaker.record_success()
+            if response is None:
+                return None, "Download Cancelled"
+            status, response_headers, image_bytes = response
+
+            if status == 304 and http_cache:
+                image_bytes = http_cache.revalidated(url, response_headers)
+                artwork = await decode_downloaded_artwork(image_bytes) if image_bytes else None
+                if artwork:
+                    increment_metric('http_cache_revalidated')
+                    logger.info(f"Cover art revalidated (304 Not Modified), served from HTTP cache: {url}")
+                    return artwork, ""
+
+            if image_bytes:
+                artwork = await decode_downloaded_artwork(image_bytes)
+                if artwork:
+                    logger.info(f"Image downloaded successfully (Attempt {attempt+1}) using URL: {url}")
+                    if http_cache:
+                        http_cache.store_validators(url, response_headers, artwork.digest)
+                    return artwork, ""
+                last_image_error_message = "Downloaded file invalid"
+                logger.error(f"  {last_image_error_message} from {url} (Attempt {attempt+1})")
+            else:
+                last_image_error_message = "Downloaded Image Empty"
+                logger.error(f"  {last_image_error_message} for URL {url} (Attempt {attempt+1})")
+
+        except asyncio.TimeoutError:
+             last_image_error_message = "Download Timeout"
+             logger.warning(f"  {last_image_error_message} for {url} (Attempt {attempt+1}, timeout={network_timeout}s)")
+             breaker.record_failure()
+        except aiohttp.ClientResponseError as e:
+             last_image_error_message = f"Download Failed (HTTP {e.status})"
+             logger.warning(f"  {last_image_error_message} for {url} (Attempt {attempt+1}): {e.message}")
+             if e.status >= 500:
+                 breaker.record_failure()
+             else:
+                 breaker.record_success() # Host reachable, even if this URL is bad
+                 if e.status not in (408, 429):
+                     return None, last_image_error_message # Client errors won't go away on retry
+        except aiohttp.ClientError as e:
+             last_image_error_message = f"Download Failed ({e.__class__.__name__})"
+             logger.warning(f"  {last_image_error_message} for {url} (Attempt {attempt+1}): {e}")
+             breaker.record_failure()
+        except ValueError as e:
+             logger.warning(f"  Downloaded Image Too Large for {url} (Attempt {attempt+1}): {e}")
+             breaker.record_success()
+             return None, "Downloaded Image Too Large" # Retrying won't make it smaller
+
+        if breaker.is_offline:
+            return None, "Cover Art Offline"
+        if attempt < max_retries - 1 and not recognition_thread_stop_event.is_set():
+            delay = retry_backoff_delay(attempt)
+            logger.debug(f"  Waiting {delay:.1f}s before next download attempt...")
+            await asyncio.sleep(delay)
+    return None, last_image_error_message
+
+async def fetch_cover_art_hedged(hq_url: Optional[str], std_url: Optional[str]) -> Tuple[Optional[Artwork], Optional[str], str, Optional[asyncio.Task]]:
+    """Fetches HQ art, starting the standard-quality URL in parallel if HQ sends no bytes within network.cover_art_hedge_s.
+    Returns (artwork, URL it came from, error message, HQ task still running if the standard image won)."""
+    if not hq_url or not std_url or hq_url == std_url:
+        artwork, error_message = await download_cover_art(hq_url or std_url)
+        return artwork, hq_url or std_url, error_message, None
+
+    hq_first_byte = asyncio.Event()
+    hq_task = asyncio.ensure_future(download_cover_art(hq_url, hq_first_byte))
+    std_task: Optional[asyncio.Task] = None
+    try:
+        first_byte_waiter = asyncio.ensure_future(hq_first_byte.wait())
+        try:
+            await asyncio.wait({hq_task, first_byte_waiter}, timeout=config['network']['cover_art_hedge_s'],
+                               return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            first_byte_waiter.cancel()
+
+        if hq_task.done() or hq_first_byte.is_set():
+            # HQ is flowing (or already failed): no hedge, standard only as a fallback like before.
+            artwork, error_message = await hq_task
+            if artwork:
+                return artwork, hq_url, "", None
+            logger.info(f"HQ cover art failed ({error_message}). Trying standard URL.")
+            artwork, error_message = await download_cover_art(std_url)
+            return artwork, std_url, error_message, None
+
+        logger.info(f"No HQ cover art bytes after {config['network']['cover_art_hedge_s']:g}s. Hedging with standard URL.")
+        increment_metric('cover_art_hedged')
+        std_task = asyncio.ensure_future(download_cover_art(std_url))
+        await asyncio.wait({hq_task, std_task}, return_when=asyncio.FIRST_COMPLETED)
+        if hq_task.done() and hq_task.result()[0]:
+            std_task.cancel()
+            increment_metric('cover_art_hedge_hq_won')
+            return hq_task.result()[0], hq_url, "", None
+        artwork, error_message = await std_task
+        if artwork:
+            increment_metric('cover_art_hedge_std_won')
+            return artwork, std_url, "", None if hq_task.done() else hq_task
+        artwork, error_message = await hq_task
+        return artwork, hq_url, error_message, None
+    except asyncio.CancelledError:
+        hq_task.cancel()
+        if std_task:
+            std_task.cancel()
+        raise
+
+def write_image_bytes(image_bytes: bytes, target_path: Path):
+    """Writes image bytes to a temp file and swaps them into place atomically."""
+    temp_path = target_path.with_name(target_path.name + '.part')
+    with open(temp_path, 'wb') as f:
+        f.write(image_bytes)
+    os.replace(temp_path, target_path)
+
+def persist_artwork_in_background(artwork: Artwork, urls: List[Optional[str]], track_key: Optional[str]) -> Tuple[str, "asyncio.Future"]:
+    """Writes downloaded artwork into the art store on a worker thread, so decoding and profiling it never wait on the SD card.
+    Returns the path it will have and the write's future; await it (see artwork_stored) before recording the path anywhere."""
+    store = get_art_store()
+    artwork.path = store.path_for(artwork.digest)
+    image_bytes, artwork.data = artwork.data, None
+
+    def write() -> bool:
+        try:
+            store.put(image_bytes, urls, track_key)
+            return True
+        except OSError as e:
+            logger.error(f"Failed to store cover art {artwork.path.name}: {e}")
+            return False
+
+    write_future = asyncio.get_running_loop().run_in_executor(None, write)
+    log_background_failure(write_future, f"cover art write {artwork.path.name}")
+    return str(artwork.path), write_future
+
+async def artwork_stored(write_future: "asyncio.Future") -> bool:
+    """True once a persist_artwork_in_background write has landed on disk. Failures were already logged by the future."""
+    try:
+        return bool(await write_future)
+    except Exception:
+        return False
+
+async def upgrade_cover_art_when_ready(hq_task: asyncio.Task, title: str, artist: str, hq_url: str, track_key: str,
+                                       persistent_path: Optional[str]):
+    """Swaps in the HQ cover once its (slower) download finishes, if the same song is still on screen."""
+    try:
+        artwork, error_message = await hq_task
+    except asyncio.CancelledError:
+        hq_task.cancel()
+        raise
+    if not artwork or recognition_thread_stop_event.is_set():
+        logger.info(f"HQ cover art upgrade for '{title}' not available: {error_message or 'stopped'}.")
+        return
+    if (last_track_title, last_artist_name) != (title, artist):
+        logger.info(f"Song changed before HQ cover art for '{title}' arrived. Dropping upgrade.")
+        return
+    hq_path, write_future = persist_artwork_in_background(artwork, [hq_url], track_key)
+    visual_profile = await asyncio.get_running_loop().run_in_executor(None, get_visual_profile, artwork)
+    if not await artwork_stored(write_future):
+        logger.warning(f"HQ cover art for '{title}' could not be stored. Keeping the standard cover.")
+        return
+    for history_item in song_history_list:
+        if history_item.get('image_path') == persistent_path:
+            history_item['image_path'] = hq_path
+            history_item['visual_profile'] = visual_profile
+    persistent_path = hq_path
+    save_last_state(title, artist, persistent_path)
+    increment_metric('cover_art_upgraded')
+    logger.info(f"Upgraded cover art for '{title}' to HQ.")
+    publish_update({'status': 'success', 'title': title, 'artist': artist, 'persistent_path': persistent_path,
+                    'artwork': artwork, 'image_updated': True, 'message': 'Upgraded to HQ'}, recognition_thread_stop_event)
+
+def cancel_cover_art_upgrade():
+    """Cancels a pending HQ upgrade (a newer song arrived, or shutdown)."""
+    global cover_art_upgrade_task
+    if cover_art_upgrade_task and not cover_art_upgrade_task.done():
+        cover_art_upgrade_task.cancel()
+    cover_art_upgrade_task = None
+
+
 async def process_recognition_result(result: Dict[str, Any]) -> Dict[str, Any]:
     """ Processes successful Shazam result: checks cache, downloads image (with retries), adds to history, saves state."""
-    global song_history_list
+    global song_history_list, cover_art_upgrade_task
     track_info = result.get('track', {})
     new_title = track_info.get('title', 'Unknown Title')
     new_artist = track_info.get('subtitle', 'Unknown Artist')
 
     logger.info(f"Processing result: '{new_title}' by '{new_artist}'")
+    cancel_cover_art_upgrade() # A newer song makes any pending HQ upgrade obsolete
 
     persistent_path_for_this_song: Optional[str] = None # Path to be saved in state
     image_processed_successfully = False # Track if we have a valid image for this song
     last_image_error_message = ""
-    current_display_image_path = IMAGE_PATH # Path for the active image in the GUI
+    artwork: Optional[Artwork] = None # Handed to the GUI in memory; no display copy on disk
     cache_hit = False # Flag to track if cache was used
 
-    # --- Check Cache First ---
-    logger.debug("Checking history cache for existing cover art...")
-    for history_item in song_history_list:
-        if history_item.get('title') == new_title and history_item.get('artist') == new_artist:
-            cached_image_path_str = history_item.get('image_path')
-            if cached_image_path_str:
-                cached_image_path = Path(cached_image_path_str)
-                if cached_image_path.is_file():
-                    logger.info(f"Cache hit found: {cached_image_path}")
-                    try:
-                        shutil.copy2(cached_image_path, current_display_image_path)
-                        logger.info(f"Copied cached image to active path: {current_display_image_path}")
-                        image_processed_successfully = True
-                        last_image_error_message = "Used Cache"
-                        cache_hit = True
-                        persistent_path_for_this_song = str(cached_image_path) # Use the existing path
-                        break
-                    except OSError as e:
-                        logger.error(f"Failed to copy cached image {cached_image_path} to {current_display_image_path}: {e}")
-                    except Exception as e:
-                        logger.exception(f"Unexpected error copying cached image: {e}")
-                else:
-                    logger.warning(f"Cache hit found path {cached_image_path}, but file does not exist.")
-            else:
-                 logger.warning(f"Cache hit found for song, but history item lacks image path.")
-        if cache_hit:
-            break
-
-    # --- Download if Cache Miss (with Retries) ---
+    images_dict = track_info.get('images', {})
+    hq_url = images_dict.get('coverarthq')
+    std_url = images_dict.get('coverart')
+    hq_url, std_url = [url if isinstance(url, str) and url.startswith('http') else None for url in (hq_url, std_url)]
+    track_key = track_key_for(track_info)
+    store = get_art_store()
+
+    # --- Check Cover Art Store First (by track key or cover URL) ---
+    logger.debug("Checking cover art store for existing cover art...")
+    cached_image_path = store.lookup([hq_url, std_url], track_key)
+    stale_image_path: Optional[Path] = None # Stored copy past its HTTP freshness, used only if revalidation fails
+    http_cache = get_http_art_cache()
+    if cached_image_path and http_cache and (hq_url or std_url) and not http_cache.is_fresh(cached_image_path.stem):
+        logger.info(f"Stored cover art {cached_image_path.name} is past its HTTP freshness lifetime. Revalidating.")
+        stale_image_path, cached_image_path = cached_image_path, None
+    if cached_image_path:
+        logger.info(f"Cache hit found: {cached_image_path}")
+        artwork = Artwork.from_file(cached_image_path)
+        if artwork:
+            image_processed_successfully = True
+            last_image_error_message = "Used Cache"
+            cache_hit = True
+            persistent_path_for_this_song = str(cached_image_path) # Use the existing path
+
+    # --- Download if Cache Miss (hedged HQ/standard, with retries) ---
+    pending_hq_task: Optional[asyncio.Task] = None
+    write_future: Optional["asyncio.Future"] = None
     if not cache_hit:
         logger.info("Cache miss or failed to use cache. Attempting download...")
-        images_dict = track_info.get('images', {})
-        hq_url = images_dict.get('coverarthq')
-        std_url = images_dict.get('coverart')
-        urls_to_try = [url for url in [hq_url, std_url] if isinstance(url, str) and url.startswith('http')]
-        network_timeout = config['network']['timeout']
-        max_retries = config['network']['retry_count']
-        retry_delay = config['network']['retry_delay']
         last_image_error_message = "No Cover Art URL"
 
-        if not urls_to_try:
+        if not hq_url and not std_url:
             logger.warning("No valid cover art URLs found for download.")
         else:
-            for url in urls_to_try: # Try HQ then Standard
-                logger.info(f"Attempting image download from URL: {url}")
-                for attempt in range(max_retries):
-                    if recognition_thread_stop_event.is_set():
-                        logger.info("Image download cancelled by shutdown.")
-                        last_image_error_message = "Download Cancelled"
-                        image_processed_successfully = False
-                        break # Break inner retry loop
-
-                    logger.debug(f"  Download attempt {attempt + 1}/{max_retries}...")
-                    try:
-                        response = requests.get(url, timeout=network_timeout, stream=True)
-                        response.raise_for_status()
-
-                        with open(TEMP_IMAGE_PATH, 'wb') as f:
-                            for chunk in response.iter_content(chunk_size=8192): f.write(chunk)
-
-                        if TEMP_IMAGE_PATH.stat().st_size > 0:
-                            try:
-                                with Image.open(TEMP_IMAGE_PATH) as img_verify: img_verify.verify()
-                                os.replace(TEMP_IMAGE_PATH, current_display_image_path)
-                                logger.info(f"Image downloaded and updated successfully (Attempt {attempt+1}) using URL: {url}")
-                                image_processed_successfully = True # Mark success
-                                last_image_error_message = "" # Clear error
-                                break # SUCCESS: Break inner retry loop
-                            except (Image.UnidentifiedImageError, SyntaxError, TypeError, ValueError) as verify_e:
-                                last_image_error_message = f"Downloaded file invalid ({verify_e.__class__.__name__})"
-                                logger.error(f"  {last_image_error_message} from {url} (Attempt {attempt+1})")
-                                safe_remove(TEMP_IMAGE_PATH, "invalid downloaded image")
-                        else:
-                            last_image_error_message = "Downloaded Image Empty"
-                            logger.error(f"  {last_image_error_message} for URL {url} (Attempt {attempt+1})")
-                            safe_remove(TEMP_IMAGE_PATH, "empty downloaded image")
-
-                    except requests.exceptions.Timeout:
-                         last_image_error_message = "Download Timeout"
-                         logger.warning(f"  {last_image_error_message} for {url} (Attempt {attempt+1}, timeout={network_timeout}s)")
-                    except requests.exceptions.RequestException as e:
-                         last_image_error_message = f"Download Failed ({e.__class__.__name__})"
-                         logger.warning(f"  {last_image_error_message} for {url} (Attempt {attempt+1}): {e}")
-                    except Exception as e:
-                         last_image_error_message = f"Unknown Image Error ({e.__class__.__name__})"
-                         logger.exception(f"  {last_image_error_message} during download/processing for {url} (Attempt {attempt+1}): {e}")
-                    finally:
-                        safe_remove(TEMP_IMAGE_PATH, "temp image after download attempt")
-
-                    if image_processed_successfully:
-                        break
-
-                    if attempt < max_retries - 1 and not recognition_thread_stop_event.is_set():
-                        logger.debug(f"  Waiting {retry_delay}s before next download attempt...")
-                        try:
-                            await asyncio.sleep(retry_delay)
-                        except asyncio.CancelledError:
-                             logger.info("Image download sleep cancelled.")
-                             last_image_error_message = "Download Cancelled"
-                             break
-
-                if image_processed_successfully or recognition_thread_stop_event.is_set():
-                    break
-
-            if not image_processed_successfully and not last_image_error_message:
+            artwork, source_url, last_image_error_message, pending_hq_task = await fetch_cover_art_hedged(hq_url, std_url)
+            if artwork:
+                persistent_path_for_this_song, write_future = persist_artwork_in_background(artwork, [source_url], track_key)
+                logger.info(f"Image updated successfully ({artwork.image.width}x{artwork.image.height}).")
+                image_processed_successfully = True
+            elif not last_image_error_message:
                  last_image_error_message = "Image Download Failed (Unknown Reason)"
+        if not artwork and stale_image_path:
+            artwork = Artwork.from_file(stale_image_path)
+            if artwork:
+                logger.info(f"Revalidation failed ({last_image_error_message}). Using stale stored cover art {stale_image_path.name}.")
+                increment_metric('http_cache_stale_served')
+                image_processed_successfully = True
+                last_image_error_message = "Used Cache (Stale)"
+                persistent_path_for_this_song = str(stale_image_path)
 
 
     # --- Add to History & Save State ---
-    final_persistent_path = None
+    path_to_save = None
 
     # Only add to history if image was successfully processed
-    if image_processed_successfully and current_display_image_path.is_file():
-        logger.debug(f"Adding to history using valid active image: {current_display_image_path}")
-        final_persistent_path = add_to_history(new_title, new_artist, current_display_image_path)
-        if final_persistent_path:
-            logger.debug(f"Song added/updated in history. Persistent path: {final_persistent_path}")
+    if image_processed_successfully and persistent_path_for_this_song:
+        visual_profile = await asyncio.get_running_loop().run_in_executor(None, get_visual_profile, artwork)
+        if write_future is not None and not await artwork_stored(write_future): # Profiling overlaps the write, so this rarely waits
+            logger.warning("Cover art could not be stored. Not adding entry to history cache.")
         else:
-            logger.error("add_to_history returned None despite processed image. State might be inconsistent.")
-    elif not image_processed_successfully:
-        logger.warning("Image download/cache failed. Not adding entry to history cache.")
+            path_to_save = add_to_history(new_title, new_artist, persistent_path_for_this_song, visual_profile)
+            logger.debug(f"Song added/updated in history. Persistent path: {path_to_save}")
     else:
-        logger.warning("No valid display image path available despite image_processed_successfully=True.")
-
+        logger.warning("Image download/cache failed. Not adding entry to history cache.")
 
-    path_to_save = persistent_path_for_this_song if cache_hit else final_persistent_path
     save_last_state(new_title, new_artist, path_to_save)
 
+    if pending_hq_task:
+        cover_art_upgrade_task = asyncio.ensure_future(
+            upgrade_cover_art_when_ready(pending_hq_task, new_title, new_artist, hq_url, track_key, path_to_save))
+
     return {
         'status': 'success',
         'title': new_title,
         'artist': new_artist,
         'persistent_path': path_to_save,
+        'artwork': artwork,
         'image_updated': image_processed_successfully,
-        'message': last_image_error_message
+        'message': last_image_error_message,
+        'source': result.get('source', 'shazam')
     }
 
 
-async def periodic_recognition_task(stop_event: threading.Event):
-    """The main async loop: record -> recognize -> process -> schedule update -> wait."""
-    interval_seconds = config['gui']['update_interval_ms'] / 1000.0
-    wait_chunk = 0.1
+def request_recognition_stop():
+    """Sets the recognition stop event and wakes the recognition loop immediately. Safe to call from any thread."""
+    recognition_thread_stop_event.set()
+    loop = recognition_loop
+    if loop and recognition_async_stop_event and not loop.is_closed():
+        try:
+            loop.call_soon_threadsafe(recognition_async_stop_event.set)
+        except RuntimeError:
+            pass # Loop closed in between
+
+async def wait_with_stop(stop_event: threading.Event, seconds: float, wake_event: Optional[asyncio.Event] = None) -> bool:
+    """Sleeps for up to `seconds`, waking at once on a stop request or when wake_event is set.
+    Returns False if stopped or cancelled."""
+    if stop_event.is_set():
+        return False
+    if wake_event is None:
+        try:
+            await asyncio.wait_for(recognition_async_stop_event.wait(), timeout=seconds)
+            return False
+        except asyncio.TimeoutError:
+            return not stop_event.is_set()
+        except asyncio.CancelledError:
+            logger.info("Waiting sleep cancelled.")
+            return False
+    stop_task = asyncio.ensure_future(recognition_async_stop_event.wait())
+    wake_task = asyncio.ensure_future(wake_event.wait())
+    try:
+        await asyncio.wait({stop_task, wake_task}, timeout=seconds, return_when=asyncio.FIRST_COMPLETED)
+    except asyncio.CancelledError:
+        logger.info("Waiting sleep cancelled.")
+        return False
+    finally:
+        stop_task.cancel()
+        wake_task.cancel()
+    return not stop_event.is_set()
+
+async def get_from_queue(queue: asyncio.Queue, stop_event: threading.Event) -> Optional[Any]:
+    """Waits for the next queue item, returning None as soon as a stop is requested."""
+    if stop_event.is_set():
+        return None
+    get_task = asyncio.ensure_future(queue.get())
+    stop_task = asyncio.ensure_future(recognition_async_stop_event.wait())
+    try:
+        await asyncio.wait({get_task, stop_task}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        stop_task.cancel()
+        if not get_task.done():
+            get_task.cancel()
+    return get_task.result() if get_task.done() and not get_task.cancelled() else None
+
+def put_dropping_oldest(queue: asyncio.Queue, item: Any, queue_name: str):
+    """Puts an item on a bounded queue, discarding the oldest entry if it is full (stale audio is useless)."""
+    if queue.full():
+        try:
+            queue.get_nowait()
+            queue.task_done()
+            increment_metric(f'{queue_name}_dropped')
+            logger.debug(f"Pipeline queue '{queue_name}' full. Dropped oldest item.")
+        except asyncio.QueueEmpty:
+            pass
+    queue.put_nowait(item)
+    set_metric_gauge(f'{queue_name}_depth', queue.qsize())
+
+def publish_update(update_data: Dict[str, Any], stop_event: threading.Event, window_end_at: Optional[float] = None):
+    """Schedules a GUI update and records the time from end of capture to screen."""
+    if stop_event.is_set():
+        logger.info("Stop event set, skipping GUI update.")
+        return
+    logger.debug(f"Scheduling GUI update with data: {update_data}")
+    schedule_gui_update(update_gui, update_data)
+    if window_end_at is not None:
+        record_timing('pipeline_capture_to_display', time.monotonic() - window_end_at)
+
+async def wait_for_next_capture(stop_event: threading.Event, scheduler: RecognitionScheduler) -> bool:
+    """Waits the scheduler interval from now. If recognition of the window just captured changes the scheduler
+    mid-wait, the new interval (still counted from now) applies at once. Returns False if stopped."""
+    captured_at = time.monotonic()
+    scheduler.changed.clear()
+    interval_seconds = scheduler.next_interval()
+    logger.debug(f"Waiting {interval_seconds:.1f}s before next capture...")
+    while await wait_with_stop(stop_event, interval_seconds - (time.monotonic() - captured_at), scheduler.changed):
+        if not scheduler.changed.is_set():
+            return True
+        scheduler.changed.clear()
+        interval_seconds = scheduler.next_interval()
+        logger.debug(f"Scheduler changed: next capture {interval_seconds:.1f}s after the last one.")
+    return False
 
+async def capture_stage(stop_event: threading.Event, scheduler: RecognitionScheduler, window_queue: asyncio.Queue):
+    """Stage 1: takes a window from the capture engine every scheduler interval, independent of the later stages."""
     while not stop_event.is_set():
-        logger.info("--- Starting New Recognition Cycle ---")
-        update_data = {'status': 'error', 'message': 'Cycle Interrupted'}
-        wav_file_path = None
+        logger.info("--- Capturing New Recognition Window ---")
+        stage_start = time.perf_counter()
         try:
-            wav_file_path = record_audio()
-
-            if wav_file_path and not stop_event.is_set():
-                 shazam_result = await recognize_song(wav_file_path)
-
-                 if shazam_result and not stop_event.is_set():
-                      if 'track' in shazam_result and shazam_result.get('track'):
-                           update_data = await process_recognition_result(shazam_result)
-                      elif 'matches' in shazam_result and not shazam_result.get('matches'):
-                           update_data = {'status': 'no_match', 'message': 'No Match Found'}
-                      else:
-                           logger.error(f"Unexpected Shazam result format or empty track: {shazam_result}")
-                           update_data = {'status': 'error', 'message': 'Bad Shazam Result'}
-                 elif not shazam_result and not stop_event.is_set():
-                      update_data = {'status': 'error', 'message': current_status_message}
-                 elif stop_event.is_set():
-                      logger.info("Stop event detected after recognize_song.")
-                      update_data = {'status': 'error', 'message': 'Shutdown'}
-
-
-            elif not wav_file_path and not stop_event.is_set():
-                 logger.warning("Recording failed or produced no file.")
-                 update_data = {'status': 'error', 'message': current_status_message}
-            elif stop_event.is_set():
-                 logger.info("Stop event detected after record_audio.")
-                 update_data = {'status': 'error', 'message': 'Shutdown'}
+            pcm_bytes = await record_audio()
+            if pcm_bytes and not stop_event.is_set():
+                put_dropping_oldest(window_queue, {'pcm': pcm_bytes, 'window_end_at': time.monotonic()}, 'window_queue')
+                record_timing('stage_capture', time.perf_counter() - stage_start)
+            elif not stop_event.is_set():
+                logger.warning("Recording failed or produced no audio.")
+                scheduler.on_idle()
+                publish_update({'status': 'error', 'message': current_status_message}, stop_event)
+        except Exception as e:
+            logger.exception(f"Unhandled error in capture stage: {e}")
+            publish_update({'status': 'error', 'message': 'Cycle Failed Unexpectedly'}, stop_event)
+
+        if not await wait_for_next_capture(stop_event, scheduler):
+            break
+    logger.info("Capture stage finished.")
 
+async def recognition_stage(stop_event: threading.Event, scheduler: RecognitionScheduler,
+                            window_queue: asyncio.Queue, result_queue: asyncio.Queue):
+    """Stage 2: gate -> same-song check -> local index -> Shazam. Matches go on to the presentation stage."""
+    record_secs = config['audio']['record_seconds']
+    while not stop_event.is_set():
+        window = await get_from_queue(window_queue, stop_event)
+        if window is None:
+            break
+        set_metric_gauge('window_queue_depth', window_queue.qsize())
+        stage_start = time.perf_counter()
+        pcm_bytes = window['pcm']
+        window_end_at = window['window_end_at']
+        recognition_input: Optional[Union[bytes, str]] = None
+        signature: Optional[SignaturePayload] = None
+        update_data: Optional[Dict[str, Any]] = None
+        try:
+            gate_skip_reason = check_audio_gate(pcm_bytes)
+            if gate_skip_reason:
+                scheduler.on_idle()
+                update_data = {'status': 'silence', 'message': 'Silence' if gate_skip_reason == 'silence' else 'Silence (Noise Only)'}
+            elif is_same_song_still_playing(pcm_bytes):
+                update_data = {'status': 'unchanged', 'message': 'Same Song'}
+            else:
+                local_result = await match_local_fingerprint(pcm_bytes)
+                if local_result:
+                    scheduler.on_match(None, None, window_end_at, record_secs)
+                    remember_song_fingerprint(pcm_bytes, local_result['track'].get('title', ''))
+                    put_dropping_oldest(result_queue, {'result': local_result, 'pcm': pcm_bytes, 'window_end_at': window_end_at}, 'result_queue')
+                else:
+                    shazam_result, streamed = await recognize_with_window_ladder()
+                    if not streamed: # No streaming signature available, so sign this window directly
+                        signature = await generate_signature(pcm_bytes)
+                        if signature is None: # Only the in-process fallback sends (and may debug-save) a WAV
+                            recognition_input = build_recognition_input(pcm_bytes)
+                        if signature is not None or recognition_input:
+                            shazam_result = await recognize_song(recognition_input, signature)
+                    if stop_event.is_set():
+                        logger.info("Stop event detected after recognize_song.")
+                    elif not streamed and signature is None and not recognition_input:
+                        update_data = {'status': 'error', 'message': current_status_message}
+                    elif not shazam_result:
+                        scheduler.on_idle()
+                        breaker = get_circuit_breaker('recognition')
+                        if breaker.is_offline:
+                            queue_offline_recognition(pcm_bytes, signature, window_end_at)
+                        update_data = {'status': 'error', 'message': breaker.status_text() if breaker.is_offline else current_status_message}
+                    elif 'track' in shazam_result and shazam_result.get('track'):
+                        match_offset_s, track_duration_s = extract_track_timing(shazam_result)
+                        scheduler.on_match(match_offset_s, track_duration_s, window_end_at, record_secs)
+                        remember_song_fingerprint(pcm_bytes, shazam_result['track'].get('title', ''))
+                        put_dropping_oldest(result_queue, {'result': shazam_result, 'pcm': pcm_bytes, 'window_end_at': window_end_at}, 'result_queue')
+                    elif 'matches' in shazam_result and not shazam_result.get('matches'):
+                        clear_song_fingerprint()
+                        scheduler.on_no_match()
+                        update_data = {'status': 'no_match', 'message': 'No Match Found'}
+                    else:
+                        logger.error(f"Unexpected Shazam result format or empty track: {shazam_result}")
+                        scheduler.on_idle()
+                        update_data = {'status': 'error', 'message': 'Bad Shazam Result'}
         except Exception as e:
-             logger.exception(f"Unhandled error in recognition cycle: {e}")
-             update_data = {'status': 'error', 'message': 'Cycle Failed Unexpectedly'}
+            logger.exception(f"Unhandled error in recognition stage: {e}")
+            update_data = {'status': 'error', 'message': 'Cycle Failed Unexpectedly'}
         finally:
-            safe_remove(wav_file_path, "temp WAV after cycle")
+            window_queue.task_done()
+            if isinstance(recognition_input, str):
+                safe_remove(recognition_input, "debug WAV after cycle")
+        record_timing('stage_recognition', time.perf_counter() - stage_start)
+        if update_data:
+            publish_update(update_data, stop_event, window_end_at)
+        maybe_log_metrics_summary()
+    logger.info("Recognition stage finished.")
+
+async def presentation_stage(stop_event: threading.Event, result_queue: asyncio.Queue):
+    """Stage 3: cover art, history and state for a match, then the GUI update. Index updates happen last."""
+    while not stop_event.is_set():
+        item = await get_from_queue(result_queue, stop_event)
+        if item is None:
+            break
+        set_metric_gauge('result_queue_depth', result_queue.qsize())
+        stage_start = time.perf_counter()
+        try:
+            update_data = await process_recognition_result(item['result'])
+            record_timing('stage_presentation', time.perf_counter() - stage_start)
+            publish_update(update_data, stop_event, item['window_end_at'])
+            if item['result'].get('source') != 'local' and not stop_event.is_set():
+                await asyncio.get_running_loop().run_in_executor(
+                    None, add_to_fingerprint_index, item['result']['track'], item['pcm'])
+        except Exception as e:
+            logger.exception(f"Unhandled error in presentation stage: {e}")
+            publish_update({'status': 'error', 'message': 'Cycle Failed Unexpectedly'}, stop_event)
+        finally:
+            result_queue.task_done()
+    logger.info("Presentation stage finished.")
+
+async def offline_replay_stage(stop_event: threading.Event):
+    """Background stage: once recognition is back online, replays the offline queue in small, throttled batches
+    and writes matches into the history log at their capture time."""
+    queue_cfg = config['offline_queue']
+    breaker = get_circuit_breaker('recognition')
+    while await wait_with_stop(stop_event, queue_cfg['replay_interval_s']):
+        queue_store = get_offline_queue()
+        if queue_store is None or breaker.is_offline:
+            continue
+        for path, entry in queue_store.peek_batch(queue_cfg['replay_batch_size']):
+            if stop_event.is_set() or breaker.is_offline:
+                break
+            try:
+                result = await replay_offline_entry(entry)
+                captured_at = datetime.fromisoformat(entry['captured_at'])
+            except (KeyError, ValueError, TypeError, zlib.error, binascii.Error) as e:
+                logger.warning(f"Dropping malformed offline queue entry {path.name}: {e}")
+                queue_store.remove(path)
+                continue
+            if result is None:
+                break # Still failing: keep the entry and wait for the next round
+            queue_store.remove(path)
+            increment_metric('offline_queue_replayed')
+            track = result.get('track') if isinstance(result, dict) else None
+            if track:
+                increment_metric('offline_queue_matched')
+                logger.info(f"Offline replay: '{track.get('title', 'Unknown Title')}' identified for {captured_at.strftime('%Y-%m-%d %H:%M')}.")
+                insert_history_log_line(captured_at, track.get('subtitle', 'Unknown Artist'), track.get('title', 'Unknown Title'))
+            if not await wait_with_stop(stop_event, queue_cfg['replay_spacing_s']):
+                break
+    logger.info("Offline replay stage finished.")
 
-            if not stop_event.is_set():
-                logger.debug(f"Scheduling GUI update with data: {update_data}")
-                schedule_gui_update(update_gui, update_data)
-            else:
-                logger.info("Stop event set, skipping final GUI update for this cycle.")
-
-        if not stop_event.is_set():
-             logger.debug(f"Waiting {interval_seconds:.1f}s for next cycle...")
-             start_wait = asyncio.get_event_loop().time()
-             while (asyncio.get_event_loop().time() - start_wait) < interval_seconds:
-                 if stop_event.is_set():
-                     logger.info("Wait interrupted by stop event.")
-                     break
-                 try:
-                     await asyncio.sleep(wait_chunk)
-                 except asyncio.CancelledError:
-                     logger.info("Waiting sleep cancelled.")
-                     break
-        else:
-             logger.info("Stop event set, exiting recognition loop.")
 
+async def periodic_recognition_task(stop_event: threading.Event):
+    """The main async pipeline: capture -> recognize -> present, as concurrent stages joined by bounded queues."""
+    global recognition_loop, recognition_async_stop_event
+    recognition_async_stop_event = asyncio.Event()
+    recognition_loop = asyncio.get_running_loop()
+    if stop_event.is_set():
+        recognition_async_stop_event.set()
+
+    await start_shazam_client()
+    start_cover_art_client()
+    start_streaming_signature()
+    load_fingerprint_index_in_background()
+    scheduler = create_recognition_scheduler()
+    queue_size = max(1, config['pipeline']['queue_size'])
+    window_queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+    result_queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+    stages = [
+        asyncio.ensure_future(capture_stage(stop_event, scheduler, window_queue)),
+        asyncio.ensure_future(recognition_stage(stop_event, scheduler, window_queue, result_queue)),
+        asyncio.ensure_future(presentation_stage(stop_event, result_queue)),
+    ]
+    if get_offline_queue() is not None:
+        stages.append(asyncio.ensure_future(offline_replay_stage(stop_event)))
+    stop_waiter = asyncio.ensure_future(recognition_async_stop_event.wait())
+    await asyncio.wait([stop_waiter, *stages], return_when=asyncio.FIRST_COMPLETED)
+    if stop_waiter.done():
+        # Abort in-flight work (network calls, waits for audio) instead of letting it run to completion.
+        logger.info("Stop requested. Cancelling pipeline stages.")
+        for stage in stages:
+            stage.cancel()
+    else:
+        stop_waiter.cancel()
+    await asyncio.gather(*stages, return_exceptions=True)
+    cancel_cover_art_upgrade()
+    await stop_shazam_client()
+    await stop_cover_art_client()
+    recognition_loop = None
     logger.info("Periodic recognition task finished.")
 
 
@@ -1640,6 +4671,11 @@ def recognition_loop_runner(stop_event: threading.Event):
     except Exception as e:
         logger.exception(f"Exception in recognition thread runner: {e}")
     finally:
+        stop_streaming_signature()
+        shutdown_capture_engine()
+        shutdown_signature_executor()
+        save_fingerprint_index()
+        save_http_art_cache()
         if loop and not loop.is_closed():
              logger.info("Closing asyncio loop in recognition thread.")
              try:
@@ -1696,7 +4732,7 @@ def write_history_separator():
 
 
 def main():
-    global root, canvas, config, title_label_id, artist_label_id, status_label_id, coverart_item_id
+    global root, canvas, config, title_label_id, artist_label_id, status_label_id, coverart_item_id, current_artwork
 
     config = load_config()
     logger.info("--- Song Recognition Application Starting ---")
@@ -1709,8 +4745,8 @@ def main():
     restored = load_last_state()
     if not restored:
          logger.info("Starting with empty state or failed restore.")
-         if not IMAGE_PATH.is_file():
-              create_placeholder_image(IMAGE_PATH, 500, 500, "Play a song!")
+         if current_artwork is None:
+              current_artwork = create_placeholder_artwork(500, 500, "Play a song!")
          if current_status_message == "Play a song!":
              set_status_message("Ready")
 
@@ -1740,6 +4776,7 @@ def main():
     root.bind("<Configure>", on_resize)
     root.protocol("WM_DELETE_WINDOW", on_closing)
 
+    start_render_preparer()
     root.update()
     root.after(100, trigger_full_redraw)
     root.after(100, reset_cursor_hide_timer)